@@ -0,0 +1,24 @@
+-- KOFA: Precomputed section index for EU judgments
+-- Section boundaries and paragraph offsets are computed at sync time
+-- (kofa.eurlex_fetcher.judgment_section_index), so hent_eu_dom can build
+-- its table of contents without reading full_text and fetch one section
+-- with kofa_eu_case_law_slice instead of the whole judgment.
+
+ALTER TABLE kofa_eu_case_law
+    ADD COLUMN IF NOT EXISTS section_index JSONB;
+
+COMMENT ON COLUMN kofa_eu_case_law.section_index IS
+    '{"version", "length", "sections": {name: [start, end]}, "paragraphs": [[number, offset]]} - character offsets into full_text';
+
+-- Substring of full_text by 0-based character offset; NULL if the case is missing
+CREATE OR REPLACE FUNCTION kofa_eu_case_law_slice(
+    p_eu_case_id TEXT,
+    p_start INT,
+    p_length INT
+)
+RETURNS TEXT AS $$
+    SELECT substr(full_text, p_start + 1, p_length)
+    FROM public.kofa_eu_case_law
+    WHERE eu_case_id = p_eu_case_id;
+$$ LANGUAGE sql STABLE
+SET search_path = '';
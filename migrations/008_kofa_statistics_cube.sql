@@ -0,0 +1,51 @@
+-- KOFA: Precomputed statistics cube for the statistikk tool
+-- Case counts per year × avgjoerelse × sakstype × regelverk × konkurranseform.
+-- Refreshed by the sync after kofa_cases changes (kofa_refresh_statistics_cube);
+-- the MCP server loads the whole cube (a few thousand rows at most) and
+-- answers any year/grouping in memory.
+
+CREATE TABLE IF NOT EXISTS kofa_statistics_cube (
+    aar INT,                            -- EXTRACT(YEAR FROM avsluttet), NULL if unknown
+    avgjoerelse TEXT NOT NULL,
+    sakstype TEXT NOT NULL,
+    regelverk TEXT NOT NULL,
+    konkurranseform TEXT NOT NULL,
+    count BIGINT NOT NULL,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION kofa_refresh_statistics_cube()
+RETURNS BIGINT AS $$
+DECLARE
+    cells BIGINT;
+BEGIN
+    -- One transaction: readers see either the old or the new cube
+    DELETE FROM public.kofa_statistics_cube WHERE true;
+    INSERT INTO public.kofa_statistics_cube
+        (aar, avgjoerelse, sakstype, regelverk, konkurranseform, count)
+    SELECT
+        EXTRACT(YEAR FROM c.avsluttet)::INT,
+        COALESCE(c.avgjoerelse, 'Ukjent'),
+        COALESCE(c.sakstype, 'Ukjent'),
+        COALESCE(c.regelverk, 'Ukjent'),
+        COALESCE(c.konkurranseform, 'Ukjent'),
+        COUNT(*)::BIGINT
+    FROM public.kofa_cases c
+    GROUP BY 1, 2, 3, 4, 5;
+    GET DIAGNOSTICS cells = ROW_COUNT;
+    RETURN cells;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = '';
+
+-- RLS: public read, service_role write (the refresh runs as the sync's role)
+ALTER TABLE kofa_statistics_cube ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "kofa_statistics_cube_read" ON kofa_statistics_cube FOR SELECT USING (true);
+CREATE POLICY "kofa_statistics_cube_write" ON kofa_statistics_cube FOR INSERT
+    WITH CHECK ((select auth.role()) = 'service_role');
+CREATE POLICY "kofa_statistics_cube_delete" ON kofa_statistics_cube FOR DELETE
+    USING ((select auth.role()) = 'service_role');
+
+COMMENT ON TABLE kofa_statistics_cube IS
+    'Case counts per year and case attributes, rebuilt by kofa_refresh_statistics_cube()';
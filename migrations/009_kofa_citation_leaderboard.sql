@@ -0,0 +1,103 @@
+-- KOFA: Precomputed citation leaderboards for mest_siterte / mest_siterte_eu
+-- Top cited KOFA cases (kind 'kofa') and EU judgments (kind 'eu'), overall
+-- and scoped by the citing decision's year ('aar:2024') or outcome
+-- ('avgjoerelse:Brudd'). Rebuilt by sync_references via
+-- kofa_refresh_citation_leaderboards(); the MCP server loads the table once
+-- per data version and serves any limit up to the cap from memory.
+
+CREATE TABLE IF NOT EXISTS kofa_citation_leaderboard (
+    kind TEXT NOT NULL,                 -- 'kofa' | 'eu'
+    scope TEXT NOT NULL,                -- '' (all) | 'aar:<year>' | 'avgjoerelse:<outcome>'
+    rank INT NOT NULL,
+    target TEXT NOT NULL,               -- cited sak_nr or eu_case_id
+    cited_count BIGINT NOT NULL,
+    name TEXT,                          -- innklaget (kofa) or eu_case_name (eu)
+    avgjoerelse TEXT,                   -- outcome of the cited KOFA case
+    saken_gjelder TEXT,
+    PRIMARY KEY (kind, scope, rank)
+);
+
+CREATE OR REPLACE FUNCTION kofa_refresh_citation_leaderboards(p_cap INT DEFAULT 100)
+RETURNS BIGINT AS $$
+DECLARE
+    total BIGINT;
+BEGIN
+    DELETE FROM public.kofa_citation_leaderboard WHERE true;
+
+    -- KOFA → KOFA: counts reference rows, like kofa_most_cited
+    WITH refs AS (
+        SELECT cr.to_sak_nr AS target, c.avsluttet, c.avgjoerelse
+        FROM public.kofa_case_references cr
+        JOIN public.kofa_cases c ON c.sak_nr = cr.from_sak_nr
+    ), scoped AS (
+        SELECT target, '' AS scope FROM refs
+        UNION ALL
+        SELECT target, 'aar:' || EXTRACT(YEAR FROM avsluttet)::INT
+        FROM refs WHERE avsluttet IS NOT NULL
+        UNION ALL
+        SELECT target, 'avgjoerelse:' || avgjoerelse
+        FROM refs WHERE avgjoerelse IS NOT NULL
+    ), ranked AS (
+        SELECT
+            scope,
+            target,
+            COUNT(*)::BIGINT AS cited_count,
+            ROW_NUMBER() OVER (PARTITION BY scope ORDER BY COUNT(*) DESC, target) AS rank
+        FROM scoped
+        GROUP BY scope, target
+    )
+    INSERT INTO public.kofa_citation_leaderboard
+        (kind, scope, rank, target, cited_count, name, avgjoerelse, saken_gjelder)
+    SELECT 'kofa', r.scope, r.rank, r.target, r.cited_count,
+           t.innklaget, t.avgjoerelse, t.saken_gjelder
+    FROM ranked r
+    LEFT JOIN public.kofa_cases t ON t.sak_nr = r.target
+    WHERE r.rank <= p_cap;
+
+    -- KOFA → EU: counts distinct citing KOFA cases
+    WITH refs AS (
+        SELECT er.eu_case_id AS target, er.eu_case_name, er.sak_nr, c.avsluttet, c.avgjoerelse
+        FROM public.kofa_eu_references er
+        JOIN public.kofa_cases c ON c.sak_nr = er.sak_nr
+    ), scoped AS (
+        SELECT target, eu_case_name, sak_nr, '' AS scope FROM refs
+        UNION ALL
+        SELECT target, eu_case_name, sak_nr, 'aar:' || EXTRACT(YEAR FROM avsluttet)::INT
+        FROM refs WHERE avsluttet IS NOT NULL
+        UNION ALL
+        SELECT target, eu_case_name, sak_nr, 'avgjoerelse:' || avgjoerelse
+        FROM refs WHERE avgjoerelse IS NOT NULL
+    ), ranked AS (
+        SELECT
+            scope,
+            target,
+            MAX(eu_case_name) AS name,
+            COUNT(DISTINCT sak_nr)::BIGINT AS cited_count,
+            ROW_NUMBER() OVER (
+                PARTITION BY scope ORDER BY COUNT(DISTINCT sak_nr) DESC, target
+            ) AS rank
+        FROM scoped
+        GROUP BY scope, target
+    )
+    INSERT INTO public.kofa_citation_leaderboard (kind, scope, rank, target, cited_count, name)
+    SELECT 'eu', scope, rank, target, cited_count, name
+    FROM ranked
+    WHERE rank <= p_cap;
+
+    SELECT COUNT(*) INTO total FROM public.kofa_citation_leaderboard;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql
+SET search_path = '';
+
+-- RLS: public read, service_role write (the refresh runs as the sync's role)
+ALTER TABLE kofa_citation_leaderboard ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "kofa_citation_leaderboard_read" ON kofa_citation_leaderboard FOR SELECT USING (true);
+CREATE POLICY "kofa_citation_leaderboard_write" ON kofa_citation_leaderboard FOR INSERT
+    WITH CHECK ((select auth.role()) = 'service_role');
+CREATE POLICY "kofa_citation_leaderboard_delete" ON kofa_citation_leaderboard FOR DELETE
+    USING ((select auth.role()) = 'service_role');
+
+COMMENT ON TABLE kofa_citation_leaderboard IS
+    'Top cited KOFA cases and EU judgments per scope, rebuilt by kofa_refresh_citation_leaderboards()';
@@ -17,7 +17,7 @@ import sys
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from datetime import UTC, datetime
 
 # Add src to path for kofa imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -142,6 +142,23 @@ def update_embeddings(supabase, updates: list[dict], max_retries: int = 3) -> in
     return success
 
 
+def record_sync_cursor(supabase, count: int) -> None:
+    """Bump the 'forarbeider_embeddings' row in kofa_sync_meta so servers see a new data version."""
+    now = datetime.now(UTC).isoformat()
+    try:
+        supabase.table("kofa_sync_meta").upsert(
+            {
+                "source": "forarbeider_embeddings",
+                "cursor_value": now,
+                "last_count": count,
+                "synced_at": now,
+            },
+            on_conflict="source",
+        ).execute()
+    except Exception as e:
+        log(f"[WARN] Could not update sync cursor: {e}")
+
+
 def process_batch(batch_texts: list[str], batch_ids: list[str]) -> int:
     supabase = get_supabase_client()
     try:
@@ -283,6 +300,9 @@ Examples:
             log("Interrupted by user (Ctrl+C)")
             stopped_early = True
 
+    if total_processed > 0 and not args.dry_run:
+        record_sync_cursor(supabase, total_processed)
+
     elapsed = time.time() - start_time
     rate = total_processed / (elapsed / 60) if elapsed > 0 else 0
 
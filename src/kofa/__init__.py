@@ -8,6 +8,7 @@ Usage:
     # As CLI
     kofa serve           # stdio MCP server
     kofa serve --http    # HTTP MCP server
+    kofa serve --asgi    # Async HTTP MCP server (uvicorn)
 
     # As library
     from kofa import MCPServer, KofaService
@@ -0,0 +1,168 @@
+"""
+Persistent query-embedding cache (SQLite, shared between processes).
+
+Query embeddings are stored as float16 blobs keyed by (model,
+dimensionality, task type, normalized query), so gunicorn workers,
+restarts and the stdio server all reuse vectors already paid for, and
+semantic search keeps working for known queries while the embedding API
+is down. The database runs in WAL mode so concurrent readers never block
+on a writer; entries are evicted least-recently-used once the file
+exceeds its size budget.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "" disables the on-disk cache
+EMBED_STORE_PATH = os.getenv(
+    "KOFA_EMBED_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "kofa", "query_embeddings.sqlite"),
+)
+EMBED_STORE_MAX_MB = float(os.getenv("KOFA_EMBED_STORE_MAX_MB", "64"))
+
+# Eviction is checked every this many inserts rather than on each one
+_EVICT_EVERY = 64
+# last_used is only rewritten when older than this, to keep hits read-only
+_TOUCH_INTERVAL = 3600.0
+
+_SCHEMA = """
+PRAGMA auto_vacuum = INCREMENTAL;
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    query TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, dim, task, query)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS query_embeddings_last_used ON query_embeddings (last_used);
+"""
+
+
+def pack_vector(values: list[float]) -> bytes:
+    """Encode a vector as little-endian float16."""
+    return struct.pack(f"<{len(values)}e", *values)
+
+
+def unpack_vector(blob: bytes) -> list[float]:
+    return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+
+
+class EmbeddingStore:
+    """SQLite-backed embedding cache; one connection per thread."""
+
+    def __init__(self, path: str = EMBED_STORE_PATH, max_mb: float = EMBED_STORE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._local = threading.local()
+        self._inserts = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, model: str, dim: int, task: str, query: str) -> list[float] | None:
+        """Cached vector, or None. Errors are logged and treated as a miss."""
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT vector, last_used FROM query_embeddings "
+                "WHERE model = ? AND dim = ? AND task = ? AND query = ?",
+                (model, dim, task, query),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE query_embeddings SET last_used = ? "
+                    "WHERE model = ? AND dim = ? AND task = ? AND query = ?",
+                    (now, model, dim, task, query),
+                )
+            return unpack_vector(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store read failed: {e}")
+            return None
+
+    def put(self, model: str, dim: int, task: str, query: str, vector: list[float]) -> None:
+        """Store a vector; evicts old entries now and then. Errors are logged."""
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO query_embeddings "
+                "(model, dim, task, query, vector, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (model, dim, task, query, pack_vector(vector), time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store write failed: {e}")
+            return
+        with self._lock:
+            self._inserts += 1
+            due = self._inserts % _EVICT_EVERY == 1
+        if due:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        conn = self._conn()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries until the payload fits the budget."""
+        try:
+            conn = self._conn()
+            count, payload = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector) + LENGTH(query)), 0) "
+                "FROM query_embeddings"
+            ).fetchone()
+            if payload <= self.max_bytes or not count:
+                return 0
+            # Trim to 90% so eviction does not run on every following insert
+            excess = payload - int(self.max_bytes * 0.9)
+            n = min(count, max(1, excess * count // payload))
+            conn.execute(
+                "DELETE FROM query_embeddings WHERE (model, dim, task, query) IN ("
+                "SELECT model, dim, task, query FROM query_embeddings "
+                "ORDER BY last_used LIMIT ?)",
+                (n,),
+            )
+            conn.execute("PRAGMA incremental_vacuum")
+            logger.info(f"Evicted {n} query embeddings from {self.path}")
+            return n
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store eviction failed: {e}")
+            return 0
+
+    def stats(self) -> dict[str, int]:
+        count = self._conn().execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        return {"entries": count, "bytes": self.size_bytes(), "max_bytes": self.max_bytes}
+
+
+def open_store(path: str = EMBED_STORE_PATH) -> EmbeddingStore | None:
+    """Open the configured store, or None if disabled or unavailable."""
+    if not path:
+        return None
+    try:
+        return EmbeddingStore(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Query embedding store unavailable ({path}): {e}")
+        return None
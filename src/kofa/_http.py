@@ -0,0 +1,219 @@
+"""
+Framework-neutral HTTP handling shared by the Flask and ASGI transports.
+
+Each transport only adapts its request/response objects; parsing,
+JSON-RPC dispatch, pre-serialized responses, conditional requests,
+content negotiation (ETags, gzip/deflate) and SSE framing for server
+notifications live here so both transports behave identically.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import queue
+import uuid
+import zlib
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+
+from kofa.server import MCPServer, dumps, in_session
+
+logger = logging.getLogger(__name__)
+
+JSON_CONTENT_TYPE = "application/json"
+
+# Server-sent events (GET on the MCP endpoint) for server-initiated notifications
+SSE_CONTENT_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_KEEPALIVE = float(os.getenv("KOFA_SSE_KEEPALIVE", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("KOFA_SSE_QUEUE_SIZE", "256"))
+SSE_PING = b": ping\n\n"
+
+# Streamable HTTP session header: assigned on initialize, echoed by the client
+SESSION_HEADER = "Mcp-Session-Id"
+
+# Bodies smaller than this are sent uncompressed (not worth the CPU)
+COMPRESS_MIN_BYTES = int(os.getenv("KOFA_HTTP_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("KOFA_HTTP_COMPRESS_LEVEL", "6"))
+
+
+@dataclass
+class HttpResponse:
+    """Transport-neutral HTTP response."""
+
+    status: int
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def _error(status: int, code: int, message: str) -> HttpResponse:
+    return HttpResponse(
+        status=status,
+        body=dumps({"jsonrpc": "2.0", "id": None, "error": {"code": code, "message": message}}),
+        headers={"Content-Type": JSON_CONTENT_TYPE},
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (c.strip().removeprefix("W/") for c in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def _accepted_encodings(accept_encoding: str | None) -> dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Pick gzip or deflate from Accept-Encoding (gzip preferred on ties), or None."""
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in ("gzip", "deflate"):
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(response: HttpResponse, accept_encoding: str | None) -> HttpResponse:
+    """Compress the response body in place if the client accepts it and it is worth it."""
+    if response.status != 200 or len(response.body) < COMPRESS_MIN_BYTES:
+        return response
+    response.headers["Vary"] = "Accept-Encoding"
+    coding = negotiate_encoding(accept_encoding)
+    if coding is None:
+        return response
+    if coding == "gzip":
+        response.body = gzip.compress(response.body, compresslevel=COMPRESS_LEVEL)
+    else:
+        response.body = zlib.compress(response.body, COMPRESS_LEVEL)
+    response.headers["Content-Encoding"] = coding
+    # The representation differs per encoding, so the validator becomes weak
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = f"W/{etag}"
+    return response
+
+
+def wants_sse(accept: str | None) -> bool:
+    """True if the client asked for an event stream."""
+    return SSE_CONTENT_TYPE in (accept or "")
+
+
+def sse_event(message: dict) -> bytes:
+    """Encode one JSON-RPC message as an SSE `message` event."""
+    return b"event: message\ndata: " + dumps(message) + b"\n\n"
+
+
+def sse_stream(server: MCPServer, session: str | None = None) -> Iterator[bytes]:
+    """
+    Blocking SSE stream of a session's server notifications (for WSGI servers).
+
+    Sends a comment every SSE_KEEPALIVE seconds so proxies keep the
+    connection open. A slow client loses notifications rather than
+    blocking the publisher.
+    """
+    events: queue.Queue[dict] = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+
+    def send(message: dict) -> None:
+        try:
+            events.put_nowait(message)
+        except queue.Full:
+            logger.warning("SSE client too slow, dropping notification")
+
+    unsubscribe = server.notifications.subscribe(send, session)
+    try:
+        yield SSE_PING
+        while True:
+            try:
+                message = events.get(timeout=SSE_KEEPALIVE)
+            except queue.Empty:
+                yield SSE_PING
+                continue
+            yield sse_event(message)
+    finally:
+        unsubscribe()
+
+
+def handle_mcp_post(server: MCPServer, raw: bytes, headers: Mapping[str, str]) -> HttpResponse:
+    """
+    Handle a POST to the MCP endpoint.
+
+    `headers` must support case-insensitive lookup (both Werkzeug and
+    Starlette header objects do).
+    """
+    response = _handle_mcp_post(server, raw, headers)
+    return compress(response, headers.get("Accept-Encoding"))
+
+
+def _handle_mcp_post(server: MCPServer, raw: bytes, headers: Mapping[str, str]) -> HttpResponse:
+    try:
+        body = json.loads(raw) if raw else None
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return _error(400, -32700, f"Parse error: {e}")
+    if not body and not isinstance(body, list):
+        return _error(400, -32700, "Empty body")
+
+    if_none_match = headers.get("If-None-Match")
+
+    # initialize and tools/list are served from bytes serialized at startup
+    static = server.serialized_response(body)
+    if static is not None:
+        payload, etag = static
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if body.get("method") == "initialize" and not headers.get(SESSION_HEADER):
+            cache_headers[SESSION_HEADER] = uuid.uuid4().hex
+        if etag_matches(if_none_match, etag):
+            return HttpResponse(status=304, headers=cache_headers)
+        return HttpResponse(
+            status=200,
+            body=payload,
+            headers={"Content-Type": JSON_CONTENT_TYPE, **cache_headers},
+        )
+
+    # Read-only tool results are versioned by the data version: a repeat
+    # call with a matching ETag is answered without running the tool
+    tool_etag = server.tool_etag(body)
+    if tool_etag is not None and etag_matches(if_none_match, tool_etag):
+        return HttpResponse(status=304, headers={"ETag": tool_etag, "Cache-Control": "no-cache"})
+
+    cacheable = False
+    with in_session(headers.get(SESSION_HEADER)):
+        if tool_etag is not None:
+            response, cacheable = server.handle_cacheable_request(body)
+        else:
+            response = server.handle_request(body)
+    if response == [] or (isinstance(body, dict) and "id" not in body):
+        # Notification, or batch of notifications only: nothing to return
+        return HttpResponse(status=202)
+
+    result_headers = {"Content-Type": JSON_CONTENT_TYPE}
+    if cacheable and isinstance(response, dict):
+        result = response.get("result") or {}
+        if "error" not in response and not result.get("isError"):
+            result_headers["ETag"] = tool_etag
+            result_headers["Cache-Control"] = "no-cache"
+    return HttpResponse(status=200, body=dumps(response), headers=result_headers)
@@ -0,0 +1,107 @@
+"""
+Cursor pagination for long tool outputs.
+
+Long outputs (EU judgments, forarbeider chapters, decision sections) are
+rendered once into a list of blocks (lines/paragraphs). A page is a run of
+blocks that fits a character budget (`max_tegn`); a block larger than the
+budget is split near a whitespace boundary. The continuation cursor is an
+opaque base64url token holding the tool, document, section and the
+(block, offset) position where the next page starts, so a later page can be
+cut straight out of the cached block list.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import asdict, dataclass
+
+# Hard floor for max_tegn; tiny pages only multiply round trips
+MIN_PAGE_CHARS = 500
+
+
+class CursorError(ValueError):
+    """Cursor is malformed or does not belong to this request."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """Position of the next page in a rendered document."""
+
+    tool: str
+    ident: str
+    section: str
+    block: int
+    offset: int
+    max_chars: int
+
+    def encode(self) -> str:
+        raw = json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, tool: str, ident: str | None = None) -> PageCursor:
+        """Decode a cursor and check it was issued by `tool` for `ident`."""
+        try:
+            padded = token.strip() + "=" * (-len(token.strip()) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded))
+            cursor = cls(
+                tool=str(data["tool"]),
+                ident=str(data["ident"]),
+                section=str(data["section"]),
+                block=int(data["block"]),
+                offset=int(data["offset"]),
+                max_chars=int(data["max_chars"]),
+            )
+        except (ValueError, TypeError, KeyError) as e:
+            raise CursorError("ugyldig eller skadet cursor") from e
+        if cursor.tool != tool:
+            raise CursorError(f"cursor tilhører {cursor.tool}, ikke {tool}")
+        if ident is not None and cursor.ident != ident:
+            raise CursorError(f"cursor tilhører {cursor.ident}, ikke {ident}")
+        if cursor.block < 0 or cursor.offset < 0 or cursor.max_chars < MIN_PAGE_CHARS:
+            raise CursorError("ugyldig posisjon i cursor")
+        return cursor
+
+
+def _cut_point(text: str, room: int) -> int:
+    """Index to cut `text` at so the head fits `room`, preferring whitespace."""
+    if room <= 0:
+        return 0
+    space = max(text.rfind("\n", 0, room), text.rfind(" ", 0, room))
+    if space >= room // 2:
+        # Keep the whitespace on this page so the next one starts on a word
+        return space + 1
+    return max(room, 1)
+
+
+def take_page(blocks: list[str], block: int, offset: int, max_chars: int) -> tuple[str, int, int]:
+    """
+    Cut one page out of `blocks` starting at (block, offset).
+
+    Blocks are joined with newlines, so a page that spans everything equals
+    "\\n".join(blocks). Returns (page_text, next_block, next_offset);
+    next_block == len(blocks) means the document is exhausted.
+    """
+    parts: list[str] = []
+    used = 0
+    while block < len(blocks):
+        text = blocks[block][offset:] if offset else blocks[block]
+        room = max_chars - used - (1 if parts else 0)
+        if len(text) <= room:
+            parts.append(text)
+            used += len(text) + (1 if len(parts) > 1 else 0)
+            block, offset = block + 1, 0
+            continue
+        # Start the next page on a block boundary when the block fits a page
+        if parts and offset == 0 and len(text) <= max_chars:
+            break
+        cut = _cut_point(text, room)
+        if cut == 0:
+            break
+        parts.append(text[:cut])
+        offset += cut
+        break
+    return "\n".join(parts), block, offset
@@ -0,0 +1,117 @@
+"""
+Argument validation for MCP tool calls.
+
+Compiles a tool's JSON Schema `inputSchema` once into a plain Python
+validator, so each call is checked (and defaults filled in) before any
+backend round trip. Only the subset of JSON Schema used by the KOFA tool
+definitions is supported: object properties with `type` (string, integer,
+number, boolean, array), `required`, `default`, `enum`, `minimum`,
+`maximum`, `minLength` and array `items`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+Validator = Callable[[Any], dict[str, Any]]
+
+
+class ArgumentError(ValueError):
+    """Tool arguments do not match the tool's inputSchema."""
+
+    pass
+
+
+_TYPE_LABELS = {
+    "string": "en tekst",
+    "integer": "et heltall",
+    "number": "et tall",
+    "boolean": "true eller false",
+    "array": "en liste",
+    "object": "et objekt",
+}
+
+
+def _compile_value(path: str, spec: dict[str, Any]) -> Callable[[Any], Any]:
+    """Compile a checker for a single property value."""
+    expected = spec.get("type")
+    enum = tuple(spec["enum"]) if "enum" in spec else None
+    minimum = spec.get("minimum")
+    maximum = spec.get("maximum")
+    min_length = spec.get("minLength")
+    item_check = _compile_value(f"{path}[]", spec["items"]) if "items" in spec else None
+    label = _TYPE_LABELS.get(expected or "", expected)
+
+    def check(value: Any) -> Any:
+        if expected == "integer":
+            # bool is a subclass of int; JSON clients may send 20.0 for 20
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ArgumentError(f"'{path}' må være {label}")
+        elif expected == "number":
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ArgumentError(f"'{path}' må være {label}")
+        elif expected == "string":
+            if not isinstance(value, str):
+                raise ArgumentError(f"'{path}' må være {label}")
+        elif expected == "boolean":
+            if not isinstance(value, bool):
+                raise ArgumentError(f"'{path}' må være {label}")
+        elif expected == "array":
+            if not isinstance(value, list):
+                raise ArgumentError(f"'{path}' må være {label}")
+            if item_check is not None:
+                value = [item_check(v) for v in value]
+        elif expected == "object":
+            if not isinstance(value, dict):
+                raise ArgumentError(f"'{path}' må være {label}")
+
+        if enum is not None and value not in enum:
+            allowed = ", ".join(f"'{v}'" for v in enum)
+            raise ArgumentError(f"'{path}' må være en av: {allowed}")
+        if minimum is not None and value < minimum:
+            raise ArgumentError(f"'{path}' må være minst {minimum}")
+        if maximum is not None and value > maximum:
+            raise ArgumentError(f"'{path}' kan ikke være større enn {maximum}")
+        if min_length is not None and len(value) < min_length:
+            raise ArgumentError(f"'{path}' kan ikke være tom")
+        return value
+
+    return check
+
+
+def compile_validator(schema: dict[str, Any]) -> Validator:
+    """
+    Compile an object inputSchema into a validator.
+
+    The validator takes the raw `arguments` value from a tools/call request
+    and returns a new dict with defaults applied. Unknown properties are
+    dropped. Required string properties must be non-blank. Raises
+    ArgumentError on the first violation.
+    """
+    properties: dict[str, dict[str, Any]] = schema.get("properties", {})
+    required = tuple(schema.get("required", []))
+    checks = tuple((name, _compile_value(name, spec)) for name, spec in properties.items())
+    defaults = {name: spec["default"] for name, spec in properties.items() if "default" in spec}
+
+    def validate(arguments: Any) -> dict[str, Any]:
+        if arguments is None:
+            arguments = {}
+        elif not isinstance(arguments, dict):
+            raise ArgumentError("'arguments' må være et objekt")
+
+        for name in required:
+            value = arguments.get(name)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                raise ArgumentError(f"'{name}' er påkrevd")
+
+        result = dict(defaults)
+        for name, check in checks:
+            value = arguments.get(name)
+            if value is not None:
+                result[name] = check(value)
+        return result
+
+    return validate
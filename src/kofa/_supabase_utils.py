@@ -7,12 +7,16 @@ No external dependencies beyond supabase-py.
 
 from __future__ import annotations
 
+import contextlib
 import functools
 import logging
 import os
 import random
+import threading
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import Any, ParamSpec, TypeVar
 
@@ -46,6 +50,13 @@ RETRY_BACKOFF_BASE = float(os.getenv("KOFA_RETRY_BACKOFF_BASE", "0.5"))
 RETRY_BACKOFF_MAX = float(os.getenv("KOFA_RETRY_BACKOFF_MAX", "30.0"))
 RETRY_JITTER = os.getenv("KOFA_RETRY_JITTER", "true").lower() == "true"
 
+# Upper bound for a single PostgREST HTTP request. postgrest-py has no
+# per-request timeout and the client is shared across threads, so this is set
+# once and is deliberately not derived from the CallBudget: the budget is
+# enforced between attempts (with_retry, _backoff_sleep), and the server stops
+# waiting at the deadline, leaving an abandoned request to finish within this bound.
+POSTGREST_TIMEOUT = float(os.getenv("KOFA_POSTGREST_TIMEOUT", "30"))
+
 
 # =============================================================================
 # Exception Hierarchy
@@ -94,6 +105,18 @@ class RateLimitError(TransientError):
         self.retry_after = retry_after
 
 
+class DeadlineExceeded(SupabaseError):
+    """The calling tool's deadline passed - not retried."""
+
+    pass
+
+
+class RequestCancelled(SupabaseError):
+    """The calling request was cancelled by the client - not retried."""
+
+    pass
+
+
 def classify_error(e: Exception) -> SupabaseError:
     """Classify an exception as TransientError or PermanentError."""
     import httpx
@@ -133,6 +156,79 @@ def classify_error(e: Exception) -> SupabaseError:
     return TransientError(f"Unknown error: {e}", original=e)
 
 
+# =============================================================================
+# Deadlines and cancellation
+# =============================================================================
+
+
+@dataclass
+class CallBudget:
+    """Deadline and cancellation flag for the current tool call."""
+
+    deadline: float | None = None  # time.monotonic() value
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    degraded: bool = False  # result is fallback output: do not memoize or ETag it
+
+    def remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self) -> None:
+        """Raise if the call has been cancelled or has run out of time."""
+        if self.cancelled.is_set():
+            raise RequestCancelled("Request cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+
+
+_budget: ContextVar[CallBudget | None] = ContextVar("kofa_call_budget", default=None)
+
+
+@contextlib.contextmanager
+def call_budget(budget: CallBudget) -> Iterator[CallBudget]:
+    """Run the enclosed backend calls under `budget` (per thread/context)."""
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def check_budget() -> None:
+    """Raise DeadlineExceeded/RequestCancelled if the current call must stop."""
+    budget = _budget.get()
+    if budget is not None:
+        budget.check()
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current call's deadline, or None if unbounded."""
+    budget = _budget.get()
+    return budget.remaining() if budget is not None else None
+
+
+def mark_degraded() -> None:
+    """Flag the current call's result as fallback output that must not be cached."""
+    budget = _budget.get()
+    if budget is not None:
+        budget.degraded = True
+
+
+def _backoff_sleep(backoff: float) -> None:
+    """Sleep before a retry, but never past the deadline and wake on cancel."""
+    budget = _budget.get()
+    if budget is None:
+        time.sleep(backoff)
+        return
+    remaining = budget.remaining()
+    if remaining is not None and remaining <= backoff:
+        raise DeadlineExceeded(f"Deadline exceeded (retry would wait {backoff:.2f}s)")
+    if budget.cancelled.wait(backoff):
+        raise RequestCancelled("Request cancelled")
+
+
 # =============================================================================
 # Retry Decorator
 # =============================================================================
@@ -143,7 +239,12 @@ def with_retry(
     backoff_base: float | None = None,
     backoff_max: float | None = None,
 ) -> Callable[[Callable[P, R]], Callable[P, R]]:
-    """Decorator for retry with exponential backoff."""
+    """
+    Decorator for retry with exponential backoff.
+
+    Honours the current CallBudget: no attempt starts after the deadline or
+    a cancellation, and backoff never sleeps past the deadline.
+    """
 
     def decorator(func: Callable[P, R]) -> Callable[P, R]:
         @functools.wraps(func)
@@ -155,8 +256,11 @@ def with_retry(
             last_exception: Exception | None = None
 
             for attempt in range(_max):
+                check_budget()
                 try:
                     return func(*args, **kwargs)
+                except (DeadlineExceeded, RequestCancelled):
+                    raise
                 except (TransientError, RateLimitError) as e:
                     last_exception = e
                     if attempt == _max - 1:
@@ -171,7 +275,7 @@ def with_retry(
                         f"{func.__name__} attempt {attempt + 1}/{_max} failed: {e}. "
                         f"Retrying in {backoff:.2f}s..."
                     )
-                    time.sleep(backoff)
+                    _backoff_sleep(backoff)
                 except PermanentError:
                     raise
                 except Exception as e:
@@ -186,7 +290,7 @@ def with_retry(
                         backoff = min(_base * (2**attempt), _max_backoff)
                         if RETRY_JITTER:
                             backoff = max(0, backoff + backoff * 0.25 * (2 * random.random() - 1))
-                        time.sleep(backoff)
+                        _backoff_sleep(backoff)
                     else:
                         raise classified from e
 
@@ -223,7 +327,7 @@ def safe_execute(
 @lru_cache(maxsize=1)
 def get_shared_client():
     """Get shared Supabase client (singleton)."""
-    from supabase import create_client
+    from supabase import ClientOptions, create_client
 
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_SECRET_KEY") or os.environ.get("SUPABASE_KEY")
@@ -231,4 +335,6 @@ def get_shared_client():
     if not url or not key:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY/SUPABASE_SECRET_KEY must be set")
 
-    return create_client(url, key)
+    return create_client(
+        url, key, options=ClientOptions(postgrest_client_timeout=POSTGREST_TIMEOUT)
+    )
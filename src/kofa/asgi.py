@@ -0,0 +1,151 @@
+"""
+ASGI app factory for KOFA MCP server (Starlette).
+
+Serves the same routes as the Flask blueprint in `kofa.web`, but with async
+handlers. Blocking backend work (Supabase RPCs, Gemini embeddings) runs in a
+bounded thread pool, so one process can hold many concurrent sessions while
+only `max_workers` requests touch the backend at a time.
+
+The server is warmed up (backend connection, lazy imports) during lifespan
+startup, and /health reports 503 until warm-up has succeeded.
+
+Usage:
+    from kofa.asgi import create_asgi_app
+    app = create_asgi_app()
+
+    uvicorn kofa.asgi:app --host 0.0.0.0 --port 8000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ASGI_MAX_WORKERS = int(os.getenv("KOFA_ASGI_MAX_WORKERS", "32"))
+
+
+def create_asgi_app(server=None, max_workers: int | None = None, prefix: str = "/mcp"):
+    """Create and return a Starlette app serving MCP under `prefix`."""
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response, StreamingResponse
+    from starlette.routing import Route
+
+    from kofa import KofaService, MCPServer
+    from kofa._http import (
+        SESSION_HEADER,
+        SSE_CONTENT_TYPE,
+        SSE_HEADERS,
+        SSE_KEEPALIVE,
+        SSE_PING,
+        SSE_QUEUE_SIZE,
+        HttpResponse,
+        handle_mcp_post,
+        sse_event,
+        wants_sse,
+    )
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers or ASGI_MAX_WORKERS, thread_name_prefix="kofa-asgi"
+    )
+
+    _mcp_server = server
+    _server_lock = threading.Lock()
+
+    def get_mcp_server():
+        nonlocal _mcp_server
+        if _mcp_server is None:
+            with _server_lock:
+                if _mcp_server is None:
+                    _mcp_server = MCPServer(KofaService())
+        return _mcp_server
+
+    def handle(raw: bytes, headers) -> HttpResponse:
+        return handle_mcp_post(get_mcp_server(), raw, headers)
+
+    async def mcp_head(request: Request) -> Response:
+        return Response(
+            status_code=200,
+            headers={"MCP-Protocol-Version": "2025-06-18", "Content-Type": "application/json"},
+        )
+
+    async def mcp_events(request: Request) -> Response:
+        # Streamable HTTP: GET opens an SSE stream for server notifications
+        if not wants_sse(request.headers.get("accept")):
+            return Response(status_code=405, headers={"Allow": "HEAD, POST"})
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[dict] = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+
+        def offer(message: dict) -> None:
+            if events.full():
+                logger.warning("SSE client too slow, dropping notification")
+            else:
+                events.put_nowait(message)
+
+        async def stream():
+            unsubscribe = get_mcp_server().notifications.subscribe(
+                lambda message: loop.call_soon_threadsafe(offer, message),
+                request.headers.get(SESSION_HEADER),
+            )
+            try:
+                yield SSE_PING
+                while True:
+                    try:
+                        message = await asyncio.wait_for(events.get(), SSE_KEEPALIVE)
+                    except TimeoutError:
+                        yield SSE_PING
+                        continue
+                    yield sse_event(message)
+            finally:
+                unsubscribe()
+
+        return StreamingResponse(stream(), media_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
+
+    async def mcp_post(request: Request) -> Response:
+        raw = await request.body()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(executor, handle, raw, request.headers)
+        return Response(result.body, status_code=result.status, headers=result.headers)
+
+    async def mcp_health(request: Request) -> Response:
+        mcp = get_mcp_server()
+        if not mcp.ready:
+            # Answer the probe at once; warm-up is retried in the background
+            mcp.warm_up_in_background()
+            return JSONResponse(
+                {"status": "starting", "server": "kofa", "version": "0.1.0"}, status_code=503
+            )
+        return JSONResponse({"status": "ok", "server": "kofa", "version": "0.1.0"})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Warm before uvicorn starts accepting connections
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, get_mcp_server().warm_up)
+        yield
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return Starlette(
+        routes=[
+            Route(f"{prefix}/", mcp_head, methods=["HEAD"]),
+            Route(f"{prefix}/", mcp_events, methods=["GET"]),
+            Route(f"{prefix}/", mcp_post, methods=["POST"]),
+            Route(f"{prefix}/health", mcp_health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def __getattr__(name: str):
+    # `uvicorn kofa.asgi:app` — build the default app on first access
+    if name == "app":
+        app = create_asgi_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
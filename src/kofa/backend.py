@@ -0,0 +1,137 @@
+"""
+Backend interface for KofaService.
+
+KofaBackend is the read API the service layer uses, as implemented by
+KofaSupabaseBackend (PostgREST) and KofaSqliteBackend (local SQLite/FTS5
+file). Sync methods are specific to the Supabase backend and are not part
+of the protocol; a backend without them is read-only.
+
+Select the backend with KOFA_BACKEND=supabase (default) or
+KOFA_BACKEND=sqlite (with KOFA_SQLITE_PATH).
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, Protocol, runtime_checkable
+
+BACKEND = os.getenv("KOFA_BACKEND", "supabase").lower()
+
+# Entries kept per citation leaderboard scope (see migration 009)
+LEADERBOARD_CAP = int(os.getenv("KOFA_LEADERBOARD_CAP", "100"))
+
+
+@runtime_checkable
+class KofaBackend(Protocol):
+    """Read methods KofaService needs from a backend."""
+
+    # Lifecycle and change tracking
+    def add_write_listener(self, listener: Callable[[str, str], None]) -> None: ...
+    def reconnect(self) -> None: ...
+    def get_data_version(self) -> str: ...
+    def get_sync_status(self) -> dict: ...
+    def list_known_ids(self, space: str) -> set[str]: ...
+
+    # Bulk reads (snapshots, in-process replica)
+    def scan_table(
+        self, table: str, columns: list[str], key: str, page_size: int = 1000
+    ) -> Iterator[dict]: ...
+
+    # Cases
+    def get_case(self, sak_nr: str) -> dict | None: ...
+    def get_cases(self, sak_nrs: list[str]) -> list[dict]: ...
+    def search(self, query: str, limit: int = 20) -> list[dict]: ...
+    def recent_cases(
+        self,
+        limit: int = 20,
+        sakstype: str | None = None,
+        avgjoerelse: str | None = None,
+        innklaget: str | None = None,
+    ) -> list[dict]: ...
+    def statistics(self, aar: int | None = None, gruppering: str = "avgjoerelse") -> list[dict]: ...
+    def get_statistics_cube(self) -> list[dict]: ...
+
+    # Decision text and references
+    def get_decision_text(self, sak_nr: str, section: str | None = None) -> list[dict]: ...
+    def get_paragraphs(self, keys: list[tuple[str, int]]) -> list[dict]: ...
+    def search_decision_text(
+        self, query: str, section: str | None = None, limit: int = 20
+    ) -> list[dict]: ...
+    def find_by_law_reference(
+        self, law_name: str, section: str | None = None, limit: int = 20
+    ) -> list[dict]: ...
+    def find_cases_by_sections(
+        self, law_name: str, sections: list[str], limit: int = 20
+    ) -> list[dict]: ...
+    def count_cases_by_section(self, law_name: str, section: str) -> int: ...
+    def find_related_cases(self, sak_nr: str) -> dict: ...
+    def most_cited_cases(self, limit: int = 20) -> list[dict]: ...
+    def get_citation_leaderboards(self) -> list[dict]: ...
+
+    # EU case law
+    def get_eu_case_law(self, eu_case_id: str) -> dict | None: ...
+    def get_eu_case_law_meta(self, eu_case_id: str) -> dict | None: ...
+    def get_eu_case_law_slice(self, eu_case_id: str, start: int, length: int) -> str | None: ...
+    def find_by_eu_case(self, eu_case_id: str, limit: int = 20) -> list[dict]: ...
+    def most_cited_eu_cases(self, limit: int = 20) -> list[dict]: ...
+
+    # Forarbeider
+    def get_forarbeide(self, doc_id: str) -> dict | None: ...
+    def list_forarbeider(self) -> list[dict]: ...
+    def get_forarbeider_sections(
+        self, doc_id: str, section_number: str | None = None
+    ) -> list[dict]: ...
+    def get_forarbeider_section_rows(self, keys: list[tuple[str, str]]) -> list[dict]: ...
+    def get_forarbeider_toc(self, doc_id: str) -> list[dict]: ...
+    def search_forarbeider(
+        self, query: str, doc_id: str | None = None, limit: int = 20
+    ) -> list[dict]: ...
+    def find_forarbeider_by_law_reference(
+        self, law_name: str, section: str | None = None, limit: int = 10
+    ) -> list[dict]: ...
+
+
+def create_backend(kind: str | None = None) -> Any:
+    """Backend selected by `kind` or KOFA_BACKEND ("supabase" or "sqlite")."""
+    kind = (kind or BACKEND).lower()
+    if kind == "sqlite":
+        from kofa.sqlite_backend import KofaSqliteBackend
+
+        return KofaSqliteBackend()
+    if kind == "supabase":
+        from kofa.supabase_backend import KofaSupabaseBackend
+
+        return KofaSupabaseBackend()
+    raise ValueError(f"Unknown KOFA_BACKEND: {kind!r} (expected 'supabase' or 'sqlite')")
+
+
+def supports_sync(backend: Any) -> bool:
+    """Whether `backend` can run the sync pipeline (only the Supabase backend can)."""
+    return callable(getattr(backend, "sync_from_wp_api", None))
+
+
+def rollup_toc(rows: Iterable[dict]) -> list[dict]:
+    """
+    Roll forarbeider TOC rows (in document order) up to level-1 sections.
+
+    Returns one dict per level-1 section: section_number, title, char_count
+    (including its subsections) and subsection_count. Rows before the first
+    level-1 heading are not included.
+    """
+    toc: list[dict] = []
+    for row in rows:
+        chars = row.get("char_count") or 0
+        if row.get("level", 1) == 1:
+            toc.append(
+                {
+                    "section_number": row.get("section_number", "?"),
+                    "title": row.get("title", ""),
+                    "char_count": chars,
+                    "subsection_count": 0,
+                }
+            )
+        elif toc:
+            toc[-1]["char_count"] += chars
+            toc[-1]["subsection_count"] += 1
+    return toc
@@ -0,0 +1,290 @@
+"""
+In-process caches for KOFA.
+
+A small thread-safe LRU with optional per-entry TTL, shared by the
+service and server layers, a Bloom filter, and a read-through caching
+proxy for the Supabase backend. Everything is bounded; no external
+dependencies.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned by LRUCache.get() on a miss, so None can be cached
+MISSING: Any = object()
+
+DEFAULT_MAXSIZE = int(os.getenv("KOFA_CACHE_MAXSIZE", "256"))
+
+# Read-through backend cache (see CachedBackend)
+BACKEND_CACHE_ENABLED = os.getenv("KOFA_BACKEND_CACHE", "true").lower() == "true"
+BACKEND_CACHE_MAXSIZE = int(os.getenv("KOFA_BACKEND_CACHE_MAXSIZE", "1024"))
+CASE_TTL = float(os.getenv("KOFA_CACHE_TTL_CASES", "3600"))
+DOCUMENT_TTL = float(os.getenv("KOFA_CACHE_TTL_DOCUMENTS", "86400"))
+# Not-found results: short, since agents often retry right after a sync
+NEGATIVE_TTL = float(os.getenv("KOFA_CACHE_TTL_NEGATIVE", "60"))
+
+# Bloom filters of known ids, so lookups of unknown ids skip the backend
+BLOOM_ENABLED = os.getenv("KOFA_BLOOM_FILTERS", "true").lower() == "true"
+BLOOM_FP_RATE = float(os.getenv("KOFA_BLOOM_FP_RATE", "0.001"))
+
+
+class LRUCache:
+    """Thread-safe size-bounded LRU cache with optional TTL (seconds)."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float | None = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value (refreshing its recency), or `default`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store a value; `ttl` overrides the cache default for this entry."""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Delete all entries whose key matches `predicate`; returns the count."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings (double hashing on blake2b).
+
+    Sized for `capacity` items at false-positive rate `fp_rate`; items can be
+    added later, at a rising false-positive rate once capacity is exceeded.
+    Never yields false negatives.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float = BLOOM_FP_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def of(cls, items: Iterable[str], fp_rate: float = BLOOM_FP_RATE) -> BloomFilter:
+        """Filter holding `items`, with room for as many again."""
+        items = list(items)
+        bloom = cls(max(2 * len(items), 1024), fp_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+# Cached backend reads: method -> (write kind that invalidates it, TTL).
+# The first positional argument is the key the write listener reports.
+CACHED_METHODS: dict[str, tuple[str, float]] = {
+    "get_case": ("case", CASE_TTL),
+    "get_decision_text": ("case", CASE_TTL),
+    "get_eu_case_law": ("eu_case_law", DOCUMENT_TTL),
+    "get_eu_case_law_meta": ("eu_case_law", DOCUMENT_TTL),
+    "get_eu_case_law_slice": ("eu_case_law", DOCUMENT_TTL),
+    "get_forarbeide": ("forarbeide", DOCUMENT_TTL),
+    "get_forarbeider_sections": ("forarbeide", DOCUMENT_TTL),
+    "get_forarbeider_toc": ("forarbeide", DOCUMENT_TTL),
+}
+
+# Lookups guarded by a Bloom filter: method -> (id space of the first
+# argument, result for an unknown id). An id space is loaded with the
+# backend's list_known_ids(space).
+GUARDED_METHODS: dict[str, tuple[str, Any]] = {
+    "get_case": ("sak_nr", None),
+    "get_decision_text": ("sak_nr", []),
+    "get_eu_case_law": ("eu_case_id", None),
+    "get_eu_case_law_meta": ("eu_case_id", None),
+    "get_eu_case_law_slice": ("eu_case_id", None),
+    "find_by_eu_case": ("eu_case_id", []),
+}
+
+# Write kinds (see add_write_listener) that create ids in an id space
+_WRITE_ID_SPACES = {"case": "sak_nr", "eu_case_law": "eu_case_id"}
+
+
+def _call_params(signature: inspect.Signature, args: tuple, kwargs: dict) -> tuple:
+    """
+    All arguments of a call in parameter order, defaults applied, so that
+    keyword and positional calls give the same cache key (the id first).
+    Raises TypeError if they do not fit `signature`.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    params: list[Any] = []
+    for name, value in bound.arguments.items():
+        kind = signature.parameters[name].kind
+        if kind is inspect.Parameter.VAR_POSITIONAL:
+            params.extend(value)
+        elif kind is inspect.Parameter.VAR_KEYWORD:
+            params.extend(sorted(value.items()))
+        else:
+            params.append(value)
+    return tuple(params)
+
+
+class CachedBackend:
+    """
+    Read-through cache in front of KofaSupabaseBackend.
+
+    Point lookups in CACHED_METHODS are served from one size-bounded LRU
+    with per-method TTLs; everything else is passed through. Not-found
+    (empty) results are cached too, for NEGATIVE_TTL only. Entries are
+    dropped when the backend reports a write to their key, and the whole
+    cache is cleared when the data version changes (another process
+    synced). Cached values are shared: callers must not mutate them.
+
+    Lookups in GUARDED_METHODS first consult a Bloom filter of the known
+    ids, loaded on first use and after every clear(), so ids that
+    certainly do not exist are answered without a round trip.
+    """
+
+    def __init__(self, backend: Any, maxsize: int = BACKEND_CACHE_MAXSIZE):
+        self.backend = backend
+        self.cache = LRUCache(maxsize=maxsize)
+        self.bloom_rejections = 0
+        self._filters: dict[str, BloomFilter] | None = None
+        self._filters_lock = threading.Lock()
+        backend.add_write_listener(self.invalidate)
+        for name in CACHED_METHODS.keys() | GUARDED_METHODS.keys():
+            setattr(self, name, self._cached(name))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.backend, name)
+
+    def _cached(self, name: str) -> Callable[..., Any]:
+        # Reads the backend answers in-process (ReplicaBackend) gain nothing from a copy here
+        local = name in getattr(self.backend, "local_methods", ())
+        cached_as = None if local else CACHED_METHODS.get(name)
+        guard = GUARDED_METHODS.get(name) if BLOOM_ENABLED else None
+        signature = inspect.signature(getattr(self.backend, name))
+
+        def cached(*args: Any, **kwargs: Any) -> Any:
+            try:
+                params = _call_params(signature, args, kwargs)
+            except TypeError:
+                return getattr(self.backend, name)(*args, **kwargs)
+            if guard is not None and params:
+                space, not_found = guard
+                if isinstance(params[0], str) and not self.may_exist(space, params[0]):
+                    self.bloom_rejections += 1
+                    return not_found
+            if cached_as is None:
+                return getattr(self.backend, name)(*args, **kwargs)
+            key = (name, params)
+            value = self.cache.get(key)
+            if value is MISSING:
+                value = getattr(self.backend, name)(*args, **kwargs)
+                self.cache.set(key, value, ttl=cached_as[1] if value else NEGATIVE_TTL)
+            return value
+
+        cached.__name__ = name
+        return cached
+
+    def load_filters(self) -> dict[str, BloomFilter]:
+        """Bloom filters per id space, loaded from the backend if not yet loaded."""
+        filters = self._filters
+        if filters is not None:
+            return filters
+        with self._filters_lock:
+            if self._filters is None:
+                filters = {}
+                for space in {space for space, _ in GUARDED_METHODS.values()}:
+                    try:
+                        filters[space] = BloomFilter.of(self.backend.list_known_ids(space))
+                    except Exception as e:
+                        # Without a filter the space is simply not guarded
+                        logger.warning(f"Could not load known {space} values: {e}")
+                self._filters = filters
+            return self._filters
+
+    def may_exist(self, space: str, ident: str) -> bool:
+        """False only if `ident` is certainly not a known id in `space`."""
+        bloom = self.load_filters().get(space)
+        return bloom is None or ident in bloom
+
+    def invalidate(self, kind: str, ident: str) -> None:
+        """Drop cached reads of `ident` for methods invalidated by `kind` writes."""
+        names = {name for name, (k, _ttl) in CACHED_METHODS.items() if k == kind}
+        self.cache.delete_where(lambda key: key[0] in names and key[1][:1] == (ident,))
+        space = _WRITE_ID_SPACES.get(kind)
+        filters = self._filters
+        if space and filters and space in filters:
+            filters[space].add(ident)
+
+    def clear(self) -> None:
+        """Drop all cached reads and reload the Bloom filters on next use."""
+        self.cache.clear()
+        self._filters = None
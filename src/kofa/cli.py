@@ -4,15 +4,20 @@ KOFA CLI - MCP server for Norwegian public procurement decisions.
 Usage:
     kofa serve                  # stdio MCP server
     kofa serve --http           # HTTP MCP server (Flask)
+    kofa serve --http --workers 4   # Pre-forked production HTTP server (gunicorn)
+    kofa serve --asgi           # HTTP MCP server (Starlette/uvicorn)
     kofa sync                   # Sync from KOFA WordPress API
     kofa sync --scrape          # Also scrape HTML metadata
     kofa sync --scrape --limit 100 --max-time 30   # Scrape 100 cases, max 30 min
     kofa sync --force           # Force full re-sync
     kofa status                 # Show sync status
+    kofa snapshot export kofa.sqlite.gz   # Dump the corpus from Supabase
+    kofa snapshot import kofa.sqlite.gz   # Install it for KOFA_BACKEND=sqlite
+    kofa vectors export         # Embeddings to a memory-mapped matrix (KOFA_LOCAL_VECTORS)
+    kofa vectors bench          # IVF recall vs latency against exact search
 """
 
 import argparse
-import json
 import logging
 import os
 import sys
@@ -22,7 +27,41 @@ def cmd_serve(args):
     """Start MCP server (stdio or HTTP)."""
     from kofa import KofaService, MCPServer
 
-    if args.http:
+    if args.asgi:
+        try:
+            import uvicorn  # pyright: ignore[reportMissingImports]
+
+            from kofa.asgi import create_asgi_app
+        except ImportError:
+            print("Starlette/uvicorn not installed. Run: pip install kofa[asgi]", file=sys.stderr)
+            sys.exit(1)
+
+        host = args.host or "0.0.0.0"
+        port = args.port or 8000
+        print(f"Starting KOFA MCP server (ASGI) on http://{host}:{port}/mcp/")
+        if args.workers:
+            # Each uvicorn worker imports the app and warms up in its lifespan
+            uvicorn.run("kofa.asgi:app", host=host, port=port, workers=args.workers)
+        else:
+            uvicorn.run(create_asgi_app(), host=host, port=port)
+    elif args.http and args.workers:
+        try:
+            import flask  # noqa: F401
+            import gunicorn  # noqa: F401  # pyright: ignore[reportMissingImports]
+
+            from kofa.prefork import run_prefork
+        except ImportError:
+            print("Flask/gunicorn not installed. Run: pip install kofa[http]", file=sys.stderr)
+            sys.exit(1)
+
+        host = args.host or "0.0.0.0"
+        port = args.port or 8000
+        print(
+            f"Starting KOFA MCP server on http://{host}:{port}/mcp/ "
+            f"({args.workers} workers x {args.threads} threads)"
+        )
+        run_prefork(host=host, port=port, workers=args.workers, threads=args.threads)
+    elif args.http:
         try:
             from flask import Flask
 
@@ -39,24 +78,11 @@ def cmd_serve(args):
         print(f"Starting KOFA MCP server on http://{host}:{port}/mcp/")
         app.run(host=host, port=port, debug=args.debug)
     else:
+        from kofa.stdio import run_stdio
+
         server = MCPServer(KofaService())
         print("KOFA MCP server (stdio mode). Send JSON-RPC requests via stdin.", file=sys.stderr)
-
-        for line in sys.stdin:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                request = json.loads(line)
-                response = server.handle_request(request)
-                print(json.dumps(response), flush=True)
-            except json.JSONDecodeError as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {"code": -32700, "message": f"Parse error: {e}"},
-                }
-                print(json.dumps(error_response), flush=True)
+        run_stdio(server, max_concurrency=args.max_concurrency)
 
 
 def cmd_sync(args):
@@ -116,6 +142,75 @@ def cmd_status(args):
     print(service.get_status())
 
 
+def cmd_snapshot(args):
+    """Export or import a corpus snapshot."""
+    from kofa.snapshot import SnapshotError, export_snapshot, import_snapshot
+    from kofa.sqlite_backend import SQLITE_PATH
+
+    try:
+        if args.snapshot_command == "export":
+            manifest = export_snapshot(args.path)
+            print(f"Wrote {args.path} ({manifest['bytes'] / 1e6:.1f} MB)")
+        else:
+            target = args.target or SQLITE_PATH
+            manifest = import_snapshot(args.path, target)
+            print(f"Installed {args.path} as {target}")
+    except SnapshotError as e:
+        print(f"Snapshot error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Data version {manifest['data_version']}, created {manifest['created_at']}")
+    for table, count in manifest["tables"].items():
+        print(f"  {table}: {count:,}")
+
+
+def cmd_vectors(args):
+    """Export embeddings for local semantic search, or benchmark the IVF index."""
+    try:
+        import numpy  # noqa: F401
+
+        from kofa import vector_index
+    except ImportError:
+        print("NumPy not installed. Run: pip install kofa[local]", file=sys.stderr)
+        sys.exit(1)
+
+    directory = args.dir or vector_index.VECTOR_DIR
+    corpora = list(vector_index.CORPORA) if args.corpus == "all" else [args.corpus]
+    try:
+        for corpus in corpora:
+            if args.vectors_command == "export":
+                manifest = vector_index.export_vectors(
+                    corpus,
+                    directory,
+                    args.dtype or vector_index.VECTOR_DTYPE,
+                    lists=vector_index.VECTOR_LISTS if args.lists is None else args.lists,
+                )
+                print(
+                    f"{corpus}: {manifest['count']:,} {manifest['dim']}-d {manifest['dtype']} "
+                    f"vectors, {manifest['lists']} lists ({manifest['bytes'] / 1e6:.1f} MB)"
+                )
+            else:
+                index = vector_index.VectorIndex(corpus, directory)
+                probes = [int(p) for p in args.probes.split(",")]
+                report = vector_index.benchmark(index, probes, args.queries, args.k)
+                stats = index.stats()
+                print(
+                    f"\n{corpus}: {stats['count']:,} vectors, {stats['lists']} lists, "
+                    f"{min(args.queries, stats['count'])} sampled queries, "
+                    f"recall@{args.k} vs exact"
+                )
+                print(f"{'nprobe':>7} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'scanned':>8}")
+                for r in report:
+                    label = str(r["nprobe"]) if r["nprobe"] else "exact"
+                    print(
+                        f"{label:>7} {r['recall']:7.3f} {r['p50_ms']:8.2f} "
+                        f"{r['p95_ms']:8.2f} {r['scanned']:8.1%}"
+                    )
+    except vector_index.VectorIndexError as e:
+        print(f"Vector index error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def main():
     from dotenv import load_dotenv  # pyright: ignore[reportMissingImports]
 
@@ -132,9 +227,30 @@ def main():
     # serve
     serve_parser = subparsers.add_parser("serve", help="Start MCP server")
     serve_parser.add_argument("--http", action="store_true", help="Use HTTP transport (Flask)")
+    serve_parser.add_argument(
+        "--asgi", action="store_true", help="Use async HTTP transport (Starlette/uvicorn)"
+    )
     serve_parser.add_argument("--host", default=None, help="HTTP host (default: 0.0.0.0)")
     serve_parser.add_argument("--port", type=int, default=None, help="HTTP port (default: 8000)")
     serve_parser.add_argument("--debug", action="store_true", help="Enable Flask debug mode")
+    serve_parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(os.getenv("KOFA_MAX_CONCURRENCY", "8")),
+        help="Max concurrent tool calls in stdio mode (default: 8)",
+    )
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Pre-fork N worker processes (--http: gunicorn, --asgi: uvicorn)",
+    )
+    serve_parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.getenv("KOFA_HTTP_THREADS", "8")),
+        help="Threads per worker with --http --workers (default: 8)",
+    )
 
     # sync
     sync_parser = subparsers.add_parser("sync", help="Sync data from KOFA")
@@ -182,6 +298,51 @@ def main():
     # status
     subparsers.add_parser("status", help="Show sync status")
 
+    # snapshot
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Export/import the corpus as a local SQLite snapshot"
+    )
+    snapshot_sub = snapshot_parser.add_subparsers(dest="snapshot_command", required=True)
+    export_parser = snapshot_sub.add_parser("export", help="Dump Supabase tables to a snapshot")
+    export_parser.add_argument("path", help="Output file (gzip-compressed SQLite)")
+    import_parser = snapshot_sub.add_parser(
+        "import", help="Install a snapshot as the KOFA_BACKEND=sqlite database"
+    )
+    import_parser.add_argument("path", help="Snapshot file")
+    import_parser.add_argument(
+        "--target", default=None, help="Database path (default: KOFA_SQLITE_PATH)"
+    )
+
+    # vectors
+    vectors_parser = subparsers.add_parser(
+        "vectors", help="Export embeddings to a memory-mapped matrix for local search"
+    )
+    vectors_sub = vectors_parser.add_subparsers(dest="vectors_command", required=True)
+    vectors_export = vectors_sub.add_parser("export", help="Copy embeddings from Supabase")
+    vectors_export.add_argument(
+        "--dtype",
+        default=None,
+        choices=["int8", "float16", "float32"],
+        help="Storage type (default: KOFA_VECTOR_DTYPE or int8)",
+    )
+    vectors_export.add_argument(
+        "--lists",
+        type=int,
+        default=None,
+        help="IVF lists (default: KOFA_VECTOR_LISTS; 0 = sqrt(rows), -1 = no IVF index)",
+    )
+    vectors_bench = vectors_sub.add_parser(
+        "bench", help="Recall and latency of IVF search against exact search"
+    )
+    vectors_bench.add_argument(
+        "--probes", default="1,2,5,10,20,50", help="Comma-separated nprobe values"
+    )
+    vectors_bench.add_argument("--queries", type=int, default=100, help="Sampled query vectors")
+    vectors_bench.add_argument("-k", type=int, default=10, help="Results per query (recall@k)")
+    for sub in (vectors_export, vectors_bench):
+        sub.add_argument("--corpus", default="all", choices=["all", "decisions", "forarbeider"])
+        sub.add_argument("--dir", default=None, help="Vector directory (default: KOFA_VECTOR_DIR)")
+
     args = parser.parse_args()
 
     if args.verbose:
@@ -195,6 +356,10 @@ def main():
         cmd_sync(args)
     elif args.command == "status":
         cmd_status(args)
+    elif args.command == "snapshot":
+        cmd_snapshot(args)
+    elif args.command == "vectors":
+        cmd_vectors(args)
     else:
         parser.print_help()
 
@@ -179,6 +179,77 @@ def _extract_text_from_html(html: str) -> str:
     return text.strip()
 
 
+# Bump when the section markers change, so stored indexes are recomputed
+SECTION_INDEX_VERSION = 1
+
+JUDGMENT_SECTIONS = ("sammendrag", "begrunnelse", "domsslutning")
+
+_PARAGRAPH_NUMBER = re.compile(r"^(\d{1,3})$", re.MULTILINE)
+
+
+def _strip_span(text: str, start: int, end: int) -> list[int]:
+    """Shrink [start, end) to exclude surrounding whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return [start, end]
+
+
+def judgment_section_index(full_text: str) -> dict:
+    """
+    Section boundaries and paragraph offsets of an EU judgment.
+
+    Section markers (in priority order):
+    - "JUDGMENT OF THE COURT" splits summary from grounds
+    - "Grounds" (old format TOC heading) as fallback for grounds start
+    - "On those grounds" splits grounds from operative part
+    - "Operative part" (old format TOC heading) as fallback
+
+    Returns {"version", "length", "sections": {name: [start, end]},
+    "paragraphs": [[number, offset], ...]}. Offsets are character offsets
+    into full_text; empty sections have start == end. Paragraphs are the
+    consecutively numbered paragraphs of the grounds.
+    """
+    judgment_marker = re.search(r"JUDGMENT OF THE (?:COURT|GENERAL COURT)", full_text)
+    if not judgment_marker:
+        judgment_marker = re.search(r"\nGrounds\n", full_text)
+
+    operative_marker = re.search(r"On those grounds.*?(?:hereby|:)\s*", full_text, re.DOTALL)
+    if not operative_marker:
+        operative_marker = re.search(r"\nOperative part\n", full_text)
+
+    length = len(full_text)
+    if judgment_marker and operative_marker:
+        grounds_start, operative_start = judgment_marker.start(), operative_marker.start()
+        spans = [(0, grounds_start), (grounds_start, operative_start), (operative_start, length)]
+    elif judgment_marker:
+        grounds_start = judgment_marker.start()
+        spans = [(0, grounds_start), (grounds_start, length), (length, length)]
+    else:
+        # No markers found — the full text is the grounds
+        spans = [(0, 0), (0, length), (length, length)]
+
+    sections = {
+        name: _strip_span(full_text, start, end)
+        for name, (start, end) in zip(JUDGMENT_SECTIONS, spans, strict=True)
+    }
+
+    paragraphs: list[list[int]] = []
+    grounds_start, grounds_end = sections["begrunnelse"]
+    for match in _PARAGRAPH_NUMBER.finditer(full_text, grounds_start, grounds_end):
+        number = int(match.group(1))
+        if number == len(paragraphs) + 1:
+            paragraphs.append([number, match.start()])
+
+    return {
+        "version": SECTION_INDEX_VERSION,
+        "length": length,
+        "sections": sections,
+        "paragraphs": paragraphs,
+    }
+
+
 class EurLexFetcher:
     """Fetch and parse EU Court judgments from EUR-Lex."""
 
@@ -0,0 +1,343 @@
+"""
+Background jobs for long-running KOFA operations (sync).
+
+A job runs in its own daemon thread and records progress reported by the
+backend `sync_*` methods (their stats dicts). Jobs are kept in memory and,
+with a jobs directory, as JSON files shared by the workers of a pre-forked
+server, so any worker can answer a poll by id (the `status` tool) while
+the job runs and for a while after it finishes. A lock file per kind keeps
+one running job of a kind across all of them. A job's `progress_to` says
+where its starter wants progress sent, so another worker can relay it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: jobs are kept per process
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Job state shared by the processes of one server ("" = in memory only)
+JOBS_DIR = os.getenv(
+    "KOFA_JOBS_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "kofa", "jobs"),
+)
+
+# Finished jobs kept for polling (oldest dropped first)
+MAX_FINISHED_JOBS = int(os.getenv("KOFA_MAX_FINISHED_JOBS", "20"))
+
+# Minimum seconds between progress events within one stage
+PROGRESS_INTERVAL = float(os.getenv("KOFA_PROGRESS_INTERVAL", "1.0"))
+
+# Attempts to start a job while another process is starting or finishing one
+CLAIM_RETRIES = 50
+
+RUNNING, DONE, FAILED = "running", "done", "failed"
+
+
+@dataclass
+class Job:
+    """State of one background job."""
+
+    id: str
+    kind: str
+    params: dict[str, Any]
+    status: str = RUNNING
+    stage: str | None = None
+    stages_done: int = 0
+    done: int = 0
+    total: int | None = None
+    stats: dict[str, Any] = field(default_factory=dict)
+    result: str | None = None
+    error: str | None = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    # Recipient of progress notifications (e.g. MCP progress token and session)
+    progress_to: dict[str, Any] | None = None
+    listener: Callable[[Job], None] | None = field(default=None, repr=False)
+    _last_event: float = field(default=0.0, repr=False)
+
+    def report(self, stage: str, stats: dict[str, Any], done: int, total: int | None) -> None:
+        """Record progress from a sync stage; notifies the listener (throttled)."""
+        if stage != self.stage:
+            if self.stage is not None:
+                self.stages_done += 1
+            self.stage = stage
+            self._last_event = 0.0
+        self.stats = dict(stats)
+        self.done, self.total = done, total
+        now = time.monotonic()
+        if now - self._last_event >= PROGRESS_INTERVAL:
+            self._last_event = now
+            self._notify()
+
+    def _notify(self) -> None:
+        if self.listener is None:
+            return
+        try:
+            self.listener(self)
+        except Exception as e:
+            logger.warning(f"Job {self.id} progress listener failed: {e}")
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self) -> dict[str, Any]:
+        """Persistent state (without the listener and throttling state)."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.repr}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Job:
+        names = {f.name for f in fields(cls) if f.repr}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+class JobManager:
+    """
+    Starts jobs in daemon threads and keeps them for polling.
+
+    With a `directory`, state is also saved there on every progress event,
+    and jobs started by other processes using the same directory can be
+    polled too. A running job holds an flock on `<kind>.lock`, which also
+    tells a stale "running" file (its process died) from a live one.
+    """
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS, directory: str | None = JOBS_DIR):
+        self.max_finished = max_finished
+        self.directory = directory if directory and fcntl is not None else None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Jobs directory unavailable, keeping jobs per process: {e}")
+                self.directory = None
+
+    def start(
+        self,
+        kind: str,
+        target: Callable[[Job], str],
+        params: dict[str, Any] | None = None,
+        listener: Callable[[Job], None] | None = None,
+        progress_to: dict[str, Any] | None = None,
+    ) -> Job:
+        """
+        Run `target(job)` in a new thread and return the job at once.
+
+        The return value of `target` becomes `job.result`. Only one job of a
+        kind runs at a time (across processes sharing the directory): if one
+        is running, it is returned instead. `progress_to` is saved with the
+        job for processes that relay its progress.
+        """
+        with self._lock:
+            running = self._running_here(kind)
+            if running is not None:
+                return running
+            job = Job(
+                id=uuid.uuid4().hex[:12], kind=kind, params=params or {}, progress_to=progress_to
+            )
+            lock_fd = self._claim(job)
+            for _ in range(CLAIM_RETRIES):
+                if lock_fd is not False:
+                    break
+                # Another process holds the lock: return its job (saved right
+                # after locking), or claim again if it has just finished
+                running = self._running_elsewhere(kind)
+                if running is not None:
+                    return running
+                time.sleep(0.02)
+                lock_fd = self._claim(job)
+            else:
+                raise RuntimeError(f"A {kind} job is starting in another process")
+            job.listener = self._persisting(listener)
+            self._save(job)
+            self._jobs[job.id] = job
+            self._prune()
+
+        def run() -> None:
+            try:
+                job.result = target(job)
+                job.status = DONE
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({kind}) failed: {e}")
+                job.error = str(e)
+                job.status = FAILED
+            job.finished_at = time.time()
+            job._notify()
+            if lock_fd is not None:
+                os.close(lock_fd)  # releases the flock after the final state is saved
+
+        threading.Thread(target=run, name=f"kofa-job-{job.id}", daemon=True).start()
+        logger.info(f"Started {kind} job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """A job of this process, else one saved by another process."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or not self.directory:
+            return job
+        job = self._load(job_id)
+        if job is not None and job.status == RUNNING and self._lock_holder(job.kind) != job.id:
+            # Its process exited without finishing it
+            job.status = FAILED
+            job.error = job.error or "avbrutt (serverprosessen stoppet)"
+        return job
+
+    def running(self, kind: str | None = None) -> Job | None:
+        """The running job of `kind` (any kind if None), if any, in any process."""
+        running = self._running_here(kind)
+        if running is not None or not self.directory:
+            return running
+        kinds = [kind] if kind is not None else self._locked_kinds()
+        for k in kinds:
+            running = self._running_elsewhere(k)
+            if running is not None:
+                return running
+        return None
+
+    def list(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def elsewhere(self) -> list[Job]:
+        """Jobs saved by other processes sharing the directory, as get() sees them."""
+        if not self.directory:
+            return []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        with self._lock:
+            own = set(self._jobs)
+        jobs = []
+        for name in names:
+            job_id = name.removesuffix(".json")
+            if name.endswith(".json") and job_id not in own:
+                job = self.get(job_id)
+                if job is not None:
+                    jobs.append(job)
+        return jobs
+
+    def _running_here(self, kind: str | None) -> Job | None:
+        for job in list(self._jobs.values()):
+            if job.status == RUNNING and (kind is None or job.kind == kind):
+                return job
+        return None
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status != RUNNING]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            if self.directory:
+                with contextlib.suppress(OSError):
+                    os.remove(self._path(job_id))
+
+    # -- shared state ---------------------------------------------------------
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory or "", f"{job_id}.json")
+
+    def _lock_path(self, kind: str) -> str:
+        return os.path.join(self.directory or "", f"{kind}.lock")
+
+    def _persisting(self, listener: Callable[[Job], None] | None) -> Callable[[Job], None] | None:
+        """Wrap `listener` so every progress event also saves the job."""
+        if not self.directory:
+            return listener
+
+        def save_and_notify(job: Job) -> None:
+            self._save(job)
+            if listener is not None:
+                listener(job)
+
+        return save_and_notify
+
+    def _save(self, job: Job) -> None:
+        if not self.directory:
+            return
+        path = self._path(job.id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f, default=str)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not save job {job.id}: {e}")
+
+    def _load(self, job_id: str) -> Job | None:
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _claim(self, job: Job) -> int | None | bool:
+        """
+        Take the lock for `job.kind` and record `job.id` in it.
+
+        Returns the lock's file descriptor (held until the job finishes),
+        None without a directory, or False if another process holds it.
+        """
+        if not self.directory:
+            return None
+        fd = os.open(self._lock_path(job.kind), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, job.id.encode())
+        return fd
+
+    def _lock_holder(self, kind: str) -> str | None:
+        """Id of the job holding the lock for `kind`, or None if it is free."""
+        path = self._lock_path(kind)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return os.pread(fd, 64, 0).decode(errors="replace").strip() or None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return None
+        finally:
+            os.close(fd)
+
+    def _locked_kinds(self) -> list[str]:
+        try:
+            names = os.listdir(self.directory or "")
+        except OSError:
+            return []
+        return [name.removesuffix(".lock") for name in names if name.endswith(".lock")]
+
+    def _running_elsewhere(self, kind: str) -> Job | None:
+        """The running job of `kind` in another process, if any."""
+        job_id = self._lock_holder(kind)
+        if job_id in self._jobs:
+            # Our own job, finished but not yet unlocked
+            return None
+        job = self._load(job_id) if job_id else None
+        return job if job is not None and job.status == RUNNING else None
@@ -0,0 +1,75 @@
+"""
+Pre-forking production HTTP server for KOFA MCP (gunicorn).
+
+The master process builds the Flask app and MCPServer and warms them up
+(imports, service construction, a first backend round trip) before
+forking, so workers start with everything loaded. Each worker then
+replaces the inherited backend connections and warms its own before it
+accepts requests, and /mcp/health reports 503 until that has succeeded.
+
+Usage:
+    kofa serve --http --workers 4 --threads 8
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv("KOFA_HTTP_WORKERS", "2"))
+DEFAULT_THREADS = int(os.getenv("KOFA_HTTP_THREADS", "8"))
+# gunicorn kills workers silent for longer than this; above the longest tool deadline
+WORKER_TIMEOUT = int(os.getenv("KOFA_HTTP_WORKER_TIMEOUT", "120"))
+
+
+def create_app(server=None):
+    """Create the Flask app serving MCP under /mcp."""
+    from flask import Flask
+
+    from kofa.web import create_mcp_blueprint
+
+    app = Flask("kofa")
+    app.register_blueprint(create_mcp_blueprint(server), url_prefix="/mcp")
+    return app
+
+
+def run_prefork(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = DEFAULT_WORKERS,
+    threads: int = DEFAULT_THREADS,
+) -> None:
+    """Warm up once, fork `workers` gthread workers and serve until stopped."""
+    from gunicorn.app.base import BaseApplication  # pyright: ignore[reportMissingImports]
+
+    from kofa import KofaService, MCPServer
+
+    server = MCPServer(KofaService())
+    server.warm_up()
+    app = create_app(server)
+
+    def post_worker_init(worker) -> None:
+        server.after_fork()
+        server.warm_up()
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": max(1, workers),
+        "threads": max(1, threads),
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": WORKER_TIMEOUT,
+        "post_worker_init": post_worker_init,
+    }
+
+    class KofaApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    KofaApplication().run()
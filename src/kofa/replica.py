@@ -0,0 +1,551 @@
+"""
+In-process columnar replica of the case corpus.
+
+The cases, their decision text paragraphs and the law/case/EU reference
+tables fit comfortably in memory, so with KOFA_REPLICA=true they are
+loaded once per data version into compact columns and lookups, section
+filters and reference queries are answered without a backend round trip:
+
+- every string value is stored once in a StringPool; columns are
+  array("I") of pool ids (0 = NULL)
+- paragraph texts are concatenated into one UTF-8 buffer, with an
+  array("Q") of byte offsets; each case has a [lo, hi) paragraph range
+- per-key row indexes (law name, cited case, EU case id) are arrays of
+  row numbers in the order the backend would return them
+
+ReplicaBackend wraps a backend like CachedBackend does. Until the replica
+is loaded, and while it reloads after a data version change, reads are
+passed through to the backend.
+"""
+
+from __future__ import annotations
+
+import bisect
+import inspect
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ENABLED = os.getenv("KOFA_REPLICA", "false").lower() == "true"
+
+# Seconds before a failed load is retried
+_RETRY_AFTER = 60.0
+
+CASE_COLUMNS = (
+    "sak_nr",
+    "slug",
+    "page_url",
+    "wp_id",
+    "wp_modified",
+    "summary",
+    "published",
+    "innklaget",
+    "klager",
+    "sakstype",
+    "avgjoerelse",
+    "saken_gjelder",
+    "regelverk",
+    "konkurranseform",
+    "prosedyre",
+    "avsluttet",
+    "pdf_url",
+)
+PARAGRAPH_COLUMNS = ("id", "sak_nr", "paragraph_number", "section", "text")
+LAW_REF_COLUMNS = (
+    "id",
+    "sak_nr",
+    "law_name",
+    "law_section",
+    "raw_text",
+    "context",
+    "regulation_version",
+)
+CASE_REF_COLUMNS = ("id", "from_sak_nr", "to_sak_nr")
+EU_REF_COLUMNS = ("id", "sak_nr", "eu_case_id", "eu_case_name", "context")
+
+# Case fields embedded in reference results, like PostgREST's kofa_cases(...)
+_EMBED_COLUMNS = ("innklaget", "avgjoerelse", "saken_gjelder", "avsluttet")
+
+
+class StringPool:
+    """Interned values addressed by small integer ids; id 0 is None."""
+
+    def __init__(self) -> None:
+        self.values: list[Any] = [None]
+        self._ids: dict[Hashable, int] = {None: 0}
+
+    def add(self, value: Hashable) -> int:
+        ident = self._ids.get(value)
+        if ident is None:
+            ident = self._ids[value] = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return ident
+
+    def id_of(self, value: Hashable) -> int | None:
+        return self._ids.get(value)
+
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self.values)
+            + sys.getsizeof(self._ids)
+            + sum(sys.getsizeof(v) for v in self.values)
+        )
+
+
+class _Columns:
+    """Named array("I") columns of pool ids, one entry per row."""
+
+    def __init__(self, pool: StringPool, names: Iterable[str]):
+        self.pool = pool
+        self.cols = {name: array("I") for name in names}
+
+    def append(self, row: dict) -> None:
+        for name, col in self.cols.items():
+            col.append(self.pool.add(row.get(name)))
+
+    def get(self, name: str, i: int) -> Any:
+        return self.pool.values[self.cols[name][i]]
+
+    def row(self, i: int, names: Iterable[str]) -> dict:
+        values = self.pool.values
+        return {name: values[self.cols[name][i]] for name in names}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.cols.values()), ()))
+
+    def nbytes(self) -> int:
+        return sum(len(c) * c.itemsize for c in self.cols.values())
+
+
+def _index(keys: Iterable[Hashable], order: Iterable[int]) -> dict[Any, array]:
+    """Rows grouped by key id, each group in `order`."""
+    groups: dict[Any, list[int]] = {}
+    keys = list(keys)
+    for i in order:
+        groups.setdefault(keys[i], []).append(i)
+    return {k: array("I", rows) for k, rows in groups.items()}
+
+
+def _index_nbytes(index: dict[Any, array]) -> int:
+    return sys.getsizeof(index) + sum(len(a) * a.itemsize + 64 for a in index.values())
+
+
+def _desc_by(col: array, pool: StringPool) -> list[int]:
+    """Row numbers sorted by the column's value, descending (stable)."""
+    values = pool.values
+    return sorted(range(len(col)), key=lambda i: values[col[i]] or "", reverse=True)
+
+
+def _section_match(value: str | None, section: str) -> bool:
+    """Law section prefix match: '16-10' matches '16-10', '16-10 (1)', etc."""
+    return value is not None and (value == section or value.startswith(section + " "))
+
+
+class CorpusReplica:
+    """Columnar in-memory copy of cases, decision text and references."""
+
+    def __init__(self) -> None:
+        self.pool = StringPool()
+        self.cases = _Columns(self.pool, CASE_COLUMNS)
+        self.case_row: dict[str, int] = {}
+        self.para_lo = array("I")
+        self.para_hi = array("I")
+        self.para_number = array("i")
+        self.para_section = array("I")
+        self.para_offsets = array("Q", [0])
+        self.text = b""
+        self.recent = array("I")
+        self.law_refs = _Columns(self.pool, LAW_REF_COLUMNS[1:])
+        self.case_refs = _Columns(self.pool, CASE_REF_COLUMNS[1:])
+        self.eu_refs = _Columns(self.pool, EU_REF_COLUMNS[1:])
+        self.law_index: dict[int, array] = {}
+        self.law_rank = array("I")
+        self.section_index: dict[tuple[int, str], array] = {}
+        self.cites_index: dict[int, array] = {}
+        self.cited_by_index: dict[int, array] = {}
+        self.eu_index: dict[int, array] = {}
+        self.data_version: str | None = None
+        self.load_seconds = 0.0
+
+    @classmethod
+    def load(cls, backend: Any) -> CorpusReplica:
+        """Read the tables from `backend` (via scan_table) into a new replica."""
+        started = time.monotonic()
+        replica = cls()
+        replica.data_version = backend.get_data_version()
+        replica._load_cases(backend.scan_table("kofa_cases", list(CASE_COLUMNS), "sak_nr"))
+        replica._load_paragraphs(
+            backend.scan_table("kofa_decision_text", list(PARAGRAPH_COLUMNS), "id")
+        )
+        for table, columns, target in (
+            ("kofa_law_references", LAW_REF_COLUMNS, replica.law_refs),
+            ("kofa_case_references", CASE_REF_COLUMNS, replica.case_refs),
+            ("kofa_eu_references", EU_REF_COLUMNS, replica.eu_refs),
+        ):
+            for row in backend.scan_table(table, list(columns), "id"):
+                target.append(row)
+        replica._build_indexes()
+        replica.load_seconds = time.monotonic() - started
+        return replica
+
+    def _load_cases(self, rows: Iterable[dict]) -> None:
+        for row in sorted(rows, key=lambda r: r["sak_nr"]):
+            self.case_row[row["sak_nr"]] = len(self.cases)
+            self.cases.append(row)
+        avsluttet = self.cases.cols["avsluttet"]
+        self.recent = array("I", _desc_by(avsluttet, self.pool))
+
+    def _load_paragraphs(self, rows: Iterable[dict]) -> None:
+        case_row = self.case_row
+        paragraphs = sorted(
+            (case_row[r["sak_nr"]], r["paragraph_number"], r["section"], r["text"])
+            for r in rows
+            if r["sak_nr"] in case_row
+        )
+        n_cases = len(self.cases)
+        self.para_lo = array("I", [0] * n_cases)
+        self.para_hi = array("I", [0] * n_cases)
+        chunks = []
+        for i, (case, number, section, text) in enumerate(paragraphs):
+            if i == 0 or paragraphs[i - 1][0] != case:
+                self.para_lo[case] = i
+            self.para_hi[case] = i + 1
+            self.para_number.append(number)
+            self.para_section.append(self.pool.add(section))
+            chunks.append((text or "").encode())
+        self.text = b"".join(chunks)
+        self.para_offsets = array("Q", itertools.accumulate((len(c) for c in chunks), initial=0))
+
+    def _build_indexes(self) -> None:
+        pool = self.pool
+        law = self.law_refs.cols
+        law_order = _desc_by(law["sak_nr"], pool)
+        self.law_index = _index(law["law_name"], law_order)
+        self.law_rank = array("I", [0] * len(law_order))
+        for rank, i in enumerate(law_order):
+            self.law_rank[i] = rank
+        # (law, section head) -> rows: '16-10' and '16-10 (1)' both have head '16-10'
+        heads = [
+            (name, (pool.values[section] or "").partition(" ")[0])
+            for name, section in zip(law["law_name"], law["law_section"], strict=True)
+        ]
+        self.section_index = _index(heads, law_order)
+        case = self.case_refs.cols
+        self.cites_index = _index(case["from_sak_nr"], range(len(self.case_refs)))
+        self.cited_by_index = _index(case["to_sak_nr"], _desc_by(case["from_sak_nr"], pool))
+        eu = self.eu_refs.cols
+        self.eu_index = _index(eu["eu_case_id"], _desc_by(eu["sak_nr"], pool))
+
+    def _rows_for(self, index: dict[int, array], value: str) -> array:
+        ident = self.pool.id_of(value)
+        return index.get(ident, array("I")) if ident else array("I")
+
+    def _embed(self, sak_nr: str) -> dict | None:
+        row = self.case_row.get(sak_nr)
+        return self.cases.row(row, _EMBED_COLUMNS) if row is not None else None
+
+    # =========================================================================
+    # Backend read API (same results as KofaSupabaseBackend)
+    # =========================================================================
+
+    def get_case(self, sak_nr: str) -> dict | None:
+        row = self.case_row.get(sak_nr)
+        return self.cases.row(row, CASE_COLUMNS) if row is not None else None
+
+    def get_cases(self, sak_nrs: list[str]) -> list[dict]:
+        return [case for case in map(self.get_case, dict.fromkeys(sak_nrs)) if case is not None]
+
+    def get_paragraphs(self, keys: list[tuple[str, int]]) -> list[dict]:
+        values, offsets, numbers = self.pool.values, self.para_offsets, self.para_number
+        paragraphs = []
+        for sak_nr, number in dict.fromkeys(keys):
+            row = self.case_row.get(sak_nr)
+            if row is None:
+                continue
+            # A case's paragraphs are stored in paragraph_number order
+            i = bisect.bisect_left(numbers, number, self.para_lo[row], self.para_hi[row])
+            if i < self.para_hi[row] and numbers[i] == number:
+                paragraphs.append(
+                    {
+                        "sak_nr": sak_nr,
+                        "paragraph_number": number,
+                        "section": values[self.para_section[i]],
+                        "text": self.text[offsets[i] : offsets[i + 1]].decode(),
+                    }
+                )
+        return paragraphs
+
+    def get_decision_text(self, sak_nr: str, section: str | None = None) -> list[dict]:
+        row = self.case_row.get(sak_nr)
+        if row is None:
+            return []
+        values, offsets = self.pool.values, self.para_offsets
+        paragraphs = []
+        for i in range(self.para_lo[row], self.para_hi[row]):
+            sec = values[self.para_section[i]]
+            if section and sec != section:
+                continue
+            text = self.text[offsets[i] : offsets[i + 1]].decode()
+            paragraphs.append(
+                {"paragraph_number": self.para_number[i], "section": sec, "text": text}
+            )
+            if len(paragraphs) == 500:
+                break
+        return paragraphs
+
+    def recent_cases(
+        self,
+        limit: int = 20,
+        sakstype: str | None = None,
+        avgjoerelse: str | None = None,
+        innklaget: str | None = None,
+    ) -> list[dict]:
+        cases = self.cases
+        needle = innklaget.lower() if innklaget else None
+        results = []
+        for row in self.recent:
+            if sakstype and cases.get("sakstype", row) != sakstype:
+                continue
+            if avgjoerelse and cases.get("avgjoerelse", row) != avgjoerelse:
+                continue
+            if needle and needle not in (cases.get("innklaget", row) or "").lower():
+                continue
+            results.append(cases.row(row, CASE_COLUMNS))
+            if len(results) == limit:
+                break
+        return results
+
+    def _law_ref(self, i: int) -> dict:
+        ref = self.law_refs.row(i, LAW_REF_COLUMNS[1:])
+        ref["kofa_cases"] = self._embed(ref["sak_nr"])
+        return ref
+
+    def _law_rows(self, law_name: str, sections: list[str]) -> Iterator[int]:
+        """Reference rows of a law (sak_nr descending), optionally by section prefix."""
+        law = self.pool.id_of(law_name)
+        if not law:
+            return iter(())
+        if not sections:
+            return iter(self.law_index.get(law, ()))
+        law_section = self.law_refs.cols["law_section"]
+        values = self.pool.values
+
+        def rows(section: str) -> Iterator[int]:
+            for i in self.section_index.get((law, section.partition(" ")[0]), ()):
+                if _section_match(values[law_section[i]], section):
+                    yield i
+
+        matches = [rows(section) for section in dict.fromkeys(sections)]
+        if len(matches) == 1:
+            return matches[0]
+        return iter(sorted(set(itertools.chain(*matches)), key=self.law_rank.__getitem__))
+
+    def find_by_law_reference(
+        self, law_name: str, section: str | None = None, limit: int = 20
+    ) -> list[dict]:
+        rows = self._law_rows(law_name, [section] if section else [])
+        return [self._law_ref(i) for i in itertools.islice(rows, limit)]
+
+    def find_cases_by_sections(
+        self, law_name: str, sections: list[str], limit: int = 20
+    ) -> list[dict]:
+        if not sections:
+            return []
+        matching: set[str] | None = None
+        for section in sections:
+            sak_nrs = {self.law_refs.get("sak_nr", i) for i in self._law_rows(law_name, [section])}
+            matching = sak_nrs if matching is None else matching & sak_nrs
+            if not matching:
+                return []
+        assert matching is not None
+        keep = set(sorted(matching, reverse=True)[:limit])
+        return [
+            self._law_ref(i)
+            for i in self._law_rows(law_name, sections)
+            if self.law_refs.get("sak_nr", i) in keep
+        ]
+
+    def count_cases_by_section(self, law_name: str, section: str) -> int:
+        return sum(1 for _ in self._law_rows(law_name, [section]))
+
+    def find_related_cases(self, sak_nr: str) -> dict:
+        refs = self.case_refs
+        cited = sorted({refs.get("to_sak_nr", i) for i in self._rows_for(self.cites_index, sak_nr)})
+        found = [nr for nr in cited if nr in self.case_row]
+        cites = [{"sak_nr": nr, **(self._embed(nr) or {})} for nr in found]
+        cites += [{"sak_nr": nr} for nr in cited if nr not in self.case_row]
+
+        seen: set[str] = set()
+        cited_by = []
+        for i in self._rows_for(self.cited_by_index, sak_nr):
+            nr = refs.get("from_sak_nr", i)
+            if nr in seen:
+                continue
+            seen.add(nr)
+            cited_by.append({"sak_nr": nr, **(self._embed(nr) or {})})
+        return {"sak_nr": sak_nr, "cites": cites, "cited_by": cited_by}
+
+    def find_by_eu_case(self, eu_case_id: str, limit: int = 20) -> list[dict]:
+        results = []
+        for i in self._rows_for(self.eu_index, eu_case_id)[:limit]:
+            ref = self.eu_refs.row(i, EU_REF_COLUMNS[1:])
+            ref["kofa_cases"] = self._embed(ref["sak_nr"])
+            results.append(ref)
+        return results
+
+    def list_known_ids(self, space: str) -> set[str]:
+        if space != "sak_nr":
+            raise KeyError(space)
+        return set(self.case_row)
+
+    # =========================================================================
+    # Footprint
+    # =========================================================================
+
+    def stats(self) -> dict[str, Any]:
+        """Row counts, approximate memory footprint (bytes) and load time."""
+        arrays = (self.para_lo, self.para_hi, self.para_number, self.para_section)
+        nbytes = (
+            self.pool.nbytes()
+            + self.cases.nbytes()
+            + sys.getsizeof(self.case_row)
+            + len(self.recent) * self.recent.itemsize
+            + len(self.law_rank) * self.law_rank.itemsize
+            + sum(len(a) * a.itemsize for a in arrays)
+            + len(self.para_offsets) * self.para_offsets.itemsize
+            + len(self.text)
+            + self.law_refs.nbytes()
+            + self.case_refs.nbytes()
+            + self.eu_refs.nbytes()
+            + sum(
+                _index_nbytes(index)
+                for index in (
+                    self.law_index,
+                    self.section_index,
+                    self.cites_index,
+                    self.cited_by_index,
+                    self.eu_index,
+                )
+            )
+        )
+        return {
+            "cases": len(self.cases),
+            "paragraphs": len(self.para_number),
+            "references": len(self.law_refs) + len(self.case_refs) + len(self.eu_refs),
+            "strings": len(self.pool.values) - 1,
+            "bytes": nbytes,
+            "text_bytes": len(self.text),
+            "load_seconds": self.load_seconds,
+            "data_version": self.data_version,
+        }
+
+
+class ReplicaBackend:
+    """
+    Backend proxy answering LOCAL_METHODS from a CorpusReplica.
+
+    Everything else, and every read while no replica is loaded, goes to
+    the wrapped backend. load() blocks; refresh() reloads in a background
+    thread.
+    """
+
+    LOCAL_METHODS = (
+        "get_case",
+        "get_cases",
+        "get_decision_text",
+        "get_paragraphs",
+        "recent_cases",
+        "find_by_law_reference",
+        "find_cases_by_sections",
+        "count_cases_by_section",
+        "find_related_cases",
+        "find_by_eu_case",
+    )
+    # Served in-process: CachedBackend does not cache these (see cache.py)
+    local_methods = frozenset(LOCAL_METHODS)
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.replica: CorpusReplica | None = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self._failed_at = 0.0
+        for name in self.LOCAL_METHODS:
+            setattr(self, name, self._local(name))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.backend, name)
+
+    def _local(self, name: str) -> Callable[..., Any]:
+        def local(*args: Any, **kwargs: Any) -> Any:
+            replica = self.replica
+            if replica is None:
+                self.refresh()
+                return getattr(self.backend, name)(*args, **kwargs)
+            return getattr(replica, name)(*args, **kwargs)
+
+        local.__name__ = name
+        # Same parameters as the backend method (CachedBackend binds calls to it)
+        local.__signature__ = inspect.signature(getattr(self.backend, name))  # type: ignore[attr-defined]
+        return local
+
+    def list_known_ids(self, space: str) -> set[str]:
+        replica = self.replica
+        if replica is not None and space == "sak_nr":
+            return replica.list_known_ids(space)
+        return self.backend.list_known_ids(space)
+
+    def load(self) -> CorpusReplica:
+        """Load a new replica from the backend (blocking) and serve from it."""
+        replica = CorpusReplica.load(self.backend)
+        self.replica = replica
+        stats = replica.stats()
+        logger.info(
+            f"Replica loaded in {stats['load_seconds']:.1f}s: {stats['cases']} cases, "
+            f"{stats['paragraphs']} paragraphs, {stats['references']} references, "
+            f"{stats['bytes'] / 1e6:.1f} MB"
+        )
+        return replica
+
+    def refresh(self) -> None:
+        """Start a background load unless one is running or recently failed."""
+        with self._lock:
+            if self._loading or time.monotonic() - self._failed_at < _RETRY_AFTER:
+                return
+            self._loading = True
+
+        def run() -> None:
+            try:
+                self.load()
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                logger.warning(f"Could not load replica: {e}")
+            finally:
+                self._loading = False
+
+        threading.Thread(target=run, name="kofa-replica", daemon=True).start()
+
+    def clear(self) -> None:
+        """Stop serving the current replica (the data changed) and reload it."""
+        self.replica = None
+        self._failed_at = 0.0
+        self.refresh()
+
+    def reconnect(self) -> None:
+        # A load thread does not survive fork(); the lock may be held by it
+        self._lock = threading.Lock()
+        self._loading = False
+        self.backend.reconnect()
+
+    def stats(self) -> dict[str, Any] | None:
+        """Replica statistics, or None while none is loaded."""
+        replica = self.replica
+        return replica.stats() if replica is not None else None
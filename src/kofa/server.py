@@ -5,9 +5,26 @@ Implements the Model Context Protocol (MCP) JSON-RPC interface
 for exposing KOFA decision lookup tools to AI assistants.
 """
 
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any
 
+from kofa._schema import ArgumentError, Validator, compile_validator
+from kofa._supabase_utils import CallBudget, DeadlineExceeded, RequestCancelled, call_budget
+from kofa.backend import supports_sync
+from kofa.cache import MISSING, LRUCache
+from kofa.jobs import RUNNING, Job, JobManager
 from kofa.service import KofaService
 
 logger = logging.getLogger(__name__)
@@ -16,6 +33,62 @@ logger = logging.getLogger(__name__)
 # MCP Protocol version
 PROTOCOL_VERSION = "2025-06-18"
 
+# Worker pool size for JSON-RPC batch requests
+BATCH_MAX_WORKERS = int(os.getenv("KOFA_BATCH_MAX_WORKERS", "8"))
+
+# Worker pool that tool handlers run in, so a caller can stop waiting at the
+# deadline or on cancellation even if a backend call is stuck
+TOOL_MAX_WORKERS = int(os.getenv("KOFA_TOOL_MAX_WORKERS", "32"))
+
+# Default per-call deadline in seconds (0 = no deadline)
+TOOL_TIMEOUT = float(os.getenv("KOFA_TOOL_TIMEOUT", "30"))
+
+# Per-tool deadlines overriding TOOL_TIMEOUT (None = no deadline)
+TOOL_TIMEOUTS: dict[str, float | None] = {
+    "semantisk_sok_kofa": 45.0,
+    "semantisk_sok_forarbeider": 45.0,
+    "sync": None,
+}
+
+# JSON-RPC error code for a request cancelled via notifications/cancelled
+REQUEST_CANCELLED = -32800
+
+# progressToken from the current tools/call request's _meta, if any
+_progress_token: ContextVar[Any] = ContextVar("kofa_progress_token", default=None)
+# Set by handle_tools_call when the result is fallback output (see mark_degraded)
+_degraded_result: ContextVar[bool] = ContextVar("kofa_degraded_result", default=False)
+# Client session the current request belongs to (None = transport without sessions)
+_session: ContextVar[str | None] = ContextVar("kofa_session", default=None)
+
+
+@contextlib.contextmanager
+def in_session(session_id: str | None) -> Iterator[None]:
+    """
+    Handle the enclosed requests on behalf of client session `session_id`.
+
+    JSON-RPC request ids are only unique per client, so in-flight calls are
+    tracked (and cancelled) per (session, request id).
+    """
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+# Read-only tools whose output is not a pure function of (arguments, data version)
+UNCACHEABLE_TOOLS = frozenset({"status"})
+
+# Formatted responses of cacheable tools kept per (data version, tool, arguments)
+RESPONSE_MEMO_SIZE = int(os.getenv("KOFA_RESPONSE_MEMO_SIZE", "512"))
+
+# Background warm-up retries while not ready: first delay and cap in seconds
+WARMUP_RETRY_BASE = float(os.getenv("KOFA_WARMUP_RETRY_BASE", "1"))
+WARMUP_RETRY_MAX = float(os.getenv("KOFA_WARMUP_RETRY_MAX", "60"))
+
+# Seconds between polls of jobs run by other workers, while their progress is awaited here
+PROGRESS_RELAY_INTERVAL = float(os.getenv("KOFA_PROGRESS_RELAY_INTERVAL", "1.0"))
+
 # Server info
 SERVER_INFO = {
     "name": "kofa",
@@ -41,9 +114,9 @@ gebyrsaker (overtredelsesgebyr ved ulovlige direkte anskaffelser).
 | `siste_saker(limit?, sakstype?, avgjoerelse?, innklaget?)` | Siste avgjørelser med filtre |
 | `finn_praksis(lov, paragraf?, paragrafer?, limit?)` | Finn saker som refererer til lovparagraf(er) — AND-semantikk for flere |
 | `relaterte_saker(sak_nr)` | Kryssreferanser: saker denne saken siterer og saker som siterer denne |
-| `mest_siterte(limit?)` | De mest siterte/prinsipielle KOFA-sakene |
+| `mest_siterte(limit?, aar?, avgjoerelse?)` | De mest siterte/prinsipielle KOFA-sakene |
 | `eu_praksis(eu_case_id, limit?)` | Finn KOFA-saker som refererer til en bestemt EU-dom |
-| `mest_siterte_eu(limit?)` | De mest siterte EU-dommene i KOFA |
+| `mest_siterte_eu(limit?, aar?, avgjoerelse?)` | De mest siterte EU-dommene i KOFA |
 | `hent_eu_dom(eu_case_id, seksjon?)` | Hent fulltekst fra EU-dom (sammendrag, begrunnelse, domsslutning) |
 | `sok_avgjoerelse(query, seksjon?, limit?)` | Fulltekstsøk i avgjørelsesteksten (ikke metadata) |
 | `semantisk_sok_kofa(query, seksjon?, limit?)` | Semantisk søk med AI-embeddings i avgjørelsestekst |
@@ -196,6 +269,9 @@ Tilgang til lovforarbeider (proposisjoner og NOU-er) som ligger til grunn for an
 3. `hent_forarbeide(doc_id='nou-2023-26', seksjon='4.1')` → les en seksjon
 4. `sok_forarbeider("tildelingskriterier")` → søk på tvers av alle dokumenter
 
+**Lange seksjoner:** `hent_avgjoerelse`, `hent_eu_dom` og `hent_forarbeide` tar `max_tegn`
+(f.eks. 20000). Svaret deles da i sider og avsluttes med et kall med `cursor` for neste side.
+
 ## Begrensninger
 
 - **Kun metadata for saker uten PDF-tekst:** ~920 saker (trukne, pågående, eldre uten PDF) har kun parter/tema/utfall, ikke lovhenvisninger
@@ -205,12 +281,181 @@ Tilgang til lovforarbeider (proposisjoner og NOU-er) som ligger til grunn for an
 """
 
 
+def dumps(obj: Any) -> bytes:
+    """Serialize a JSON-RPC message compactly as UTF-8."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+@dataclass(frozen=True)
+class SerializedResult:
+    """A JSON-RPC result serialized once, with a strong ETag over its bytes."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, result: dict[str, Any]) -> SerializedResult:
+        body = dumps(result)
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+class NotificationHub:
+    """
+    Fan-out of server-initiated JSON-RPC notifications (e.g. progress).
+
+    Transports subscribe a send function for a client session: stdio writes
+    to stdout, HTTP pushes to open SSE streams. A notification only goes to
+    the subscribers of the session it is published for. Send functions are
+    called from arbitrary threads and must not block.
+    """
+
+    def __init__(self, on_subscribe: Callable[[str | None], None] | None = None):
+        self._subscribers: list[tuple[str | None, Callable[[dict[str, Any]], None]]] = []
+        self._lock = threading.Lock()
+        self.on_subscribe = on_subscribe
+
+    def subscribe(
+        self, send: Callable[[dict[str, Any]], None], session: str | None = None
+    ) -> Callable[[], None]:
+        """Register `send` for `session`; returns a function that unsubscribes it."""
+        subscriber = (session, send)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        if self.on_subscribe is not None:
+            self.on_subscribe(session)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def publish(self, message: dict[str, Any], session: str | None = None) -> None:
+        with self._lock:
+            subscribers = [send for s, send in self._subscribers if s == session]
+        for send in subscribers:
+            try:
+                send(message)
+            except Exception as e:
+                logger.warning(f"Dropping notification for a subscriber: {e}")
+
+    def sessions(self) -> set[str | None]:
+        """Sessions with at least one subscriber."""
+        with self._lock:
+            return {s for s, _ in self._subscribers}
+
+
+class ProgressRelay:
+    """
+    Publishes progress of jobs started by other worker processes.
+
+    In a pre-forked server the SSE stream of a session may be held by
+    another worker than the one whose POST started a job. While a stream
+    of a session is open here, the shared jobs directory is polled every
+    PROGRESS_RELAY_INTERVAL seconds, and each change to a job whose
+    `progress_to` names that session is published as the starting worker
+    would have. Without a jobs directory there is nothing to relay.
+    """
+
+    def __init__(
+        self,
+        jobs: JobManager,
+        notifications: NotificationHub,
+        listener: Callable[[Any, str | None], Callable[[Job], None]],
+    ):
+        self.jobs = jobs
+        self.notifications = notifications
+        self.listener = listener
+        self._seen: dict[str, tuple[Any, ...]] = {}
+        self._since = 0.0
+        self._polling = False
+        self._lock = threading.Lock()
+
+    def start(self, session: str | None) -> None:
+        """Poll in a daemon thread until no session has a subscriber (if not already)."""
+        if session is None or not self.jobs.directory:
+            return
+        with self._lock:
+            if self._polling:
+                return
+            self._polling = True
+        self._since = time.time()
+        threading.Thread(target=self._run, name="kofa-progress-relay", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Progress relay poll failed: {e}")
+            time.sleep(PROGRESS_RELAY_INTERVAL)
+            with self._lock:
+                if not self.notifications.sessions() - {None}:
+                    self._polling = False
+                    return
+
+    def poll(self) -> None:
+        """Publish what changed in other processes' jobs since the last poll."""
+        sessions = self.notifications.sessions()
+        seen: dict[str, tuple[Any, ...]] = {}
+        for job in self.jobs.elsewhere():
+            target = job.progress_to or {}
+            if target.get("session") not in sessions - {None}:
+                continue
+            state = (job.status, job.stage, job.stages_done, job.done)
+            seen[job.id] = state
+            if state == self._seen.get(job.id) or (job.status == RUNNING and job.stage is None):
+                continue  # unchanged, or started but nothing reported yet
+            if job.id not in self._seen and (job.finished_at or time.time()) < self._since:
+                continue  # finished before anyone here was listening
+            self.listener(target.get("token"), target["session"])(job)
+        self._seen = seen
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Registered tool: handler plus argument validator compiled from its inputSchema."""
+
+    name: str
+    handler: Callable[[dict[str, Any]], str]
+    validate: Validator
+    read_only: bool
+    cacheable: bool
+    timeout: float | None
+
+
 class MCPServer:
     """MCP Server for KOFA decision lookup tools."""
 
     def __init__(self, service: KofaService | None = None):
         self.service = service or KofaService()
         self.tools = self._define_tools()
+        self._registry = self._build_registry()
+        self._initialize_result = self._build_initialize_result()
+        self._static_results = {
+            "initialize": SerializedResult.of(self._initialize_result),
+            "tools/list": SerializedResult.of({"tools": self.tools}),
+        }
+        self._batch_executor: ThreadPoolExecutor | None = None
+        self._batch_lock = threading.Lock()
+        self._tool_executor: ThreadPoolExecutor | None = None
+        self._response_memo = LRUCache(maxsize=RESPONSE_MEMO_SIZE)
+        self.service.caches["svar"] = self._response_memo
+        self._tool_lock = threading.Lock()
+        # (session, request id) -> (budget, waker) for tool calls in flight
+        self._inflight: dict[tuple[str | None, Any], tuple[CallBudget, threading.Event]] = {}
+        self._inflight_lock = threading.Lock()
+        # (data version, call key) -> shared execution of a cacheable call
+        self._flights: dict[tuple[str, str], tuple[Future[str], CallBudget]] = {}
+        self._flights_lock = threading.Lock()
+        self.notifications = NotificationHub()
+        # Progress of jobs that other workers started for sessions streaming here
+        self._relay = ProgressRelay(self.service.jobs, self.notifications, self._progress_listener)
+        self.notifications.on_subscribe = self._relay.start
+        self.ready = False
+        self._warming = False
+        self._warm_lock = threading.Lock()
         logger.info(f"KOFA MCPServer initialized with {len(self.tools)} tools")
 
     def _define_tools(self) -> list[dict[str, Any]]:
@@ -240,6 +485,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["query"],
@@ -272,6 +518,7 @@ class MCPServer:
                     "Uten seksjon: viser innholdsfortegnelse med avsnittantall per seksjon. "
                     "Med seksjon: returnerer alle avsnitt i den seksjonen. "
                     "Gyldige seksjoner: 'innledning', 'bakgrunn', 'anfoersler', 'vurdering', 'konklusjon'. "
+                    "Lange seksjoner kan leses side for side med max_tegn og cursor. "
                     "Eks: hent_avgjoerelse(sak_nr='2023/1099', seksjon='vurdering')"
                 ),
                 "inputSchema": {
@@ -289,6 +536,18 @@ class MCPServer:
                                 "Utelat for innholdsfortegnelse."
                             ),
                         },
+                        "max_tegn": {
+                            "type": "integer",
+                            "description": (
+                                "Maks antall tegn per side. Lange seksjoner deles da "
+                                "opp, og svaret slutter med en cursor for neste side."
+                            ),
+                            "minimum": 500,
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor fra forrige side for å hente neste side.",
+                        },
                     },
                     "required": ["sak_nr"],
                 },
@@ -325,6 +584,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["query"],
@@ -364,6 +624,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 10)",
                             "default": 10,
+                            "minimum": 1,
                         },
                     },
                     "required": ["query"],
@@ -384,6 +645,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Antall saker (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                         "sakstype": {
                             "type": "string",
@@ -447,6 +709,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["lov"],
@@ -488,6 +751,18 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
+                        },
+                        "aar": {
+                            "type": "integer",
+                            "description": "Tell bare siteringer fra saker avsluttet dette året",
+                        },
+                        "avgjoerelse": {
+                            "type": "string",
+                            "description": (
+                                "Tell bare siteringer fra saker med denne avgjørelsen "
+                                "(f.eks. 'Brudd på regelverket'). Kan ikke kombineres med aar."
+                            ),
                         },
                     },
                     "required": [],
@@ -512,6 +787,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["eu_case_id"],
@@ -532,6 +808,18 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
+                        },
+                        "aar": {
+                            "type": "integer",
+                            "description": "Tell bare siteringer fra saker avsluttet dette året",
+                        },
+                        "avgjoerelse": {
+                            "type": "string",
+                            "description": (
+                                "Tell bare siteringer fra saker med denne avgjørelsen "
+                                "(f.eks. 'Brudd på regelverket'). Kan ikke kombineres med aar."
+                            ),
                         },
                     },
                     "required": [],
@@ -545,6 +833,7 @@ class MCPServer:
                     "Hent fulltekst fra en EU-domstolsavgjørelse referert i KOFA-praksis. "
                     "Uten seksjon: viser metadata og innholdsfortegnelse. "
                     "Med seksjon: 'sammendrag', 'begrunnelse', 'domsslutning'. "
+                    "Lange seksjoner kan leses side for side med max_tegn og cursor. "
                     "Eks: hent_eu_dom(eu_case_id='C-19/00', seksjon='begrunnelse')"
                 ),
                 "inputSchema": {
@@ -561,6 +850,18 @@ class MCPServer:
                                 "Utelat for innholdsfortegnelse."
                             ),
                         },
+                        "max_tegn": {
+                            "type": "integer",
+                            "description": (
+                                "Maks antall tegn per side. Lange seksjoner deles da "
+                                "opp, og svaret slutter med en cursor for neste side."
+                            ),
+                            "minimum": 500,
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor fra forrige side for å hente neste side.",
+                        },
                     },
                     "required": ["eu_case_id"],
                 },
@@ -583,7 +884,11 @@ class MCPServer:
                         },
                         "gruppering": {
                             "type": "string",
-                            "description": ("Felt å gruppere på: 'avgjoerelse', 'sakstype'"),
+                            "description": (
+                                "Felt å gruppere på: 'avgjoerelse', 'sakstype', "
+                                "'regelverk', 'konkurranseform'"
+                            ),
+                            "enum": ["avgjoerelse", "sakstype", "regelverk", "konkurranseform"],
                             "default": "avgjoerelse",
                         },
                     },
@@ -600,7 +905,8 @@ class MCPServer:
                     "Uten argumenter: viser tilgjengelige dokumenter. "
                     "Med doc_id: viser innholdsfortegnelse med "
                     "token-estimat. "
-                    "Med doc_id + seksjon: viser seksjonens tekst. "
+                    "Med doc_id + seksjon: viser seksjonens tekst "
+                    "(side for side med max_tegn og cursor). "
                     "Eks: hent_forarbeide(doc_id="
                     "'prop-51-l-2015-2016', seksjon='7.9')"
                 ),
@@ -626,6 +932,18 @@ class MCPServer:
                                 "kapittel 2."
                             ),
                         },
+                        "max_tegn": {
+                            "type": "integer",
+                            "description": (
+                                "Maks antall tegn per side. Lange seksjoner deles da "
+                                "opp, og svaret slutter med en cursor for neste side."
+                            ),
+                            "minimum": 500,
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor fra forrige side for å hente neste side.",
+                        },
                     },
                     "required": [],
                 },
@@ -660,6 +978,7 @@ class MCPServer:
                             "type": "integer",
                             "description": ("Maks antall resultater (standard: 20)"),
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["query"],
@@ -695,6 +1014,7 @@ class MCPServer:
                             "type": "integer",
                             "description": ("Maks antall resultater (standard: 10)"),
                             "default": 10,
+                            "minimum": 1,
                         },
                     },
                     "required": ["query"],
@@ -729,6 +1049,7 @@ class MCPServer:
                             "type": "integer",
                             "description": "Maks antall resultater (standard: 20)",
                             "default": 20,
+                            "minimum": 1,
                         },
                     },
                     "required": ["lov"],
@@ -740,7 +1061,9 @@ class MCPServer:
                 "annotations": {"destructiveHint": True, "readOnlyHint": False},
                 "description": (
                     "Synkroniser saker fra KOFA. "
-                    "Henter saker via WordPress API og beriker med HTML-metadata."
+                    "Henter saker via WordPress API og beriker med HTML-metadata. "
+                    "Kjører i bakgrunnen og returnerer en jobb-ID med en gang; "
+                    "følg fremdriften med status(job_id=...)."
                 ),
                 "inputSchema": {
                     "type": "object",
@@ -758,6 +1081,7 @@ class MCPServer:
                         "limit": {
                             "type": "integer",
                             "description": "Maks antall å skrape (kun med scrape=true)",
+                            "minimum": 1,
                         },
                     },
                     "required": [],
@@ -767,17 +1091,38 @@ class MCPServer:
                 "name": "status",
                 "title": "KOFA-status",
                 "annotations": {"readOnlyHint": True},
-                "description": "Vis status for synkronisert KOFA-data.",
+                "description": (
+                    "Vis status for synkronisert KOFA-data, "
+                    "eller fremdrift for en synkroniseringsjobb (job_id)."
+                ),
                 "inputSchema": {
                     "type": "object",
-                    "properties": {},
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Jobb-ID returnert fra sync",
+                        },
+                    },
                     "required": [],
                 },
             },
         ]
 
-    def handle_request(self, body: dict[str, Any]) -> dict[str, Any]:
-        """Handle incoming MCP JSON-RPC request."""
+    def handle_request(
+        self, body: dict[str, Any] | list[Any]
+    ) -> dict[str, Any] | list[dict[str, Any]]:
+        """
+        Handle incoming MCP JSON-RPC request or batch.
+
+        A batch (JSON array) returns a list of responses in request order,
+        with notifications omitted. The list is empty if the batch only
+        contained notifications.
+        """
+        if isinstance(body, list):
+            return self.handle_batch(body)
+        if not isinstance(body, dict):
+            return self._error_response(None, -32600, "Invalid Request")
+
         method = body.get("method", "")
         params = body.get("params", {})
         request_id = body.get("id")
@@ -792,7 +1137,10 @@ class MCPServer:
             elif method == "tools/list":
                 result = self.handle_tools_list()
             elif method == "tools/call":
-                result = self.handle_tools_call(params)
+                result = self.handle_tools_call(params, request_id)
+            elif method == "notifications/cancelled":
+                self.cancel_request(params.get("requestId"), params.get("reason"))
+                result = {}
             elif method == "resources/list":
                 result = {"resources": []}
             elif method == "resources/read":
@@ -807,18 +1155,153 @@ class MCPServer:
 
             return self._success_response(request_id, result)
 
+        except RequestCancelled:
+            return self._error_response(request_id, REQUEST_CANCELLED, "Request cancelled")
         except Exception as e:
             logger.exception(f"Error handling MCP request: {e}")
             return self._error_response(request_id, -32603, str(e))
 
+    def handle_batch(self, batch: list[Any]) -> dict[str, Any] | list[dict[str, Any]]:
+        """Dispatch the entries of a JSON-RPC batch concurrently over the worker pool."""
+        if not batch:
+            return self._error_response(None, -32600, "Invalid Request: empty batch")
+
+        session = _session.get()
+
+        def handle_entry(entry: Any) -> dict[str, Any]:
+            if not isinstance(entry, dict):
+                return self._error_response(None, -32600, "Invalid Request")
+            with in_session(session):
+                return self.handle_request(entry)  # type: ignore[return-value]
+
+        logger.debug(f"MCP batch request with {len(batch)} entries")
+        responses = list(self._get_batch_executor().map(handle_entry, batch))
+
+        return [
+            response
+            for entry, response in zip(batch, responses, strict=True)
+            if not (isinstance(entry, dict) and "id" not in entry)
+        ]
+
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """Get or create the worker pool for batch entries lazily."""
+        if self._batch_executor is None:
+            with self._batch_lock:
+                if self._batch_executor is None:
+                    self._batch_executor = ThreadPoolExecutor(
+                        max_workers=BATCH_MAX_WORKERS, thread_name_prefix="kofa-batch"
+                    )
+        return self._batch_executor
+
+    def warm_up(self) -> bool:
+        """
+        Warm the service (backend connection, lazy imports) before serving.
+
+        Sets `ready`, which health endpoints report; returns it.
+        """
+        start = time.monotonic()
+        self.ready = self.service.warm_up()
+        elapsed = time.monotonic() - start
+        if self.ready:
+            logger.info(f"KOFA MCPServer warmed up in {elapsed:.2f}s")
+        else:
+            logger.warning(
+                f"KOFA MCPServer warm-up failed after {elapsed:.2f}s (backend unreachable)"
+            )
+        return self.ready
+
+    def warm_up_in_background(self) -> None:
+        """
+        Retry warm_up() in a daemon thread, with exponential backoff, until
+        it succeeds. Returns at once; at most one such thread runs.
+        """
+        with self._warm_lock:
+            if self.ready or self._warming:
+                return
+            self._warming = True
+
+        def run() -> None:
+            delay = WARMUP_RETRY_BASE
+            try:
+                while not self.warm_up():
+                    time.sleep(delay)
+                    delay = min(delay * 2, WARMUP_RETRY_MAX)
+            finally:
+                with self._warm_lock:
+                    self._warming = False
+
+        threading.Thread(target=run, name="kofa-warm-up", daemon=True).start()
+
+    def after_fork(self) -> None:
+        """
+        Reset per-process state in a forked worker.
+
+        Worker pools, locks and backend connections are not inherited safely
+        across fork(); they are recreated here. Call warm_up() afterwards.
+        """
+        self.ready = False
+        self._warming = False
+        self._warm_lock = threading.Lock()
+        self._batch_executor = None
+        self._batch_lock = threading.Lock()
+        self._tool_executor = None
+        self._tool_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._relay = ProgressRelay(self.service.jobs, self.notifications, self._progress_listener)
+        self.notifications.on_subscribe = self._relay.start
+        self.service.reconnect()
+
+    def _get_tool_executor(self) -> ThreadPoolExecutor:
+        """Get or create the worker pool for tool handlers lazily."""
+        if self._tool_executor is None:
+            with self._tool_lock:
+                if self._tool_executor is None:
+                    self._tool_executor = ThreadPoolExecutor(
+                        max_workers=TOOL_MAX_WORKERS, thread_name_prefix="kofa-tool"
+                    )
+        return self._tool_executor
+
+    def cancel_request(self, request_id: Any, reason: str | None = None) -> bool:
+        """
+        Cancel an in-flight tool call (MCP notifications/cancelled).
+
+        Only calls of the current client session match. The waiting caller
+        returns at once; the handler stops at its next backend call or retry.
+        Returns False if the request is not in flight.
+        """
+        with self._inflight_lock:
+            entry = self._inflight.get((_session.get(), request_id))
+        if entry is None:
+            logger.debug(f"Cancel for unknown or finished request {request_id}")
+            return False
+        budget, waker = entry
+        logger.info(f"Cancelling request {request_id}: {reason or 'no reason given'}")
+        budget.cancelled.set()
+        waker.set()
+        return True
+
     def handle_initialize(self, params: dict[str, Any]) -> dict[str, Any]:
         """Handle initialize request."""
+        self._log_client(params)
+        return self._initialize_result
+
+    def handle_tools_list(self) -> dict[str, Any]:
+        """Return list of available tools."""
+        return {"tools": self.tools}
+
+    @staticmethod
+    def _log_client(params: dict[str, Any]) -> None:
         client_info = params.get("clientInfo", {})
         logger.info(
             f"MCP client connected: {client_info.get('name', 'unknown')} "
             f"v{client_info.get('version', '?')}"
         )
 
+    @staticmethod
+    def _build_initialize_result() -> dict[str, Any]:
         return {
             "protocolVersion": PROTOCOL_VERSION,
             "serverInfo": SERVER_INFO,
@@ -830,126 +1313,364 @@ class MCPServer:
             "instructions": SERVER_INSTRUCTIONS.strip(),
         }
 
-    def handle_tools_list(self) -> dict[str, Any]:
-        """Return list of available tools."""
-        return {"tools": self.tools}
+    def serialized_response(self, body: Any) -> tuple[bytes, str] | None:
+        """
+        Pre-serialized JSON-RPC response for static methods.
+
+        Returns (response bytes, ETag) for `initialize` and `tools/list`, whose
+        results never change for the lifetime of the server; None otherwise.
+        Only the request id is spliced in per call.
+        """
+        if not isinstance(body, dict):
+            return None
+        method = body.get("method")
+        static = self._static_results.get(method)  # type: ignore[arg-type]
+        if static is None:
+            return None
+        if method == "initialize":
+            self._log_client(body.get("params") or {})
+        response = (
+            b'{"jsonrpc":"2.0","id":' + dumps(body.get("id")) + b',"result":' + static.body + b"}"
+        )
+        return response, static.etag
+
+    def _tool_handlers(self) -> dict[str, Callable[[dict[str, Any]], str]]:
+        """Map tool name to a handler taking validated arguments (defaults applied)."""
+        return {
+            "sok": lambda a: self.service.search(a["query"], a["limit"]),
+            "hent_sak": lambda a: self.service.get_case(a["sak_nr"]),
+            "hent_avgjoerelse": lambda a: self.service.get_decision_text(
+                sak_nr=a["sak_nr"],
+                section=a.get("seksjon"),
+                max_tegn=a.get("max_tegn"),
+                cursor=a.get("cursor"),
+            ),
+            "sok_avgjoerelse": lambda a: self.service.search_decision_text(
+                query=a["query"],
+                section=a.get("seksjon"),
+                limit=a["limit"],
+            ),
+            "semantisk_sok_kofa": lambda a: self.service.semantic_search(
+                query=a["query"],
+                section=a.get("seksjon"),
+                limit=a["limit"],
+            ),
+            "siste_saker": lambda a: self.service.recent_cases(
+                limit=a["limit"],
+                sakstype=a.get("sakstype"),
+                avgjoerelse=a.get("avgjoerelse"),
+                innklaget=a.get("innklaget"),
+            ),
+            "finn_praksis": lambda a: self.service.finn_praksis(
+                lov=a["lov"],
+                paragraf=a.get("paragraf"),
+                paragrafer=a.get("paragrafer"),
+                limit=a["limit"],
+            ),
+            "relaterte_saker": lambda a: self.service.related_cases(sak_nr=a["sak_nr"]),
+            "mest_siterte": lambda a: self.service.most_cited(
+                limit=a["limit"],
+                aar=a.get("aar"),
+                avgjoerelse=a.get("avgjoerelse"),
+            ),
+            "eu_praksis": lambda a: self.service.eu_praksis(
+                eu_case_id=a["eu_case_id"],
+                limit=a["limit"],
+            ),
+            "mest_siterte_eu": lambda a: self.service.mest_siterte_eu(
+                limit=a["limit"],
+                aar=a.get("aar"),
+                avgjoerelse=a.get("avgjoerelse"),
+            ),
+            "hent_eu_dom": lambda a: self.service.hent_eu_dom(
+                eu_case_id=a["eu_case_id"],
+                seksjon=a.get("seksjon"),
+                max_tegn=a.get("max_tegn"),
+                cursor=a.get("cursor"),
+            ),
+            "hent_forarbeide": lambda a: self.service.hent_forarbeide(
+                doc_id=a.get("doc_id"),
+                seksjon=a.get("seksjon"),
+                max_tegn=a.get("max_tegn"),
+                cursor=a.get("cursor"),
+            ),
+            "sok_forarbeider": lambda a: self.service.sok_forarbeider(
+                query=a["query"],
+                doc_id=a.get("doc_id"),
+                limit=a["limit"],
+            ),
+            "semantisk_sok_forarbeider": lambda a: self.service.semantisk_sok_forarbeider(
+                query=a["query"],
+                doc_id=a.get("doc_id"),
+                limit=a["limit"],
+            ),
+            "finn_forarbeider": lambda a: self.service.finn_forarbeider(
+                lov=a["lov"],
+                paragraf=a.get("paragraf"),
+                limit=a["limit"],
+            ),
+            "statistikk": lambda a: self.service.statistics(
+                aar=a.get("aar"),
+                gruppering=a["gruppering"],
+            ),
+            "sync": self._start_sync,
+            "status": lambda a: self.service.get_status(job_id=a.get("job_id")),
+        }
 
-    def handle_tools_call(self, params: dict[str, Any]) -> dict[str, Any]:
-        """Execute a tool call."""
+    def _build_registry(self) -> dict[str, ToolSpec]:
+        """Compile one ToolSpec per defined tool. Fails fast if a tool lacks a handler."""
+        handlers = self._tool_handlers()
+        registry = {}
+        for tool in self.tools:
+            name = tool["name"]
+            read_only = bool(tool.get("annotations", {}).get("readOnlyHint"))
+            registry[name] = ToolSpec(
+                name=name,
+                handler=handlers[name],
+                validate=compile_validator(tool["inputSchema"]),
+                read_only=read_only,
+                cacheable=read_only and name not in UNCACHEABLE_TOOLS,
+                timeout=TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT) or None,
+            )
+        return registry
+
+    @staticmethod
+    def call_key(spec: ToolSpec, arguments: dict[str, Any]) -> str:
+        """Canonical key for a tool call with validated (normalized) arguments."""
+        return json.dumps([spec.name, arguments], sort_keys=True, ensure_ascii=False)
+
+    def tool_etag(self, body: Any) -> str | None:
+        """
+        ETag for a single cacheable tools/call request, derived from
+        (data version, tool, normalized arguments). None if the call is not
+        cacheable, its arguments are invalid, or the data version is unknown.
+        """
+        if not isinstance(body, dict) or body.get("method") != "tools/call":
+            return None
+        params = body.get("params") or {}
+        spec = self._registry.get(params.get("name", ""))
+        if spec is None or not spec.cacheable:
+            return None
+        try:
+            arguments = spec.validate(params.get("arguments"))
+        except ArgumentError:
+            return None
+        version = self.service.data_version()
+        if version is None:
+            return None
+        digest = hashlib.sha256(f"{version}\0{self.call_key(spec, arguments)}".encode())
+        return f'"{digest.hexdigest()[:32]}"'
+
+    def handle_cacheable_request(self, body: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+        """
+        handle_request() for a single request, plus whether its result may be
+        cached by the client (False if a tool returned degraded fallback output).
+        """
+        token = _degraded_result.set(False)
+        try:
+            response = self.handle_request(body)
+            return response, not _degraded_result.get()  # type: ignore[return-value]
+        finally:
+            _degraded_result.reset(token)
+
+    def handle_tools_call(self, params: dict[str, Any], request_id: Any = None) -> dict[str, Any]:
+        """
+        Execute a tool call under the tool's deadline.
+
+        Raises RequestCancelled if the request is cancelled while running.
+        """
         tool_name = params.get("name", "")
         arguments = params.get("arguments", {})
 
         logger.info(f"Tool call: {tool_name} with args: {arguments}")
 
+        spec = self._registry.get(tool_name)
+        if spec is None:
+            logger.warning(f"Unknown tool requested: {tool_name}")
+            return {"content": [{"type": "text", "text": f"Ukjent verktøy: {tool_name}"}]}
+
         try:
-            if tool_name == "sok":
-                content = self.service.search(
-                    arguments.get("query", ""),
-                    arguments.get("limit", 20),
-                )
-            elif tool_name == "hent_sak":
-                content = self.service.get_case(arguments.get("sak_nr", ""))
-            elif tool_name == "hent_avgjoerelse":
-                content = self.service.get_decision_text(
-                    sak_nr=arguments.get("sak_nr", ""),
-                    section=arguments.get("seksjon"),
-                )
-            elif tool_name == "sok_avgjoerelse":
-                content = self.service.search_decision_text(
-                    query=arguments.get("query", ""),
-                    section=arguments.get("seksjon"),
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "semantisk_sok_kofa":
-                content = self.service.semantic_search(
-                    query=arguments.get("query", ""),
-                    section=arguments.get("seksjon"),
-                    limit=arguments.get("limit", 10),
-                )
-            elif tool_name == "siste_saker":
-                content = self.service.recent_cases(
-                    limit=arguments.get("limit", 20),
-                    sakstype=arguments.get("sakstype"),
-                    avgjoerelse=arguments.get("avgjoerelse"),
-                    innklaget=arguments.get("innklaget"),
-                )
-            elif tool_name == "finn_praksis":
-                content = self.service.finn_praksis(
-                    lov=arguments.get("lov", ""),
-                    paragraf=arguments.get("paragraf"),
-                    paragrafer=arguments.get("paragrafer"),
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "relaterte_saker":
-                content = self.service.related_cases(
-                    sak_nr=arguments.get("sak_nr", ""),
-                )
-            elif tool_name == "mest_siterte":
-                content = self.service.most_cited(
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "eu_praksis":
-                content = self.service.eu_praksis(
-                    eu_case_id=arguments.get("eu_case_id", ""),
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "mest_siterte_eu":
-                content = self.service.mest_siterte_eu(
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "hent_eu_dom":
-                content = self.service.hent_eu_dom(
-                    eu_case_id=arguments.get("eu_case_id", ""),
-                    seksjon=arguments.get("seksjon"),
-                )
-            elif tool_name == "hent_forarbeide":
-                content = self.service.hent_forarbeide(
-                    doc_id=arguments.get("doc_id"),
-                    seksjon=arguments.get("seksjon"),
-                )
-            elif tool_name == "sok_forarbeider":
-                content = self.service.sok_forarbeider(
-                    query=arguments.get("query", ""),
-                    doc_id=arguments.get("doc_id"),
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "semantisk_sok_forarbeider":
-                content = self.service.semantisk_sok_forarbeider(
-                    query=arguments.get("query", ""),
-                    doc_id=arguments.get("doc_id"),
-                    limit=arguments.get("limit", 10),
-                )
-            elif tool_name == "finn_forarbeider":
-                content = self.service.finn_forarbeider(
-                    lov=arguments.get("lov", ""),
-                    paragraf=arguments.get("paragraf"),
-                    limit=arguments.get("limit", 20),
-                )
-            elif tool_name == "statistikk":
-                content = self.service.statistics(
-                    aar=arguments.get("aar"),
-                    gruppering=arguments.get("gruppering", "avgjoerelse"),
-                )
-            elif tool_name == "sync":
-                content = self.service.sync(
-                    scrape=arguments.get("scrape", False),
-                    force=arguments.get("force", False),
-                    limit=arguments.get("limit"),
-                )
-            elif tool_name == "status":
-                content = self.service.get_status()
-            else:
-                content = f"Ukjent verktøy: {tool_name}"
-                logger.warning(f"Unknown tool requested: {tool_name}")
+            arguments = spec.validate(arguments)
+        except ArgumentError as e:
+            logger.info(f"Rejected arguments for {tool_name}: {e}")
+            return {
+                "content": [{"type": "text", "text": f"Ugyldige argumenter for {tool_name}: {e}"}],
+                "isError": True,
+            }
 
+        # Successful, non-degraded responses of cacheable tools are memoized per data version
+        memo_key = None
+        if spec.cacheable:
+            version = self.service.data_version()
+            if version is not None:
+                memo_key = (version, self.call_key(spec, arguments))
+                content = self._response_memo.get(memo_key)
+                if content is not MISSING:
+                    return {"content": [{"type": "text", "text": content}]}
+
+        budget = CallBudget(deadline=time.monotonic() + spec.timeout if spec.timeout else None)
+        waker = threading.Event()
+        inflight_key = (_session.get(), request_id)
+        if request_id is not None:
+            with self._inflight_lock:
+                self._inflight[inflight_key] = (budget, waker)
+        progress_token = (params.get("_meta") or {}).get("progressToken")
+        try:
+            if memo_key is not None:
+                future, run_budget = self._join_flight(spec, arguments, memo_key)
+            else:
+                future = self._submit_tool(spec, arguments, budget, progress_token)
+                run_budget = budget
+            content = self._await_tool(spec, future, budget, waker, shared=memo_key is not None)
+            if run_budget.degraded:
+                _degraded_result.set(True)
             return {"content": [{"type": "text", "text": content}]}
 
+        except RequestCancelled:
+            logger.info(f"Tool call cancelled: {tool_name}")
+            raise
+        except DeadlineExceeded:
+            logger.warning(f"Tool call timed out after {spec.timeout}s: {tool_name}")
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            f"Tidsavbrudd: {tool_name} brukte mer enn {spec.timeout:g} sekunder. "
+                            f"Prøv igjen, eventuelt med et smalere søk."
+                        ),
+                    }
+                ],
+                "isError": True,
+            }
         except Exception as e:
             logger.exception(f"Tool execution error: {e}")
             return {
                 "content": [{"type": "text", "text": f"Feil ved kjøring av {tool_name}: {e}"}],
                 "isError": True,
             }
+        finally:
+            if request_id is not None:
+                with self._inflight_lock:
+                    if self._inflight.get(inflight_key, (None,))[0] is budget:
+                        del self._inflight[inflight_key]
+
+    def _submit_tool(
+        self,
+        spec: ToolSpec,
+        arguments: dict[str, Any],
+        budget: CallBudget,
+        progress_token: Any = None,
+    ) -> Future[str]:
+        """Start a handler in the tool pool under `budget`, in the caller's session."""
+        session = _session.get()
+
+        def run() -> str:
+            _progress_token.set(progress_token)
+            _session.set(session)
+            with call_budget(budget):
+                budget.check()
+                return spec.handler(arguments)
+
+        return self._get_tool_executor().submit(run)
+
+    def _join_flight(
+        self, spec: ToolSpec, arguments: dict[str, Any], key: tuple[str, str]
+    ) -> tuple[Future[str], CallBudget]:
+        """
+        Shared execution of a cacheable call (single-flight).
+
+        Identical concurrent calls wait on one handler run instead of each
+        querying the backend. The run has its own deadline and is not
+        cancelled when one of its callers gives up; its result is memoized
+        unless the handler marked it degraded. Returns the run and its budget.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight
+            # A run may have landed since the caller missed the memo
+            content = self._response_memo.get(key)
+            if content is not MISSING:
+                future = Future()
+                future.set_result(content)
+                return future, CallBudget()
+            deadline = time.monotonic() + spec.timeout if spec.timeout else None
+            budget = CallBudget(deadline=deadline)
+            future = self._submit_tool(spec, arguments, budget)
+            self._flights[key] = flight = (future, budget)
+
+        def land(done: Future[str]) -> None:
+            # Memoize before leaving _flights, so later callers find one or the other
+            if not done.cancelled() and done.exception() is None and not budget.degraded:
+                self._response_memo.set(key, done.result())
+            with self._flights_lock:
+                if self._flights.get(key, (None,))[0] is done:
+                    del self._flights[key]
+
+        future.add_done_callback(land)
+        return flight
+
+    def _await_tool(
+        self,
+        spec: ToolSpec,
+        future: Future[str],
+        budget: CallBudget,
+        waker: threading.Event,
+        shared: bool = False,
+    ) -> str:
+        """Wait until the handler finishes, the call's deadline passes or it is cancelled."""
+        future.add_done_callback(lambda _: waker.set())
+        waker.wait(budget.remaining())
+        if future.done():
+            return future.result()
+        if budget.cancelled.is_set():
+            if not shared:
+                future.cancel()
+            raise RequestCancelled("Request cancelled")
+        if not shared:
+            # Abandoned: the handler sees the flag/deadline at its next backend call
+            future.cancel()
+            budget.cancelled.set()
+        raise DeadlineExceeded(f"{spec.name} exceeded {spec.timeout}s")
+
+    def _start_sync(self, arguments: dict[str, Any]) -> str:
+        """sync tool: start a background sync job and return its id at once."""
+        if not supports_sync(self.service.backend):
+            return self.service.sync()
+        token, session = _progress_token.get(), _session.get()
+        job = self.service.start_sync_job(
+            listener=self._progress_listener(token, session) if token is not None else None,
+            progress_to={"token": token, "session": session} if token is not None else None,
+            scrape=arguments["scrape"],
+            force=arguments["force"],
+            limit=arguments.get("limit"),
+        )
+        return (
+            f"Synkronisering kjører som jobb `{job.id}`.\n\n"
+            f"Følg fremdriften med `status(job_id='{job.id}')`."
+        )
+
+    def _progress_listener(self, token: Any, session: str | None) -> Callable[[Job], None]:
+        """Publish a job's progress as MCP notifications/progress for `token` to `session`."""
+
+        def listener(job: Job) -> None:
+            # progress must increase: whole stages done plus the current fraction
+            fraction = min(job.done / job.total, 0.99) if job.total else 0.0
+            params: dict[str, Any] = {"progressToken": token}
+            if job.status == RUNNING:
+                params["progress"] = round(job.stages_done + fraction, 3)
+                of_total = f"/{job.total}" if job.total else ""
+                params["message"] = f"{job.stage}: {job.done}{of_total}"
+            else:
+                params["progress"] = params["total"] = job.stages_done + 1
+                params["message"] = f"Feilet: {job.error}" if job.error else "Ferdig"
+            self.notifications.publish(
+                {"jsonrpc": "2.0", "method": "notifications/progress", "params": params},
+                session,
+            )
+
+        return listener
 
     def _success_response(self, request_id: Any, result: dict[str, Any]) -> dict[str, Any]:
         """Format successful JSON-RPC response."""
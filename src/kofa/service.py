@@ -7,17 +7,274 @@ Business logic and response formatting for KOFA MCP tools.
 from __future__ import annotations
 
 import logging
-
-from kofa.supabase_backend import KofaSupabaseBackend
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from kofa._pagination import MIN_PAGE_CHARS, CursorError, PageCursor, take_page
+from kofa._supabase_utils import CallBudget, call_budget, mark_degraded
+from kofa.backend import LEADERBOARD_CAP, KofaBackend, create_backend, supports_sync
+from kofa.cache import BACKEND_CACHE_ENABLED, MISSING, CachedBackend, LRUCache
+from kofa.jobs import FAILED, RUNNING, Job, JobManager
+from kofa.replica import REPLICA_ENABLED, ReplicaBackend
+from kofa.vector_index import CORPORA, LOCAL_VECTORS
 
 logger = logging.getLogger(__name__)
 
+# How long a fetched data version is trusted before kofa_sync_meta is re-read
+DATA_VERSION_TTL = float(os.getenv("KOFA_DATA_VERSION_TTL", "60"))
+
+# Seconds a data version read may take (retries included) before it is given up
+DATA_VERSION_TIMEOUT = float(os.getenv("KOFA_DATA_VERSION_TIMEOUT", "5"))
+
+# Page size for hent_avgjoerelse/hent_eu_dom/hent_forarbeide when the caller
+# gives no max_tegn (0 = return the whole section)
+DEFAULT_MAX_TEGN = int(os.getenv("KOFA_DEFAULT_MAX_TEGN", "0"))
+
+# Rendered documents kept for follow-up pages
+PAGE_CACHE_SIZE = int(os.getenv("KOFA_PAGE_CACHE_SIZE", "32"))
+PAGE_CACHE_TTL = float(os.getenv("KOFA_PAGE_CACHE_TTL", "600"))
+
+# Dimensions of the statistics cube (migration 008) that statistikk can group by
+STATISTICS_GROUPINGS = ("avgjoerelse", "sakstype", "regelverk", "konkurranseform")
+
+# Citation leaderboards (migration 009) are scoped by year or by outcome, not both
+LEADERBOARD_SCOPE_CONFLICT = (
+    "Angi enten aar eller avgjoerelse, ikke begge: siteringene telles per år eller per avgjørelse."
+)
+
 
 class KofaService:
     """Service layer wrapping backend with formatted responses."""
 
-    def __init__(self, backend: KofaSupabaseBackend | None = None):
-        self.backend = backend or KofaSupabaseBackend()
+    def __init__(self, backend: KofaBackend | None = None):
+        backend = backend or create_backend()
+        # Cases, decision text and references answered in-process (KOFA_REPLICA)
+        self._replica = ReplicaBackend(backend) if REPLICA_ENABLED else None
+        backend = self._replica or backend
+        # Point lookups go through a read-through cache invalidated by writes
+        self.backend = CachedBackend(backend) if BACKEND_CACHE_ENABLED else backend
+        self._data_version: str | None = None
+        self._data_version_at = 0.0
+        self._data_version_lock = threading.Lock()
+        self._data_version_refreshing = False
+        self._page_cache = LRUCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+        # Caches reported by the status tool (name -> LRUCache)
+        self.caches: dict[str, LRUCache] = {"sider": self._page_cache}
+        if isinstance(self.backend, CachedBackend):
+            self.caches["backend"] = self.backend.cache
+        # Tables precomputed by the sync (statistics cube, citation
+        # leaderboards), loaded once per data version
+        self._derived: dict[str, Any] = {}
+        self.jobs = JobManager()
+        # Vector search engines, created on first use and shared by all calls
+        self._vector_search: dict[str, Any] = {}
+        self._vector_search_lock = threading.Lock()
+        # Exported embedding matrices (KOFA_LOCAL_VECTORS), None where missing
+        self._vector_indexes: dict[str, Any] = {}
+
+    def data_version(self) -> str | None:
+        """
+        Current data version (fingerprint of the sync cursors).
+
+        Cached for DATA_VERSION_TTL seconds. A stale version keeps being
+        served while one background thread re-reads it, so callers never
+        wait on the backend once a version is known. Returns None if the
+        version has never been readable, in which case callers must not cache.
+        """
+        with self._data_version_lock:
+            if self._data_version is not None:
+                if time.monotonic() - self._data_version_at < DATA_VERSION_TTL:
+                    return self._data_version
+                if not self._data_version_refreshing:
+                    self._data_version_refreshing = True
+                    threading.Thread(
+                        target=self._refresh_data_version, name="kofa-data-version", daemon=True
+                    ).start()
+                return self._data_version
+            if self._data_version_refreshing:
+                # The first read is under way elsewhere; don't queue behind it
+                return None
+            self._data_version_refreshing = True
+        return self._refresh_data_version()
+
+    def _refresh_data_version(self) -> str | None:
+        """Re-read the data version under a short CallBudget; returns the current one."""
+        try:
+            with call_budget(CallBudget(deadline=time.monotonic() + DATA_VERSION_TIMEOUT)):
+                version = self.backend.get_data_version()
+        except Exception as e:
+            logger.warning(f"Could not read data version: {e}")
+            version = None
+        with self._data_version_lock:
+            self._data_version_refreshing = False
+            self._data_version_at = time.monotonic()
+            if version is not None:
+                if self._data_version is not None and version != self._data_version:
+                    self._on_data_changed(version)
+                self._data_version = version
+            return self._data_version
+
+    def _on_data_changed(self, version: str) -> None:
+        """Drop everything derived from the previous data version."""
+        logger.info(f"Data version changed to {version}, clearing caches")
+        if isinstance(self.backend, CachedBackend):
+            self.backend.clear()
+        if self._replica is not None:
+            self._replica.clear()
+        self._page_cache.clear()
+        self._derived.clear()
+
+    def warm_up(self) -> bool:
+        """
+        Prepare for traffic: open the backend connection and import the
+        modules that tool calls would otherwise load lazily on first use.
+
+        Returns False if the backend could not be reached.
+        """
+        import importlib
+
+        for module in ("kofa.vector_search", "google.genai"):
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+        for corpus in CORPORA:
+            self._local_index(corpus)
+
+        # Force a fresh read: the first round trip sets up TLS and the pool
+        if self._refresh_data_version() is None:
+            return False
+        if self._replica is not None:
+            try:
+                self._replica.load()
+            except Exception as e:
+                logger.warning(f"Could not load replica, reading from the backend: {e}")
+        if isinstance(self.backend, CachedBackend):
+            self.backend.load_filters()
+        return True
+
+    def reconnect(self) -> None:
+        """Recreate backend connections, e.g. in a worker process after fork."""
+        self._data_version_lock = threading.Lock()
+        self._data_version_refreshing = False
+        self._vector_search_lock = threading.Lock()
+        self._vector_search = {}
+        self.backend.reconnect()
+
+    def _get_vector_search(self, corpus: str) -> Any:
+        """
+        Long-lived vector search engine for "decisions" or "forarbeider".
+
+        Both engines share one QueryEmbedder (Gemini client and query
+        embedding cache), so a repeated query skips the embedding call.
+        """
+        engine = self._vector_search.get(corpus)
+        if engine is not None:
+            return engine
+        index = self._local_index(corpus)
+        with self._vector_search_lock:
+            if corpus not in self._vector_search:
+                from kofa.vector_search import (
+                    ForarbeiderVectorSearch,
+                    KofaVectorSearch,
+                    QueryEmbedder,
+                )
+
+                embedder = self._vector_search.get("embedder")
+                if embedder is None:
+                    embedder = self._vector_search["embedder"] = QueryEmbedder()
+                    self.caches["embeddings"] = embedder.cache
+                engine_cls = KofaVectorSearch if corpus == "decisions" else ForarbeiderVectorSearch
+                if index is not None:
+                    engine = engine_cls(embedder=embedder, index=index, backend=self.backend)
+                else:
+                    engine = engine_cls(embedder=embedder)
+                self._vector_search[corpus] = engine
+            return self._vector_search[corpus]
+
+    def _local_index(self, corpus: str) -> Any:
+        """
+        Exported embedding matrix for `corpus` (kofa.vector_index), or None if
+        KOFA_LOCAL_VECTORS is off or nothing was exported. Opened once; later
+        exports are picked up by the open index itself.
+        """
+        if not LOCAL_VECTORS or corpus not in CORPORA:
+            return None
+        if corpus not in self._vector_indexes:
+            from kofa.vector_index import open_index
+
+            with self._vector_search_lock:
+                if corpus not in self._vector_indexes:
+                    self._vector_indexes[corpus] = open_index(corpus)
+        return self._vector_indexes[corpus]
+
+    @staticmethod
+    def _resume(tool: str, ident: str | None, cursor: str | None) -> PageCursor | str | None:
+        """Decode a continuation cursor; returns an error message if it is invalid."""
+        if not cursor:
+            return None
+        try:
+            return PageCursor.decode(cursor, tool, ident)
+        except CursorError as e:
+            return f"Ugyldig cursor: {e}. Start på nytt uten cursor."
+
+    def _paged(
+        self,
+        tool: str,
+        id_arg: str,
+        ident: str,
+        section: str,
+        render: Callable[[], list[str] | str],
+        max_tegn: int | None,
+        page: PageCursor | None,
+    ) -> str:
+        """
+        Return one page of a section rendered as blocks.
+
+        `render` returns the section as a list of blocks, or a str message
+        (not found etc.) which is returned as-is. The block list is cached, so
+        follow-up pages are cut from it without another backend round trip.
+        """
+        max_chars = max_tegn or (page.max_chars if page else 0) or DEFAULT_MAX_TEGN
+        if not max_chars:
+            rendered = render()
+            return rendered if isinstance(rendered, str) else "\n".join(rendered)
+        max_chars = max(max_chars, MIN_PAGE_CHARS)
+
+        key = (tool, ident, section)
+        blocks = self._page_cache.get(key)
+        if blocks is MISSING:
+            rendered = render()
+            if isinstance(rendered, str):
+                return rendered
+            blocks = rendered
+            self._page_cache.set(key, blocks)
+
+        start_block, start_offset = (page.block, page.offset) if page else (0, 0)
+        if start_block >= len(blocks):
+            return f"Ingen flere sider for {ident} ({section})."
+        text, block, offset = take_page(blocks, start_block, start_offset, max_chars)
+
+        def position(b: int, o: int) -> int:
+            return sum(len(x) + 1 for x in blocks[:b]) + o
+
+        total = position(len(blocks), 0) - 1
+        start = position(start_block, start_offset)
+        end = min(position(block, offset), total)
+        if page:
+            text = f"*Fortsettelse av {ident} ({section}), tegn {start:,}–{end:,}*\n\n{text}"
+        if block >= len(blocks):
+            return text
+
+        next_cursor = PageCursor(tool, ident, section, block, offset, max_chars).encode()
+        return (
+            f"{text}\n\n---\n"
+            f"*Viser tegn {start:,}–{end:,} av {total:,}. Neste side: "
+            f"`{tool}({id_arg}='{ident}', cursor='{next_cursor}')`*"
+        )
 
     def search(self, query: str, limit: int = 20) -> str:
         """Full-text search across KOFA cases."""
@@ -43,25 +300,57 @@ class KofaService:
 
         return self._format_case_detail(case)
 
-    def get_decision_text(self, sak_nr: str, section: str | None = None) -> str:
-        """Get decision text for a case, optionally filtered by section."""
+    def get_decision_text(
+        self,
+        sak_nr: str,
+        section: str | None = None,
+        max_tegn: int | None = None,
+        cursor: str | None = None,
+    ) -> str:
+        """
+        Get decision text for a case, optionally filtered by section.
+
+        A section can be read in pages of `max_tegn` characters; each page
+        ends with a cursor for the next one.
+        """
+        page = self._resume("hent_avgjoerelse", sak_nr, cursor)
+        if isinstance(page, str):
+            return page
+        if page:
+            section = page.section
+
+        if section:
+            return self._paged(
+                "hent_avgjoerelse",
+                "sak_nr",
+                sak_nr,
+                section,
+                lambda: self._decision_section_blocks(sak_nr, section),
+                max_tegn,
+                page,
+            )
+
         case = self.backend.get_case(sak_nr)
         if not case:
             return f"Fant ikke sak: {sak_nr}"
 
-        paragraphs = self.backend.get_decision_text(sak_nr, section)
+        paragraphs = self.backend.get_decision_text(sak_nr)
         if not paragraphs:
-            if section:
-                return f"Ingen avgjørelsestekst i seksjon '{section}' for sak {sak_nr}."
             return (
                 f"Ingen avgjørelsestekst tilgjengelig for sak {sak_nr}. "
                 f"Bruk PDF-lenken fra hent_sak() for å lese avgjørelsen."
             )
+        return self._format_decision_toc(sak_nr, paragraphs)
 
-        if section:
-            return self._format_decision_section(sak_nr, section, paragraphs)
-        else:
-            return self._format_decision_toc(sak_nr, paragraphs)
+    def _decision_section_blocks(self, sak_nr: str, section: str) -> list[str] | str:
+        case = self.backend.get_case(sak_nr)
+        if not case:
+            return f"Fant ikke sak: {sak_nr}"
+
+        paragraphs = self.backend.get_decision_text(sak_nr, section)
+        if not paragraphs:
+            return f"Ingen avgjørelsestekst i seksjon '{section}' for sak {sak_nr}."
+        return self._format_decision_section(sak_nr, section, paragraphs)
 
     def search_decision_text(
         self,
@@ -109,13 +398,17 @@ class KofaService:
         limit: int = 10,
     ) -> str:
         """Semantic (hybrid vector + FTS) search in decision text."""
+        if (
+            not getattr(self.backend, "vector_search", True)
+            and self._local_index("decisions") is None
+        ):
+            return self.search_decision_text(query, section, limit)
         try:
-            from kofa.vector_search import KofaVectorSearch
-
-            vs = KofaVectorSearch()
+            vs = self._get_vector_search("decisions")
             results = vs.search(query, limit=limit, section=section)
         except Exception as e:
             logger.warning(f"Semantic search failed, falling back to FTS: {e}")
+            mark_degraded()
             return self.search_decision_text(query, section, limit)
 
         if not results:
@@ -177,8 +470,33 @@ class KofaService:
         return "\n".join(lines)
 
     def statistics(self, aar: int | None = None, gruppering: str = "avgjoerelse") -> str:
-        """Get aggregate statistics."""
-        stats = self.backend.statistics(aar, gruppering)
+        """
+        Get aggregate statistics.
+
+        Answered in memory from the statistics cube, which is loaded once per
+        data version; falls back to the kofa_statistics RPC if the cube is
+        unavailable.
+        """
+        if gruppering not in STATISTICS_GROUPINGS:
+            options = ", ".join(f"'{g}'" for g in STATISTICS_GROUPINGS)
+            return f"Ukjent gruppering: '{gruppering}'. Gyldige verdier: {options}"
+
+        cube = self._get_statistics_cube()
+        if cube:
+            counts: dict[str, int] = {}
+            for row in cube:
+                if aar and row.get("aar") != aar:
+                    continue
+                label = row.get(gruppering) or "Ukjent"
+                counts[label] = counts.get(label, 0) + (row.get("count") or 0)
+            stats = [
+                {"label": label, "count": count}
+                for label, count in sorted(counts.items(), key=lambda kv: -kv[1])
+            ]
+        elif gruppering in ("avgjoerelse", "sakstype"):
+            stats = self.backend.statistics(aar, gruppering)
+        else:
+            return f"Gruppering på '{gruppering}' krever statistikkuben (migrasjon 008)."
 
         if not stats:
             return "Ingen statistikk tilgjengelig."
@@ -197,6 +515,80 @@ class KofaService:
 
         return "\n".join(lines)
 
+    def _load_derived(self, name: str, loader: Callable[[], Any], empty: Any) -> Any:
+        """
+        A precomputed table, loaded with `loader` once per data version.
+
+        Returns `empty` if it could not be loaded (e.g. migration not applied);
+        that outcome is remembered too, until the data version changes.
+        """
+        version = self.data_version()  # clears self._derived when the data has changed
+        value = self._derived.get(name, MISSING)
+        if value is MISSING:
+            try:
+                value = loader()
+            except Exception as e:
+                logger.warning(f"Could not load {name}: {e}")
+                value = empty
+            if version is not None:
+                self._derived[name] = value
+        return value
+
+    def _get_statistics_cube(self) -> list[dict]:
+        """Statistics cube rows ([] if unavailable)."""
+        return self._load_derived("statistics cube", self.backend.get_statistics_cube, [])
+
+    def _get_leaderboards(self) -> dict[tuple[str, str], list[dict]]:
+        """Citation leaderboards by (kind, scope), each in rank order ({} if unavailable)."""
+
+        def load() -> dict[tuple[str, str], list[dict]]:
+            boards: dict[tuple[str, str], list[dict]] = {}
+            for row in self.backend.get_citation_leaderboards():
+                boards.setdefault((row["kind"], row["scope"]), []).append(row)
+            for rows in boards.values():
+                rows.sort(key=lambda r: r["rank"])
+            return boards
+
+        return self._load_derived("citation leaderboards", load, {})
+
+    @staticmethod
+    def _leaderboard_scope(aar: int | None, avgjoerelse: str | None) -> tuple[str, str]:
+        """(scope key, label suffix) for a leaderboard filter (aar or avgjoerelse, not both)."""
+        if aar:
+            return f"aar:{aar}", f" (siteringer fra saker avsluttet {aar})"
+        if avgjoerelse:
+            return (
+                f"avgjoerelse:{avgjoerelse}",
+                f" (siteringer fra saker med avgjørelse «{avgjoerelse}»)",
+            )
+        return "", ""
+
+    def _leaderboard(
+        self, kind: str, limit: int, aar: int | None, avgjoerelse: str | None
+    ) -> list[dict] | None:
+        """
+        Top `limit` rows of a leaderboard, or None if it must be computed
+        on demand (leaderboards unavailable, or the overall list with a
+        limit above the stored cap). Scoped lists stop at LEADERBOARD_CAP.
+        """
+        boards = self._get_leaderboards()
+        if not boards:
+            return None
+        scope, _label = self._leaderboard_scope(aar, avgjoerelse)
+        if not scope and (limit > LEADERBOARD_CAP or (kind, scope) not in boards):
+            return None
+        return boards.get((kind, scope), [])[: min(limit, LEADERBOARD_CAP)]
+
+    @staticmethod
+    def _leaderboard_capped(scope: str, limit: int, shown: int) -> str:
+        """Note for a scoped list cut at the stored cap ("" if it was not)."""
+        if scope and limit > LEADERBOARD_CAP <= shown:
+            return (
+                f"*Viser de {LEADERBOARD_CAP} første: siteringslistene per år og "
+                f"avgjørelse lagrer ikke flere.*\n"
+            )
+        return ""
+
     def finn_praksis(
         self,
         lov: str,
@@ -378,15 +770,43 @@ class KofaService:
 
         return "\n".join(lines)
 
-    def most_cited(self, limit: int = 20) -> str:
-        """Find the most frequently cited KOFA cases."""
-        results = self.backend.most_cited_cases(limit)
+    def most_cited(
+        self, limit: int = 20, aar: int | None = None, avgjoerelse: str | None = None
+    ) -> str:
+        """
+        Find the most frequently cited KOFA cases, optionally counting only
+        citations from decisions of one year or one outcome.
+
+        Served from the precomputed leaderboards; the overall list falls back
+        to the kofa_most_cited RPC when they are unavailable.
+        """
+        if aar and avgjoerelse:
+            return LEADERBOARD_SCOPE_CONFLICT
+        scope, scope_label = self._leaderboard_scope(aar, avgjoerelse)
+        board = self._leaderboard("kofa", limit, aar, avgjoerelse)
+        if board is not None:
+            results = [
+                {
+                    "sak_nr": r["target"],
+                    "cited_count": r["cited_count"],
+                    "innklaget": r.get("name"),
+                    "avgjoerelse": r.get("avgjoerelse"),
+                    "saken_gjelder": r.get("saken_gjelder"),
+                }
+                for r in board
+            ]
+        elif scope:
+            return "Siteringer per år eller avgjørelse krever siteringslistene (migrasjon 009)."
+        else:
+            results = self.backend.most_cited_cases(limit)
 
         if not results:
-            return "Ingen siteringsdata tilgjengelig."
+            return f"Ingen siteringsdata tilgjengelig{scope_label}."
 
-        lines = ["## Mest siterte KOFA-saker\n"]
+        lines = [f"## Mest siterte KOFA-saker{scope_label}\n"]
         lines.append("Basert på kryssreferanser i avgjørelsestekst.\n")
+        if capped := self._leaderboard_capped(scope, limit, len(results)):
+            lines.append(capped)
 
         for r in results:
             sak_nr = r.get("sak_nr", "?")
@@ -452,49 +872,51 @@ class KofaService:
 
         return "\n".join(lines)
 
-    def hent_eu_dom(self, eu_case_id: str, seksjon: str | None = None) -> str:
+    def hent_eu_dom(
+        self,
+        eu_case_id: str,
+        seksjon: str | None = None,
+        max_tegn: int | None = None,
+        cursor: str | None = None,
+    ) -> str:
         """
         Get EU Court judgment text, with optional section filtering.
 
         Without seksjon: returns metadata + table of contents with char counts.
-        With seksjon: returns the requested section text.
+        With seksjon: returns the requested section text, in pages of
+        `max_tegn` characters if given (continue with `cursor`).
 
-        Sections are split on-the-fly using text markers:
+        Sections are located by text markers (see judgment_section_index):
         - sammendrag: text before "JUDGMENT OF THE COURT"
         - begrunnelse: text between "JUDGMENT OF THE COURT" and "On those grounds"
         - domsslutning: text from "On those grounds" to end
-        """
-        case_law = self.backend.get_eu_case_law(eu_case_id)
-
-        if not case_law:
-            return (
-                f"Ingen EU-dom funnet for {eu_case_id}. "
-                f"Sjekk at saksnummeret er korrekt (f.eks. 'C-19/00'). "
-                f"Bruk `mest_siterte_eu()` for å se tilgjengelige EU-dommer."
-            )
 
-        full_text = case_law.get("full_text", "")
-        sections = self._split_eu_judgment_sections(full_text)
+        The boundaries are stored with the judgment at sync time, so the TOC
+        does not read full_text and a section is fetched as a substring.
+        Judgments without a current index are split on the fly.
+        """
+        page = self._resume("hent_eu_dom", eu_case_id, cursor)
+        if isinstance(page, str):
+            return page
+        if page:
+            seksjon = page.section
 
         if seksjon:
             seksjon = seksjon.lower().strip()
-            if seksjon not in sections:
-                available = ", ".join(f"'{s}'" for s in sections if s != "full")
-                return f"Ukjent seksjon: '{seksjon}'. Tilgjengelige seksjoner: {available}"
-            section_text = sections[seksjon]
-            if not section_text:
-                return f"Seksjonen '{seksjon}' er tom for {eu_case_id}."
-
-            section_labels = {
-                "sammendrag": "Sammendrag (Summary)",
-                "begrunnelse": "Begrunnelse (Grounds)",
-                "domsslutning": "Domsslutning (Operative part)",
-            }
-            label = section_labels.get(seksjon, seksjon)
-            lines = [f"## {eu_case_id} — {label}\n"]
-            lines.append(f"*{len(section_text):,} tegn*\n")
-            lines.append(section_text)
-            return "\n".join(lines)
+            return self._paged(
+                "hent_eu_dom",
+                "eu_case_id",
+                eu_case_id,
+                seksjon,
+                lambda: self._eu_section_blocks(eu_case_id, seksjon),
+                max_tegn,
+                page,
+            )
+
+        case_law = self._eu_indexed(eu_case_id) or self.backend.get_eu_case_law(eu_case_id)
+        if not case_law:
+            return self._eu_not_found(eu_case_id)
+        index = self._eu_section_index(case_law)
 
         # No section specified — return metadata + TOC
         lines = [f"## EU-dom: {eu_case_id}\n"]
@@ -522,12 +944,15 @@ class KofaService:
             "domsslutning": "Domsslutning (Operative part)",
         }
         for sec_key, sec_label in section_labels.items():
-            text = sections.get(sec_key, "")
-            chars = len(text)
+            start, end = index["sections"][sec_key]
+            chars = end - start
             tokens = chars // 4
-            lines.append(f"- **{sec_label}:** {chars:,} tegn (~{tokens:,} tokens)")
+            line = f"- **{sec_label}:** {chars:,} tegn (~{tokens:,} tokens)"
+            if sec_key == "begrunnelse" and index["paragraphs"]:
+                line += f", avsnitt 1–{len(index['paragraphs'])}"
+            lines.append(line)
 
-        total = len(full_text)
+        total = index["length"]
         lines.append(f"\n**Totalt:** {total:,} tegn (~{total // 4:,} tokens)")
 
         lines.append(
@@ -537,66 +962,112 @@ class KofaService:
         return "\n".join(lines)
 
     @staticmethod
-    def _split_eu_judgment_sections(full_text: str) -> dict[str, str]:
-        """
-        Split EU judgment text into sections on-the-fly.
+    def _eu_not_found(eu_case_id: str) -> str:
+        return (
+            f"Ingen EU-dom funnet for {eu_case_id}. "
+            f"Sjekk at saksnummeret er korrekt (f.eks. 'C-19/00'). "
+            f"Bruk `mest_siterte_eu()` for å se tilgjengelige EU-dommer."
+        )
 
-        Uses text markers (in priority order):
-        - "JUDGMENT OF THE COURT" splits summary from grounds
-        - "Grounds" (old format TOC heading) as fallback for grounds start
-        - "On those grounds" splits grounds from operative part
-        - "Operative part" (old format TOC heading) as fallback
+    def _eu_indexed(self, eu_case_id: str) -> dict | None:
+        """EU judgment metadata (no full_text) if it has a current section index."""
+        from kofa.eurlex_fetcher import SECTION_INDEX_VERSION
 
-        Returns dict with keys: sammendrag, begrunnelse, domsslutning
-        """
-        import re
+        try:
+            case_law = self.backend.get_eu_case_law_meta(eu_case_id)
+        except Exception as e:
+            # e.g. migration 007 not applied: read the full text instead
+            logger.warning(f"Could not read EU section index for {eu_case_id}: {e}")
+            return None
+        index = (case_law or {}).get("section_index")
+        if not index or index.get("version") != SECTION_INDEX_VERSION:
+            return None
+        return case_law
 
-        # Find grounds start: "JUDGMENT OF THE COURT" or fallback to "Grounds" heading
-        judgment_marker = re.search(
-            r"JUDGMENT OF THE (?:COURT|GENERAL COURT)",
-            full_text,
-        )
-        if not judgment_marker:
-            judgment_marker = re.search(r"\nGrounds\n", full_text)
-
-        # Find operative part: "On those grounds" or fallback to "Operative part" heading
-        operative_marker = re.search(
-            r"On those grounds.*?(?:hereby|:)\s*",
-            full_text,
-            re.DOTALL,
-        )
-        if not operative_marker:
-            operative_marker = re.search(r"\nOperative part\n", full_text)
-
-        if judgment_marker and operative_marker:
-            sammendrag = full_text[: judgment_marker.start()].strip()
-            begrunnelse = full_text[judgment_marker.start() : operative_marker.start()].strip()
-            domsslutning = full_text[operative_marker.start() :].strip()
-        elif judgment_marker:
-            sammendrag = full_text[: judgment_marker.start()].strip()
-            begrunnelse = full_text[judgment_marker.start() :].strip()
-            domsslutning = ""
-        else:
-            # No markers found — return full text as begrunnelse
-            sammendrag = ""
-            begrunnelse = full_text.strip()
-            domsslutning = ""
-
-        return {
-            "sammendrag": sammendrag,
-            "begrunnelse": begrunnelse,
-            "domsslutning": domsslutning,
-        }
+    @staticmethod
+    def _eu_section_index(case_law: dict) -> dict:
+        """Stored section index of a judgment row, or one computed from its full_text."""
+        from kofa.eurlex_fetcher import SECTION_INDEX_VERSION, judgment_section_index
+
+        index = case_law.get("section_index")
+        if index and index.get("version") == SECTION_INDEX_VERSION:
+            return index
+        return judgment_section_index(case_law.get("full_text") or "")
+
+    def _eu_section_text(self, eu_case_id: str, seksjon: str) -> str | None:
+        """Text of one judgment section, or None if the judgment is not found."""
+        case_law = self._eu_indexed(eu_case_id)
+        if case_law:
+            start, end = case_law["section_index"]["sections"][seksjon]
+            if end <= start:
+                return ""
+            text = self.backend.get_eu_case_law_slice(eu_case_id, start, end - start)
+            if text is not None:
+                return text
 
-    def mest_siterte_eu(self, limit: int = 20) -> str:
-        """Find the most frequently cited EU Court cases in KOFA decisions."""
-        results = self.backend.most_cited_eu_cases(limit)
+        case_law = self.backend.get_eu_case_law(eu_case_id)
+        if not case_law:
+            return None
+        full_text = case_law.get("full_text") or ""
+        start, end = self._eu_section_index(case_law)["sections"][seksjon]
+        return full_text[start:end]
+
+    def _eu_section_blocks(self, eu_case_id: str, seksjon: str) -> list[str] | str:
+        from kofa.eurlex_fetcher import JUDGMENT_SECTIONS
+
+        if seksjon not in JUDGMENT_SECTIONS:
+            available = ", ".join(f"'{s}'" for s in JUDGMENT_SECTIONS)
+            return f"Ukjent seksjon: '{seksjon}'. Tilgjengelige seksjoner: {available}"
+
+        section_text = self._eu_section_text(eu_case_id, seksjon)
+        if section_text is None:
+            return self._eu_not_found(eu_case_id)
+        if not section_text:
+            return f"Seksjonen '{seksjon}' er tom for {eu_case_id}."
+
+        section_labels = {
+            "sammendrag": "Sammendrag (Summary)",
+            "begrunnelse": "Begrunnelse (Grounds)",
+            "domsslutning": "Domsslutning (Operative part)",
+        }
+        label = section_labels.get(seksjon, seksjon)
+        lines = [f"## {eu_case_id} — {label}\n"]
+        lines.append(f"*{len(section_text):,} tegn*\n")
+        lines.extend(section_text.split("\n"))
+        return lines
+
+    def mest_siterte_eu(
+        self, limit: int = 20, aar: int | None = None, avgjoerelse: str | None = None
+    ) -> str:
+        """
+        Find the most frequently cited EU Court cases in KOFA decisions,
+        optionally only in decisions of one year or one outcome.
+        """
+        if aar and avgjoerelse:
+            return LEADERBOARD_SCOPE_CONFLICT
+        scope, scope_label = self._leaderboard_scope(aar, avgjoerelse)
+        board = self._leaderboard("eu", limit, aar, avgjoerelse)
+        if board is not None:
+            results = [
+                {
+                    "eu_case_id": r["target"],
+                    "eu_case_name": r.get("name"),
+                    "cited_count": r["cited_count"],
+                }
+                for r in board
+            ]
+        elif scope:
+            return "Siteringer per år eller avgjørelse krever siteringslistene (migrasjon 009)."
+        else:
+            results = self.backend.most_cited_eu_cases(limit)
 
         if not results:
-            return "Ingen EU-siteringsdata tilgjengelig."
+            return f"Ingen EU-siteringsdata tilgjengelig{scope_label}."
 
-        lines = ["## Mest siterte EU-dommer i KOFA\n"]
+        lines = [f"## Mest siterte EU-dommer i KOFA{scope_label}\n"]
         lines.append("Basert på referanser i avgjørelsestekst.\n")
+        if capped := self._leaderboard_capped(scope, limit, len(results)):
+            lines.append(capped)
 
         for r in results:
             case_id = r.get("eu_case_id", "?")
@@ -612,15 +1083,28 @@ class KofaService:
     # Forarbeider (legislative preparatory works)
     # =========================================================================
 
-    def hent_forarbeide(self, doc_id: str | None = None, seksjon: str | None = None) -> str:
+    def hent_forarbeide(
+        self,
+        doc_id: str | None = None,
+        seksjon: str | None = None,
+        max_tegn: int | None = None,
+        cursor: str | None = None,
+    ) -> str:
         """
         Browse forarbeider (propositions and NOU reports).
 
         Three modes:
         1. No args → list all documents
         2. doc_id only → show table of contents with token estimates
-        3. doc_id + seksjon → show section text (prefix match)
+        3. doc_id + seksjon → show section text (prefix match), in pages of
+           `max_tegn` characters if given (continue with `cursor`)
         """
+        page = self._resume("hent_forarbeide", doc_id, cursor)
+        if isinstance(page, str):
+            return page
+        if page:
+            doc_id, seksjon = page.ident, page.section
+
         # Mode 1: List all documents
         if not doc_id:
             docs = self.backend.list_forarbeider()
@@ -635,8 +1119,8 @@ class KofaService:
                 did = doc.get("doc_id", "?")
                 doc_type = doc.get("doc_type", "")
                 session = doc.get("session", "")
-                section_count = doc.get("section_count", 0)
-                char_count = doc.get("char_count", 0)
+                section_count = doc.get("section_count") or 0
+                char_count = doc.get("char_count") or 0
                 tokens = char_count // 4
 
                 lines.append(f"### {title}")
@@ -657,101 +1141,99 @@ class KofaService:
             lines.append("Bruk `hent_forarbeide(doc_id='...')` for innholdsfortegnelse.")
             return "\n".join(lines)
 
-        # Mode 2 & 3: Need document metadata
-        doc = self.backend.get_forarbeide(doc_id)
-        if not doc:
-            return (
-                f"Fant ikke forarbeide: {doc_id}. "
-                f"Bruk `hent_forarbeide()` for å se tilgjengelige "
-                f"dokumenter."
-            )
-
-        title = doc.get("title", doc_id)
-
         # Mode 3: Show section text
         if seksjon:
-            sections = self.backend.get_forarbeider_sections(doc_id, seksjon)
-            if not sections:
-                return (
-                    f"Fant ingen seksjoner som matcher '{seksjon}' i "
-                    f"{title}. Bruk "
-                    f"`hent_forarbeide(doc_id='{doc_id}')` for "
-                    f"innholdsfortegnelse."
-                )
+            return self._paged(
+                "hent_forarbeide",
+                "doc_id",
+                doc_id,
+                seksjon,
+                lambda: self._forarbeide_section_blocks(doc_id, seksjon),
+                max_tegn,
+                page,
+            )
 
-            first = sections[0]
-            header_sec = first.get("section_number", seksjon)
-            header_title = first.get("title", "")
-            header = f"## {title} — {header_sec}"
-            if header_title:
-                header += f" {header_title}"
-            lines = [header, ""]
-
-            for s in sections:
-                sec_num = s.get("section_number", "")
-                sec_title = s.get("title", "")
-                level = s.get("level", 2)
-                text = s.get("text", "")
-
-                # Heading level: level 1 → ##, 2 → ###, etc.
-                hashes = "#" * min(level + 1, 6)
-                heading = f"{hashes} {sec_num}"
-                if sec_title:
-                    heading += f" {sec_title}"
-                lines.append(heading)
-                lines.append("")
-                if text.strip():
-                    lines.append(text)
-                    lines.append("")
+        doc = self.backend.get_forarbeide(doc_id)
+        if not doc:
+            return self._forarbeide_not_found(doc_id)
 
-            return "\n".join(lines)
+        title = doc.get("title", doc_id)
 
-        # Mode 2: Show TOC
-        all_sections = self.backend.get_forarbeider_sections(doc_id)
-        total_chars = doc.get("char_count", 0)
+        # Mode 2: Show TOC (level-1 rollup; no section text is read)
+        toc = self.backend.get_forarbeider_toc(doc_id)
+        # Counts are NULL until the sync has filled them in
+        total_chars = doc.get("char_count") or 0
         total_tokens = total_chars // 4
-        section_count = doc.get("section_count", 0)
+        section_count = doc.get("section_count") or 0
 
         lines = [f"## {title} — Innholdsfortegnelse\n"]
         lines.append(
             f"{section_count} seksjoner, {total_chars:,} tegn (~{total_tokens:,} tokens)\n"
         )
 
-        # Group by top-level section (level 1)
         lines.append("| # | Seksjon | Tegn | ~Tokens |")
         lines.append("|---|---------|-----:|--------:|")
-
-        # Build TOC: for each level-1 section, sum chars of it
-        # and its subsections
-        current_l1: dict | None = None
-        l1_chars = 0
-
-        for s in all_sections:
-            level = s.get("level", 1)
-            if level == 1:
-                # Flush previous level-1 section
-                if current_l1 is not None:
-                    sec_num = current_l1.get("section_number", "?")
-                    sec_title = current_l1.get("title", "")
-                    tokens = l1_chars // 4
-                    lines.append(f"| {sec_num} | {sec_title} | {l1_chars:,} | {tokens:,} |")
-                current_l1 = s
-                l1_chars = s.get("char_count", 0) or 0
-            else:
-                l1_chars += s.get("char_count", 0) or 0
-
-        # Flush last level-1 section
-        if current_l1 is not None:
-            sec_num = current_l1.get("section_number", "?")
-            sec_title = current_l1.get("title", "")
-            tokens = l1_chars // 4
-            lines.append(f"| {sec_num} | {sec_title} | {l1_chars:,} | {tokens:,} |")
+        for entry in toc:
+            chars = entry["char_count"] or 0
+            lines.append(
+                f"| {entry['section_number']} | {entry['title']} | {chars:,} | {chars // 4:,} |"
+            )
 
         lines.append(
             f"\nBruk `hent_forarbeide(doc_id='{doc_id}', seksjon='...')` for å lese en seksjon."
         )
         return "\n".join(lines)
 
+    @staticmethod
+    def _forarbeide_not_found(doc_id: str) -> str:
+        return (
+            f"Fant ikke forarbeide: {doc_id}. "
+            f"Bruk `hent_forarbeide()` for å se tilgjengelige "
+            f"dokumenter."
+        )
+
+    def _forarbeide_section_blocks(self, doc_id: str, seksjon: str) -> list[str] | str:
+        doc = self.backend.get_forarbeide(doc_id)
+        if not doc:
+            return self._forarbeide_not_found(doc_id)
+
+        title = doc.get("title", doc_id)
+        sections = self.backend.get_forarbeider_sections(doc_id, seksjon)
+        if not sections:
+            return (
+                f"Fant ingen seksjoner som matcher '{seksjon}' i "
+                f"{title}. Bruk "
+                f"`hent_forarbeide(doc_id='{doc_id}')` for "
+                f"innholdsfortegnelse."
+            )
+
+        first = sections[0]
+        header_sec = first.get("section_number", seksjon)
+        header_title = first.get("title", "")
+        header = f"## {title} — {header_sec}"
+        if header_title:
+            header += f" {header_title}"
+        lines = [header, ""]
+
+        for s in sections:
+            sec_num = s.get("section_number", "")
+            sec_title = s.get("title", "")
+            level = s.get("level", 2)
+            text = s.get("text", "")
+
+            # Heading level: level 1 → ##, 2 → ###, etc.
+            hashes = "#" * min(level + 1, 6)
+            heading = f"{hashes} {sec_num}"
+            if sec_title:
+                heading += f" {sec_title}"
+            lines.append(heading)
+            lines.append("")
+            if text.strip():
+                lines.append(text)
+                lines.append("")
+
+        return lines
+
     def sok_forarbeider(self, query: str, doc_id: str | None = None, limit: int = 20) -> str:
         """Full-text search in forarbeider sections."""
         results = self.backend.search_forarbeider(query, doc_id, limit)
@@ -795,13 +1277,17 @@ class KofaService:
         limit: int = 10,
     ) -> str:
         """Semantic (hybrid vector + FTS) search in forarbeider."""
+        if (
+            not getattr(self.backend, "vector_search", True)
+            and self._local_index("forarbeider") is None
+        ):
+            return self.sok_forarbeider(query, doc_id, limit)
         try:
-            from kofa.vector_search import ForarbeiderVectorSearch
-
-            vs = ForarbeiderVectorSearch()
+            vs = self._get_vector_search("forarbeider")
             results = vs.search(query, limit=limit, doc_id=doc_id)
         except Exception as e:
             logger.warning(f"Forarbeider semantic search failed, falling back to FTS: {e}")
+            mark_degraded()
             return self.sok_forarbeider(query, doc_id, limit)
 
         if not results:
@@ -926,13 +1412,31 @@ class KofaService:
         max_errors: int = 20,
         verbose: bool = False,
         refresh_pending: bool = False,
+        progress: Callable[[str, dict, int, int | None], None] | None = None,
     ) -> str:
-        """Run sync operation."""
+        """
+        Run sync operation.
+
+        `progress(stage, stats, done, total)` is called as each stage
+        advances, with the stage's stats dict so far.
+        """
+        if not supports_sync(self.backend):
+            return (
+                "Synkronisering er ikke tilgjengelig: denne serveren leser fra en lokal "
+                "SQLite-database (KOFA_BACKEND=sqlite). Kjør sync mot Supabase."
+            )
         lines = ["## Synkronisering\n"]
 
+        def stage(name: str):
+            if progress is None:
+                return None
+            return lambda stats, done, total: progress(name, stats, done, total)
+
         # WP API sync (skip if only doing PDF, reference, EU, or forarbeider)
         if not pdf and not references and not eu_cases and not forarbeider:
-            wp_stats = self.backend.sync_from_wp_api(force=force, verbose=verbose)
+            wp_stats = self.backend.sync_from_wp_api(
+                force=force, verbose=verbose, progress=stage("wp_api")
+            )
             lines.append("### WordPress API")
             lines.append(f"- Hentet **{wp_stats['upserted']}** saker fra {wp_stats['pages']} sider")
             if wp_stats["errors"]:
@@ -948,6 +1452,7 @@ class KofaService:
                 verbose=verbose,
                 force=force,
                 refresh_pending=refresh_pending,
+                progress=stage("html"),
             )
             lines.append("\n### HTML-skraping")
             lines.append(f"- Beriket **{html_stats['scraped']}** saker med metadata")
@@ -967,6 +1472,7 @@ class KofaService:
                 max_errors=max_errors,
                 verbose=verbose,
                 force=force,
+                progress=stage("pdf"),
             )
             lines.append("\n### PDF-ekstraksjon")
             lines.append(
@@ -985,6 +1491,7 @@ class KofaService:
                 limit=limit,
                 verbose=verbose,
                 force=force,
+                progress=stage("references"),
             )
             lines.append("\n### Referanse-ekstraksjon")
             lines.append(
@@ -1006,6 +1513,7 @@ class KofaService:
                 max_errors=max_errors,
                 verbose=verbose,
                 force=force,
+                progress=stage("eu_cases"),
             )
             lines.append("\n### EU-domstolspraksis (EUR-Lex)")
             lines.append(f"- Hentet **{eu_stats['fetched']}** EU-dommer fra EUR-Lex")
@@ -1026,6 +1534,7 @@ class KofaService:
                 pdf_dir=pdf_dir,
                 force=force,
                 verbose=verbose,
+                progress=stage("forarbeider"),
             )
             lines.append("\n### Forarbeider (PDF-import)")
             lines.append(
@@ -1039,6 +1548,7 @@ class KofaService:
             ref_stats = self.backend.sync_forarbeider_references(
                 force=force,
                 verbose=verbose,
+                progress=stage("forarbeider_references"),
             )
             if ref_stats["documents"] > 0:
                 lines.append(
@@ -1051,8 +1561,134 @@ class KofaService:
 
         return "\n".join(lines)
 
-    def get_status(self) -> str:
-        """Get sync status with pipeline coverage."""
+    def start_sync_job(
+        self,
+        listener: Callable[[Job], None] | None = None,
+        progress_to: dict[str, Any] | None = None,
+        **kwargs,
+    ) -> Job:
+        """
+        Start sync() as a background job and return it at once.
+
+        `kwargs` are passed to sync(); `listener` is called with the job on
+        progress and when it finishes, and `progress_to` is saved with it
+        (see JobManager.start). If a sync job is already running, that job
+        is returned.
+        """
+        return self.jobs.start(
+            "sync",
+            lambda job: self.sync(**kwargs, progress=job.report),
+            params=kwargs,
+            listener=listener,
+            progress_to=progress_to,
+        )
+
+    def get_job_status(self, job_id: str) -> str:
+        """Format the state of a background job."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return (
+                f"Fant ikke jobb: {job_id}. Ferdige jobber ryddes etter hvert, og "
+                f"uten felles jobbkatalog (KOFA_JOBS_DIR) kjenner bare prosessen "
+                f"som startet jobben den."
+            )
+
+        status_labels = {RUNNING: "Kjører", FAILED: "Feilet"}
+        lines = [f"## Jobb {job.id} ({job.kind})\n"]
+        lines.append(f"- **Status:** {status_labels.get(job.status, 'Ferdig')}")
+        lines.append(f"- **Tid brukt:** {job.elapsed:.0f}s")
+        if job.status == RUNNING and job.stage:
+            of_total = f"/{job.total}" if job.total else ""
+            lines.append(f"- **Steg:** {job.stage} ({job.done}{of_total})")
+            counters = ", ".join(
+                f"{k}: {v}" for k, v in job.stats.items() if isinstance(v, int) and v
+            )
+            if counters:
+                lines.append(f"- **Så langt:** {counters}")
+        if job.error:
+            lines.append(f"- **Feil:** {job.error}")
+        if job.result:
+            lines.append("")
+            lines.append(job.result)
+        return "\n".join(lines)
+
+    def get_status(self, job_id: str | None = None) -> str:
+        """Get sync status with pipeline coverage, or the state of one job."""
+        if job_id:
+            return self.get_job_status(job_id)
+
+        running = self.jobs.running()
+        running_note = (
+            f"\n\n*Jobb {running.id} ({running.kind}) kjører: `status(job_id='{running.id}')`*"
+            if running
+            else ""
+        )
+        return (
+            self._get_sync_status()
+            + self._format_cache_stats()
+            + self._format_replica_stats()
+            + self._format_vector_stats()
+            + running_note
+        )
+
+    def _format_cache_stats(self) -> str:
+        """Hit/miss counters of the in-process caches, as a status section."""
+        if not self.caches:
+            return ""
+        lines = ["\n\n### Cacher (denne prosessen)\n"]
+        lines.append("| Cache | Treff | Bom | Treffrate | Størrelse |")
+        lines.append("|-------|------:|----:|----------:|----------:|")
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "–"
+            lines.append(
+                f"| {name} | {stats['hits']:,} | {stats['misses']:,} | {rate} | "
+                f"{stats['size']:,}/{stats['maxsize']:,} |"
+            )
+        if isinstance(self.backend, CachedBackend) and self.backend.bloom_rejections:
+            lines.append(
+                f"\nUkjente saksnumre/EU-saker besvart lokalt (Bloom-filter): "
+                f"{self.backend.bloom_rejections:,}"
+            )
+        return "\n".join(lines)
+
+    def _format_replica_stats(self) -> str:
+        """Size and load time of the in-process replica, as a status section."""
+        if self._replica is None:
+            return ""
+        stats = self._replica.stats()
+        if stats is None:
+            return "\n\n### Lokal replika\n\nLastes – spørringer går til databasen så lenge."
+        return (
+            f"\n\n### Lokal replika\n\n"
+            f"- **Innhold:** {stats['cases']:,} saker, {stats['paragraphs']:,} avsnitt, "
+            f"{stats['references']:,} referanser\n"
+            f"- **Minne:** {stats['bytes'] / 1e6:.1f} MB "
+            f"(herav tekst {stats['text_bytes'] / 1e6:.1f} MB)\n"
+            f"- **Lastetid:** {stats['load_seconds']:.1f} s "
+            f"(dataversjon {stats['data_version']})"
+        )
+
+    def _format_vector_stats(self) -> str:
+        """Exported embedding matrices in use, as a status section."""
+        lines = []
+        for corpus, index in self._vector_indexes.items():
+            if index is None:
+                continue
+            try:
+                stats = index.stats()
+            except Exception as e:
+                lines.append(f"- **{corpus}:** utilgjengelig ({e})")
+                continue
+            lines.append(
+                f"- **{corpus}:** {stats['count']:,} vektorer ({stats['dim']}-d {stats['dtype']}, "
+                f"{stats['lists']} IVF-lister), {stats['bytes'] / 1e6:.1f} MB, "
+                f"eksportert {stats['created_at'][:10]}"
+            )
+        return "\n\n### Lokale vektorer\n\n" + "\n".join(lines) if lines else ""
+
+    def _get_sync_status(self) -> str:
         status = self.backend.get_sync_status()
 
         if not status or status.get("cases", 0) == 0:
@@ -1233,8 +1869,8 @@ Kjør `sync()` for å laste ned saker fra KOFA."""
         return "\n".join(lines)
 
     @staticmethod
-    def _format_decision_section(sak_nr: str, section: str, paragraphs: list[dict]) -> str:
-        """Format decision text paragraphs for a specific section."""
+    def _format_decision_section(sak_nr: str, section: str, paragraphs: list[dict]) -> list[str]:
+        """Format decision text paragraphs for a specific section (one block per line)."""
         section_labels = {
             "innledning": "Innledning",
             "bakgrunn": "Bakgrunn (faktum)",
@@ -1253,4 +1889,4 @@ Kjør `sync()` for å laste ned saker fra KOFA."""
             text = p.get("text", "")
             lines.append(f"**({num})** {text}\n")
 
-        return "\n".join(lines)
+        return lines
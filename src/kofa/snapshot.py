@@ -0,0 +1,217 @@
+"""
+Portable corpus snapshots.
+
+`kofa snapshot export` copies the served tables from Supabase into a
+single gzip-compressed SQLite file (the KofaSqliteBackend schema, FTS
+indexes included) with a manifest; `kofa snapshot import` unpacks it as
+the local database for KOFA_BACKEND=sqlite. A new node gets a warm corpus
+in seconds instead of running the sync pipeline against the upstream sites.
+
+Tables are read with the backend's scan_table(): keyset pagination
+(WHERE key > last ORDER BY key), so every page is an index range scan
+regardless of table size.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import UTC, datetime
+from typing import Any
+
+from kofa.sqlite_backend import SQLITE_PATH, init_schema, rebuild_fts
+
+logger = logging.getLogger(__name__)
+
+# Bump when sqlite_backend.SCHEMA changes incompatibly
+SNAPSHOT_FORMAT = 1
+
+MANIFEST_TABLE = "kofa_snapshot_manifest"
+
+# (table, keyset column, page size); large text columns get smaller pages
+SNAPSHOT_TABLES: list[tuple[str, str, int]] = [
+    ("kofa_cases", "sak_nr", 1000),
+    ("kofa_decision_text", "id", 1000),
+    ("kofa_law_references", "id", 1000),
+    ("kofa_case_references", "id", 1000),
+    ("kofa_eu_references", "id", 1000),
+    ("kofa_court_references", "id", 1000),
+    ("kofa_eu_case_law", "eu_case_id", 50),
+    ("kofa_forarbeider", "doc_id", 1000),
+    ("kofa_forarbeider_sections", "id", 200),
+    ("kofa_forarbeider_law_refs", "id", 1000),
+    ("kofa_forarbeider_eu_refs", "id", 1000),
+    ("kofa_sync_meta", "source", 1000),
+]
+
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+class SnapshotError(Exception):
+    """A snapshot file is missing, corrupt or of an unsupported format."""
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    """Stored (non-generated) columns of a snapshot table."""
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})") if row[6] == 0]
+
+
+def _copy_table(
+    backend: Any, conn: sqlite3.Connection, table: str, key: str, page_size: int
+) -> int:
+    columns = _columns(conn, table)
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    rows = backend.scan_table(table, columns, key, page_size)
+    while batch := list(itertools.islice(rows, page_size)):
+        conn.executemany(
+            insert,
+            [
+                tuple(
+                    json.dumps(v) if isinstance(v, dict | list) else v
+                    for v in (row.get(c) for c in columns)
+                )
+                for row in batch
+            ],
+        )
+        count += len(batch)
+    return count
+
+
+def _data_version(conn: sqlite3.Connection) -> str:
+    """Data version of the copied sync cursors (as KofaSupabaseBackend.get_data_version)."""
+    conn.row_factory = sqlite3.Row
+    rows = [
+        dict(r)
+        for r in conn.execute(
+            "SELECT source, cursor_value, last_count, synced_at FROM kofa_sync_meta ORDER BY source"
+        )
+    ]
+    conn.row_factory = None
+    payload = json.dumps(rows, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def export_snapshot(path: str, backend: Any = None) -> dict:
+    """
+    Copy all served tables into a compressed snapshot at `path`.
+
+    Reads from `backend` (default: Supabase) with scan_table(). Returns
+    the manifest. The file is written next to `path` and renamed into
+    place when complete.
+    """
+    if backend is None:
+        from kofa.supabase_backend import KofaSupabaseBackend
+
+        backend = KofaSupabaseBackend()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite", dir=directory)
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        init_schema(conn)
+
+        counts: dict[str, int] = {}
+        for table, key, page_size in SNAPSHOT_TABLES:
+            counts[table] = _copy_table(backend, conn, table, key, page_size)
+            conn.commit()
+            logger.info(f"Snapshot: {table} {counts[table]:,} rows")
+
+        rebuild_fts(conn)
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": datetime.now(UTC).isoformat(),
+            "data_version": _data_version(conn),
+            "tables": counts,
+        }
+        conn.execute(f"CREATE TABLE {MANIFEST_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany(
+            f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?)",
+            [(k, json.dumps(v)) for k, v in manifest.items()],
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+
+        tmp_gz = db_path + ".gz"
+        with open(db_path, "rb") as src, gzip.open(tmp_gz, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_gz, path)
+    finally:
+        for leftover in (db_path, db_path + ".gz"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    manifest["bytes"] = os.path.getsize(path)
+    return manifest
+
+
+def read_manifest(db_path: str) -> dict:
+    """Manifest of an uncompressed snapshot database."""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(f"SELECT key, value FROM {MANIFEST_TABLE}").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise SnapshotError(f"Not a KOFA snapshot ({e})") from e
+    return {k: json.loads(v) for k, v in rows}
+
+
+def import_snapshot(path: str, target: str = SQLITE_PATH) -> dict:
+    """
+    Install the snapshot at `path` (gzip-compressed or plain SQLite) as the
+    local database `target`, replacing it atomically. Returns the manifest.
+
+    Running servers on KOFA_BACKEND=sqlite pick up the new file at their
+    next data version check.
+    """
+    if not os.path.exists(path):
+        raise SnapshotError(f"Snapshot not found: {path}")
+    with open(path, "rb") as f:
+        compressed = f.read(len(_SQLITE_MAGIC)) != _SQLITE_MAGIC
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".sqlite", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            opener = gzip.open if compressed else open
+            try:
+                with opener(path, "rb") as src:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            except (OSError, EOFError) as e:
+                raise SnapshotError(f"Could not read snapshot {path}: {e}") from e
+
+        manifest = read_manifest(tmp_path)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(
+                f"Unsupported snapshot format {manifest.get('format')} "
+                f"(this version reads format {SNAPSHOT_FORMAT})"
+            )
+        conn = sqlite3.connect(tmp_path)
+        try:
+            for table, expected in manifest.get("tables", {}).items():
+                actual = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if actual != expected:
+                    raise SnapshotError(f"{table}: {actual} rows, manifest says {expected}")
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return manifest
@@ -0,0 +1,824 @@
+"""
+Offline SQLite backend for KOFA MCP server.
+
+Answers the KofaBackend read API from a single local SQLite file, so a
+single-node deployment needs no network round trip per tool call. Tables
+mirror the Supabase schema (migrations 001-009); full-text search uses
+FTS5 tables weighted like the Postgres tsvectors:
+
+- kofa_cases_fts: sak_nr/innklaget/klager (A), saken_gjelder (B), summary (C)
+- kofa_forarbeider_sections_fts: title (A), text (B)
+- kofa_decision_text_fts: paragraph text
+
+bm25 column weights follow ts_rank's defaults (A=1.0, B=0.4, C=0.2).
+FTS5 has no Norwegian stemmer, so query terms are matched as prefixes,
+which covers most inflected forms ("anskaffelse" finds "anskaffelsen").
+
+The database is opened read-only; sync runs against Supabase and the
+file is produced by `kofa snapshot export`/`import`. Use
+KOFA_BACKEND=sqlite and KOFA_SQLITE_PATH to select it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from kofa.backend import LEADERBOARD_CAP, rollup_toc
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.getenv(
+    "KOFA_SQLITE_PATH",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "kofa", "kofa.sqlite"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kofa_cases (
+    sak_nr TEXT PRIMARY KEY,
+    slug TEXT,
+    page_url TEXT,
+    wp_id INTEGER,
+    wp_modified TEXT,
+    summary TEXT,
+    published TEXT,
+    innklaget TEXT,
+    klager TEXT,
+    sakstype TEXT,
+    avgjoerelse TEXT,
+    saken_gjelder TEXT,
+    regelverk TEXT,
+    konkurranseform TEXT,
+    prosedyre TEXT,
+    avsluttet TEXT,
+    pdf_url TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_cases_avsluttet ON kofa_cases(avsluttet);
+
+CREATE TABLE IF NOT EXISTS kofa_decision_text (
+    id INTEGER PRIMARY KEY,
+    sak_nr TEXT NOT NULL,
+    paragraph_number INTEGER NOT NULL,
+    section TEXT,
+    text TEXT NOT NULL,
+    UNIQUE(sak_nr, paragraph_number)
+);
+
+CREATE TABLE IF NOT EXISTS kofa_law_references (
+    id INTEGER PRIMARY KEY,
+    sak_nr TEXT NOT NULL,
+    paragraph_number INTEGER,
+    reference_type TEXT NOT NULL,
+    law_name TEXT NOT NULL,
+    law_section TEXT,
+    raw_text TEXT,
+    lovdata_doc_id TEXT,
+    context TEXT,
+    regulation_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_law_refs_lookup ON kofa_law_references(law_name, law_section);
+CREATE INDEX IF NOT EXISTS idx_kofa_law_refs_case ON kofa_law_references(sak_nr);
+-- Serves WHERE law_name = ? ORDER BY sak_nr DESC LIMIT n without sorting all matches
+CREATE INDEX IF NOT EXISTS idx_kofa_law_refs_law_sak ON kofa_law_references(law_name, sak_nr);
+
+CREATE TABLE IF NOT EXISTS kofa_case_references (
+    id INTEGER PRIMARY KEY,
+    from_sak_nr TEXT NOT NULL,
+    to_sak_nr TEXT NOT NULL,
+    paragraph_number INTEGER,
+    context TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_case_refs_from ON kofa_case_references(from_sak_nr);
+CREATE INDEX IF NOT EXISTS idx_kofa_case_refs_to ON kofa_case_references(to_sak_nr);
+
+CREATE TABLE IF NOT EXISTS kofa_eu_references (
+    id INTEGER PRIMARY KEY,
+    sak_nr TEXT NOT NULL,
+    eu_case_id TEXT NOT NULL,
+    eu_case_name TEXT,
+    paragraph_number INTEGER,
+    context TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_eu_refs_case_sak ON kofa_eu_references(eu_case_id, sak_nr);
+CREATE INDEX IF NOT EXISTS idx_kofa_eu_refs_sak ON kofa_eu_references(sak_nr);
+
+CREATE TABLE IF NOT EXISTS kofa_court_references (
+    id INTEGER PRIMARY KEY,
+    sak_nr TEXT NOT NULL,
+    court_case_id TEXT,
+    court_level TEXT,
+    court_name TEXT,
+    paragraph_number INTEGER,
+    raw_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_court_refs_sak ON kofa_court_references(sak_nr);
+
+CREATE TABLE IF NOT EXISTS kofa_eu_case_law (
+    eu_case_id TEXT PRIMARY KEY,
+    celex TEXT,
+    case_name TEXT,
+    judgment_date TEXT,
+    subject TEXT,
+    description TEXT,
+    full_text TEXT,
+    source_url TEXT,
+    language TEXT,
+    section_index TEXT  -- JSON, see migration 007
+);
+
+CREATE TABLE IF NOT EXISTS kofa_forarbeider (
+    doc_id TEXT PRIMARY KEY,
+    doc_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    full_title TEXT,
+    session TEXT,
+    page_count INTEGER,
+    char_count INTEGER,
+    section_count INTEGER,
+    source_url TEXT,
+    source_file TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS kofa_forarbeider_sections (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    section_number TEXT NOT NULL,
+    title TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    page_start INTEGER,
+    parent_path TEXT,
+    sort_order INTEGER NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    char_count INTEGER GENERATED ALWAYS AS (LENGTH(text)) STORED,
+    content_hash TEXT,
+    UNIQUE(doc_id, section_number)
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_forarbeider_sections_doc_sort
+    ON kofa_forarbeider_sections(doc_id, sort_order);
+
+CREATE TABLE IF NOT EXISTS kofa_forarbeider_law_refs (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    section_number TEXT NOT NULL,
+    law_name TEXT NOT NULL,
+    law_section TEXT,
+    context TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kofa_forarbeider_law_refs_law
+    ON kofa_forarbeider_law_refs(law_name, law_section);
+
+CREATE TABLE IF NOT EXISTS kofa_forarbeider_eu_refs (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    section_number TEXT NOT NULL,
+    eu_case_id TEXT NOT NULL,
+    context TEXT
+);
+
+CREATE TABLE IF NOT EXISTS kofa_sync_meta (
+    source TEXT PRIMARY KEY,
+    cursor_value TEXT,
+    last_count INTEGER DEFAULT 0,
+    synced_at TEXT
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS kofa_cases_fts USING fts5(
+    sak_nr, innklaget, klager, saken_gjelder, summary,
+    content='kofa_cases', tokenize='unicode61 remove_diacritics 0'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS kofa_decision_text_fts USING fts5(
+    text, content='kofa_decision_text', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS kofa_forarbeider_sections_fts USING fts5(
+    title, text, content='kofa_forarbeider_sections', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0'
+);
+"""
+
+# External-content FTS tables, rebuilt after the base tables are loaded
+FTS_TABLES = ("kofa_cases_fts", "kofa_decision_text_fts", "kofa_forarbeider_sections_fts")
+
+# bm25() column weights: ts_rank defaults for the Postgres setweight() labels
+_CASES_BM25 = "bm25(kofa_cases_fts, 1.0, 1.0, 1.0, 0.4, 0.2)"
+_SECTIONS_BM25 = "bm25(kofa_forarbeider_sections_fts, 1.0, 0.4)"
+
+# Columns statistics() may group by (the statistics cube dimensions)
+_STATISTICS_COLUMNS = ("avgjoerelse", "sakstype", "regelverk", "konkurranseform")
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def init_schema(conn: sqlite3.Connection) -> None:
+    """Create all tables and FTS indexes (idempotent)."""
+    conn.executescript(SCHEMA)
+
+
+def rebuild_fts(conn: sqlite3.Connection) -> None:
+    """Rebuild the FTS indexes from their content tables."""
+    for table in FTS_TABLES:
+        conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def fts_query(query: str, operator: str = "AND") -> str | None:
+    """
+    FTS5 MATCH expression for a plain-text query: every word as a quoted
+    prefix term, joined with `operator`. None if the query has no words.
+    """
+    terms = _TERM_RE.findall(query.lower())
+    if operator == "OR":
+        terms = [t for t in terms if len(t) > 1]
+    if not terms:
+        return None
+    return f" {operator} ".join(f'"{t}"*' for t in terms)
+
+
+def _case_info(row: dict, prefix: str = "c_") -> dict:
+    """Nested case dict, shaped like a PostgREST kofa_cases(...) embed."""
+    return {
+        "innklaget": row.pop(f"{prefix}innklaget"),
+        "avgjoerelse": row.pop(f"{prefix}avgjoerelse"),
+        "saken_gjelder": row.pop(f"{prefix}saken_gjelder"),
+        "avsluttet": row.pop(f"{prefix}avsluttet"),
+    }
+
+
+class KofaSqliteBackend:
+    """Read-only KOFA backend on a local SQLite file with FTS5 indexes."""
+
+    # Semantic search needs pgvector; the service falls back to FTS
+    vector_search = False
+
+    def __init__(self, path: str = SQLITE_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"KOFA SQLite database not found: {path} (create it with `kofa snapshot import`)"
+            )
+        self.path = path
+        self._local = threading.local()
+        self._file_id = self._stat()
+
+    def _stat(self) -> tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = 1")
+            conn.execute("PRAGMA mmap_size = 268435456")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _rows(self, sql: str, params: tuple | list = ()) -> list[dict[str, Any]]:
+        return [dict(r) for r in self._conn().execute(sql, params)]
+
+    def _row(self, sql: str, params: tuple | list = ()) -> dict[str, Any] | None:
+        row = self._conn().execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def add_write_listener(self, listener: Callable[[str, str], None]) -> None:
+        """No-op: the database is read-only, so rows never change under a cache."""
+
+    def reconnect(self) -> None:
+        """Drop this thread's connection; the next read opens a new one."""
+        self._local = threading.local()
+
+    # =========================================================================
+    # Read operations
+    # =========================================================================
+
+    def get_case(self, sak_nr: str) -> dict | None:
+        """Get a single case by sak_nr."""
+        return self._row("SELECT * FROM kofa_cases WHERE sak_nr = ?", (sak_nr,))
+
+    def get_cases(self, sak_nrs: list[str]) -> list[dict]:
+        """Cases with these sak_nrs, in one query (unknown ones are left out)."""
+        sak_nrs = sorted(set(sak_nrs))
+        if not sak_nrs:
+            return []
+        marks = ", ".join("?" for _ in sak_nrs)
+        return self._rows(f"SELECT * FROM kofa_cases WHERE sak_nr IN ({marks})", sak_nrs)
+
+    def list_known_ids(self, space: str) -> set[str]:
+        """
+        All ids in an id space: "sak_nr" (kofa_cases) or "eu_case_id"
+        (judgments referenced from KOFA decisions or stored in full).
+        """
+        sql = {
+            "sak_nr": "SELECT sak_nr FROM kofa_cases",
+            "eu_case_id": (
+                "SELECT eu_case_id FROM kofa_eu_references "
+                "UNION SELECT eu_case_id FROM kofa_eu_case_law"
+            ),
+        }[space]
+        return {r[0] for r in self._conn().execute(sql) if r[0]}
+
+    def scan_table(
+        self, table: str, columns: list[str], key: str, page_size: int = 1000
+    ) -> Iterator[dict]:
+        """Yield all rows of `table` in `key` order (page_size is unused)."""
+        cursor = self._conn().execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {key}")
+        for row in cursor:
+            yield dict(row)
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """Full-text search on cases, AND first with OR fallback (like search_kofa)."""
+        results = self._search_cases(fts_query(query), limit)
+        if not results and re.search(r"\s", query):
+            results = self._search_cases(fts_query(query, "OR"), limit)
+        return results
+
+    def _search_cases(self, match: str | None, limit: int) -> list[dict]:
+        if match is None:
+            return []
+        return self._rows(
+            f"SELECT c.sak_nr, c.slug, c.page_url, c.innklaget, c.klager, c.sakstype, "
+            f"c.avgjoerelse, c.saken_gjelder, c.summary, c.avsluttet, c.pdf_url, "
+            f"-{_CASES_BM25} AS rank "
+            f"FROM kofa_cases_fts JOIN kofa_cases c ON c.rowid = kofa_cases_fts.rowid "
+            f"WHERE kofa_cases_fts MATCH ? ORDER BY rank DESC LIMIT ?",
+            (match, limit),
+        )
+
+    def recent_cases(
+        self,
+        limit: int = 20,
+        sakstype: str | None = None,
+        avgjoerelse: str | None = None,
+        innklaget: str | None = None,
+    ) -> list[dict]:
+        """Get recent cases with optional filters."""
+        where, params = ["1"], []
+        if sakstype:
+            where.append("sakstype = ?")
+            params.append(sakstype)
+        if avgjoerelse:
+            where.append("avgjoerelse = ?")
+            params.append(avgjoerelse)
+        if innklaget:
+            where.append("innklaget LIKE ?")
+            params.append(f"%{innklaget}%")
+        return self._rows(
+            f"SELECT * FROM kofa_cases WHERE {' AND '.join(where)} ORDER BY avsluttet DESC LIMIT ?",
+            [*params, limit],
+        )
+
+    def statistics(
+        self,
+        aar: int | None = None,
+        gruppering: str = "avgjoerelse",
+    ) -> list[dict]:
+        """Get aggregate statistics (label, count), like kofa_statistics."""
+        if gruppering not in _STATISTICS_COLUMNS:
+            raise ValueError(f"Unknown grouping: {gruppering}")
+        return self._rows(
+            f"SELECT COALESCE({gruppering}, 'Ukjent') AS label, COUNT(*) AS count "
+            f"FROM kofa_cases "
+            f"WHERE ? IS NULL OR CAST(strftime('%Y', avsluttet) AS INTEGER) = ? "
+            f"GROUP BY {gruppering} ORDER BY count DESC",
+            (aar, aar),
+        )
+
+    def get_statistics_cube(self) -> list[dict]:
+        """Statistics cube rows (as kofa_statistics_cube), aggregated on the fly."""
+        return self._rows(
+            "SELECT CAST(strftime('%Y', avsluttet) AS INTEGER) AS aar, "
+            "COALESCE(avgjoerelse, 'Ukjent') AS avgjoerelse, "
+            "COALESCE(sakstype, 'Ukjent') AS sakstype, "
+            "COALESCE(regelverk, 'Ukjent') AS regelverk, "
+            "COALESCE(konkurranseform, 'Ukjent') AS konkurranseform, "
+            "COUNT(*) AS count "
+            "FROM kofa_cases GROUP BY 1, 2, 3, 4, 5"
+        )
+
+    def get_case_count(self) -> int:
+        """Get total number of cases."""
+        return self._conn().execute("SELECT COUNT(*) FROM kofa_cases").fetchone()[0]
+
+    def get_data_version(self) -> str:
+        """
+        Fingerprint of the sync cursors copied with the data (see
+        KofaSupabaseBackend). A database file replaced by `kofa snapshot
+        import` is reopened here, so the service sees the new version.
+        """
+        file_id = self._stat()
+        if file_id != self._file_id:
+            logger.info(f"{self.path} was replaced, reopening")
+            self._file_id = file_id
+            self.reconnect()
+        rows = self._rows(
+            "SELECT source, cursor_value, last_count, synced_at FROM kofa_sync_meta ORDER BY source"
+        )
+        payload = json.dumps(rows, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    # =========================================================================
+    # Decision text and references
+    # =========================================================================
+
+    def get_decision_text(self, sak_nr: str, section: str | None = None) -> list[dict]:
+        """Get decision text paragraphs, optionally filtered by section."""
+        sql = "SELECT paragraph_number, section, text FROM kofa_decision_text WHERE sak_nr = ?"
+        params: list[Any] = [sak_nr]
+        if section:
+            sql += " AND section = ?"
+            params.append(section)
+        return self._rows(sql + " ORDER BY paragraph_number LIMIT 500", params)
+
+    def get_paragraphs(self, keys: list[tuple[str, int]]) -> list[dict]:
+        """Paragraphs with exactly these (sak_nr, paragraph_number) keys, in one query."""
+        if not keys:
+            return []
+        values = ", ".join("(?, ?)" for _ in keys)
+        return self._rows(
+            "SELECT sak_nr, paragraph_number, section, text FROM kofa_decision_text "
+            f"WHERE (sak_nr, paragraph_number) IN (VALUES {values})",
+            [v for key in keys for v in key],
+        )
+
+    def search_decision_text(
+        self,
+        query: str,
+        section: str | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Full-text search on decision text paragraphs (unsectioned raw text excluded)."""
+        match = fts_query(query)
+        if match is None:
+            return []
+        sql = (
+            "SELECT t.sak_nr, t.section, t.paragraph_number, t.text, "
+            "-bm25(kofa_decision_text_fts) AS rank, c.innklaget, c.avgjoerelse "
+            "FROM kofa_decision_text_fts "
+            "JOIN kofa_decision_text t ON t.id = kofa_decision_text_fts.rowid "
+            "LEFT JOIN kofa_cases c ON c.sak_nr = t.sak_nr "
+            "WHERE kofa_decision_text_fts MATCH ? AND t.section IS NOT 'raw'"
+        )
+        params: list[Any] = [match]
+        if section:
+            sql += " AND t.section = ?"
+            params.append(section)
+        return self._rows(sql + " ORDER BY rank DESC LIMIT ?", [*params, limit])
+
+    _LAW_REF_SELECT = (
+        "SELECT r.sak_nr, r.law_name, r.law_section, r.raw_text, r.context, "
+        "r.regulation_version, c.innklaget AS c_innklaget, c.avgjoerelse AS c_avgjoerelse, "
+        "c.saken_gjelder AS c_saken_gjelder, c.avsluttet AS c_avsluttet "
+        "FROM kofa_law_references r LEFT JOIN kofa_cases c ON c.sak_nr = r.sak_nr "
+    )
+
+    @staticmethod
+    def _section_filter(sections: list[str]) -> tuple[str, list[str]]:
+        """Prefix filter on law_section: '16-10' matches '16-10', '16-10 (1)', etc."""
+        clause = " OR ".join("r.law_section = ? OR r.law_section LIKE ?" for _ in sections)
+        params = [p for s in sections for p in (s, f"{s} %")]
+        return f"({clause})", params
+
+    def _law_refs(self, sql: str, params: list[Any]) -> list[dict]:
+        rows = self._rows(sql, params)
+        for row in rows:
+            row["kofa_cases"] = _case_info(row)
+        return rows
+
+    def find_by_law_reference(
+        self,
+        law_name: str,
+        section: str | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Find KOFA cases citing a specific law section (section prefix match)."""
+        sql = self._LAW_REF_SELECT + "WHERE r.law_name = ?"
+        params: list[Any] = [law_name]
+        if section:
+            clause, section_params = self._section_filter([section])
+            sql += f" AND {clause}"
+            params += section_params
+        return self._law_refs(sql + " ORDER BY r.sak_nr DESC LIMIT ?", [*params, limit])
+
+    def find_cases_by_sections(
+        self,
+        law_name: str,
+        sections: list[str],
+        limit: int = 20,
+    ) -> list[dict]:
+        """Find KOFA cases citing ALL specified sections of a law (AND semantics)."""
+        if not sections:
+            return []
+        matching: set[str] | None = None
+        for section in sections:
+            clause, params = self._section_filter([section])
+            sak_nrs = {
+                r[0]
+                for r in self._conn().execute(
+                    f"SELECT r.sak_nr FROM kofa_law_references r WHERE r.law_name = ? AND {clause}",
+                    [law_name, *params],
+                )
+            }
+            matching = sak_nrs if matching is None else matching & sak_nrs
+            if not matching:
+                return []
+        assert matching is not None
+
+        matching_list = sorted(matching, reverse=True)[:limit]
+        clause, params = self._section_filter(sections)
+        placeholders = ",".join("?" * len(matching_list))
+        return self._law_refs(
+            self._LAW_REF_SELECT + f"WHERE r.law_name = ? AND {clause} "
+            f"AND r.sak_nr IN ({placeholders}) ORDER BY r.sak_nr DESC",
+            [law_name, *params, *matching_list],
+        )
+
+    def count_cases_by_section(self, law_name: str, section: str) -> int:
+        """Count references citing a law section (prefix match)."""
+        clause, params = self._section_filter([section])
+        return (
+            self._conn()
+            .execute(
+                f"SELECT COUNT(*) FROM kofa_law_references r WHERE r.law_name = ? AND {clause}",
+                [law_name, *params],
+            )
+            .fetchone()[0]
+        )
+
+    def find_related_cases(self, sak_nr: str) -> dict:
+        """Cases this case cites and cases citing it (see KofaSupabaseBackend)."""
+        cites = self._rows(
+            "SELECT DISTINCT r.to_sak_nr AS sak_nr, c.innklaget, c.avgjoerelse, "
+            "c.saken_gjelder, c.avsluttet, c.sak_nr IS NULL AS missing "
+            "FROM kofa_case_references r LEFT JOIN kofa_cases c ON c.sak_nr = r.to_sak_nr "
+            "WHERE r.from_sak_nr = ? ORDER BY missing, r.to_sak_nr",
+            (sak_nr,),
+        )
+        # Cases not in the database (older decisions) only carry their number
+        cites = [{"sak_nr": c["sak_nr"]} if c.pop("missing") else c for c in cites]
+
+        cited_by = self._rows(
+            "SELECT DISTINCT r.from_sak_nr AS sak_nr, c.innklaget, c.avgjoerelse, "
+            "c.saken_gjelder, c.avsluttet "
+            "FROM kofa_case_references r JOIN kofa_cases c ON c.sak_nr = r.from_sak_nr "
+            "WHERE r.to_sak_nr = ? ORDER BY r.from_sak_nr DESC",
+            (sak_nr,),
+        )
+        return {"sak_nr": sak_nr, "cites": cites, "cited_by": cited_by}
+
+    def most_cited_cases(self, limit: int = 20) -> list[dict]:
+        """Find the most frequently cited KOFA cases (like kofa_most_cited)."""
+        return self._rows(
+            "SELECT r.to_sak_nr AS sak_nr, COUNT(*) AS cited_count, c.innklaget, "
+            "c.avgjoerelse, c.saken_gjelder, c.avsluttet "
+            "FROM kofa_case_references r LEFT JOIN kofa_cases c ON c.sak_nr = r.to_sak_nr "
+            "GROUP BY r.to_sak_nr ORDER BY cited_count DESC LIMIT ?",
+            (limit,),
+        )
+
+    def get_citation_leaderboards(self, cap: int = LEADERBOARD_CAP) -> list[dict]:
+        """Citation leaderboard rows (as kofa_citation_leaderboard), ranked on the fly."""
+        scoped = (
+            "SELECT {cols}, '' AS scope FROM refs "
+            "UNION ALL SELECT {cols}, 'aar:' || CAST(strftime('%Y', avsluttet) AS INTEGER) "
+            "FROM refs WHERE avsluttet IS NOT NULL "
+            "UNION ALL SELECT {cols}, 'avgjoerelse:' || avgjoerelse "
+            "FROM refs WHERE avgjoerelse IS NOT NULL"
+        )
+        kofa = self._rows(
+            "WITH refs AS ("
+            "  SELECT r.to_sak_nr AS target, c.avsluttet, c.avgjoerelse"
+            "  FROM kofa_case_references r JOIN kofa_cases c ON c.sak_nr = r.from_sak_nr"
+            f"), scoped AS ({scoped.format(cols='target')}), ranked AS ("
+            "  SELECT scope, target, COUNT(*) AS cited_count, ROW_NUMBER() OVER ("
+            "    PARTITION BY scope ORDER BY COUNT(*) DESC, target) AS rank"
+            "  FROM scoped GROUP BY scope, target"
+            ") SELECT 'kofa' AS kind, r.scope, r.rank, r.target, r.cited_count,"
+            "  t.innklaget AS name, t.avgjoerelse, t.saken_gjelder"
+            " FROM ranked r LEFT JOIN kofa_cases t ON t.sak_nr = r.target"
+            " WHERE r.rank <= ? ORDER BY r.scope, r.rank",
+            (cap,),
+        )
+        eu = self._rows(
+            "WITH refs AS ("
+            "  SELECT r.eu_case_id AS target, r.eu_case_name, r.sak_nr, c.avsluttet, c.avgjoerelse"
+            "  FROM kofa_eu_references r JOIN kofa_cases c ON c.sak_nr = r.sak_nr"
+            f"), scoped AS ({scoped.format(cols='target, eu_case_name, sak_nr')}), ranked AS ("
+            "  SELECT scope, target, MAX(eu_case_name) AS name,"
+            "    COUNT(DISTINCT sak_nr) AS cited_count, ROW_NUMBER() OVER ("
+            "    PARTITION BY scope ORDER BY COUNT(DISTINCT sak_nr) DESC, target) AS rank"
+            "  FROM scoped GROUP BY scope, target"
+            ") SELECT 'eu' AS kind, scope, rank, target, cited_count, name,"
+            "  NULL AS avgjoerelse, NULL AS saken_gjelder"
+            " FROM ranked WHERE rank <= ? ORDER BY scope, rank",
+            (cap,),
+        )
+        return eu + kofa
+
+    # =========================================================================
+    # EU case law
+    # =========================================================================
+
+    @staticmethod
+    def _with_index(row: dict | None) -> dict | None:
+        if row is not None and isinstance(row.get("section_index"), str):
+            row["section_index"] = json.loads(row["section_index"])
+        return row
+
+    def get_eu_case_law(self, eu_case_id: str) -> dict | None:
+        """Get a single EU judgment by case ID."""
+        return self._with_index(
+            self._row("SELECT * FROM kofa_eu_case_law WHERE eu_case_id = ?", (eu_case_id,))
+        )
+
+    def get_eu_case_law_meta(self, eu_case_id: str) -> dict | None:
+        """Get an EU judgment's metadata and section_index, without full_text."""
+        return self._with_index(
+            self._row(
+                "SELECT eu_case_id, celex, case_name, judgment_date, subject, description, "
+                "source_url, language, section_index FROM kofa_eu_case_law WHERE eu_case_id = ?",
+                (eu_case_id,),
+            )
+        )
+
+    def get_eu_case_law_slice(self, eu_case_id: str, start: int, length: int) -> str | None:
+        """Get full_text[start:start + length] of an EU judgment."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT substr(full_text, ?, ?) FROM kofa_eu_case_law WHERE eu_case_id = ?",
+                (start + 1, length, eu_case_id),
+            )
+            .fetchone()
+        )
+        return row[0] if row is not None else None
+
+    def find_by_eu_case(self, eu_case_id: str, limit: int = 20) -> list[dict]:
+        """Find KOFA cases citing a specific EU Court case."""
+        rows = self._rows(
+            "SELECT r.sak_nr, r.eu_case_id, r.eu_case_name, r.context, "
+            "c.innklaget AS c_innklaget, c.avgjoerelse AS c_avgjoerelse, "
+            "c.saken_gjelder AS c_saken_gjelder, c.avsluttet AS c_avsluttet "
+            "FROM kofa_eu_references r LEFT JOIN kofa_cases c ON c.sak_nr = r.sak_nr "
+            "WHERE r.eu_case_id = ? ORDER BY r.sak_nr DESC LIMIT ?",
+            (eu_case_id, limit),
+        )
+        for row in rows:
+            row["kofa_cases"] = _case_info(row)
+        return rows
+
+    def most_cited_eu_cases(self, limit: int = 20) -> list[dict]:
+        """Find the EU Court cases cited by the most KOFA decisions."""
+        return self._rows(
+            "SELECT eu_case_id, MAX(eu_case_name) AS eu_case_name, "
+            "COUNT(DISTINCT sak_nr) AS cited_count "
+            "FROM kofa_eu_references GROUP BY eu_case_id "
+            "ORDER BY cited_count DESC, eu_case_id LIMIT ?",
+            (limit,),
+        )
+
+    # =========================================================================
+    # Forarbeider (legislative preparatory works)
+    # =========================================================================
+
+    def get_forarbeide(self, doc_id: str) -> dict | None:
+        """Get a forarbeider document by doc_id."""
+        return self._row("SELECT * FROM kofa_forarbeider WHERE doc_id = ?", (doc_id,))
+
+    def list_forarbeider(self) -> list[dict]:
+        """List all forarbeider documents."""
+        return self._rows("SELECT * FROM kofa_forarbeider ORDER BY doc_id")
+
+    def get_forarbeider_sections(
+        self,
+        doc_id: str,
+        section_number: str | None = None,
+    ) -> list[dict]:
+        """Sections of a document; section_number "4.1" also returns 4.1.1, 4.1.2 etc."""
+        sql = (
+            "SELECT section_number, title, level, page_start, sort_order, text, char_count "
+            "FROM kofa_forarbeider_sections WHERE doc_id = ?"
+        )
+        params: list[Any] = [doc_id]
+        if section_number:
+            sql += " AND (section_number = ? OR section_number LIKE ?)"
+            params += [section_number, f"{section_number}.%"]
+        return self._rows(sql + " ORDER BY sort_order LIMIT 500", params)
+
+    def get_forarbeider_section_rows(self, keys: list[tuple[str, str]]) -> list[dict]:
+        """Sections with exactly these (doc_id, section_number) keys, in one query."""
+        if not keys:
+            return []
+        values = ", ".join("(?, ?)" for _ in keys)
+        return self._rows(
+            "SELECT doc_id, section_number, title, text FROM kofa_forarbeider_sections "
+            f"WHERE (doc_id, section_number) IN (VALUES {values})",
+            [v for key in keys for v in key],
+        )
+
+    def get_forarbeider_toc(self, doc_id: str) -> list[dict]:
+        """Table of contents of a forarbeider document, rolled up to level 1."""
+        return rollup_toc(
+            self._rows(
+                "SELECT section_number, title, level, char_count "
+                "FROM kofa_forarbeider_sections WHERE doc_id = ? ORDER BY sort_order",
+                (doc_id,),
+            )
+        )
+
+    def search_forarbeider(
+        self, query: str, doc_id: str | None = None, limit: int = 20
+    ) -> list[dict]:
+        """Full-text search on forarbeider sections (like search_kofa_forarbeider)."""
+        match = fts_query(query)
+        if match is None:
+            return []
+        sql = (
+            "SELECT s.doc_id, d.title AS doc_title, s.section_number, s.title, s.level, "
+            f"s.text, s.char_count, -{_SECTIONS_BM25} AS rank "
+            "FROM kofa_forarbeider_sections_fts "
+            "JOIN kofa_forarbeider_sections s ON s.id = kofa_forarbeider_sections_fts.rowid "
+            "JOIN kofa_forarbeider d ON d.doc_id = s.doc_id "
+            "WHERE kofa_forarbeider_sections_fts MATCH ? AND LENGTH(s.text) > 0"
+        )
+        params: list[Any] = [match]
+        if doc_id:
+            sql += " AND s.doc_id = ?"
+            params.append(doc_id)
+        return self._rows(sql + " ORDER BY rank DESC LIMIT ?", [*params, limit])
+
+    def find_forarbeider_by_law_reference(
+        self,
+        law_name: str,
+        section: str | None = None,
+        limit: int = 10,
+    ) -> list[dict]:
+        """Find forarbeider sections citing a specific law section."""
+        sql = (
+            "SELECT r.doc_id, r.section_number, r.law_name, r.law_section, r.context, "
+            "d.title FROM kofa_forarbeider_law_refs r "
+            "LEFT JOIN kofa_forarbeider d ON d.doc_id = r.doc_id WHERE r.law_name = ?"
+        )
+        params: list[Any] = [law_name]
+        if section:
+            sql += " AND r.law_section = ?"
+            params.append(section)
+        rows = self._rows(sql + " ORDER BY r.doc_id LIMIT ?", [*params, limit])
+        for row in rows:
+            row["kofa_forarbeider"] = {"title": row.pop("title")}
+        return rows
+
+    # =========================================================================
+    # Status
+    # =========================================================================
+
+    def get_sync_status(self) -> dict:
+        """Sync status in the shape of KofaSupabaseBackend.get_sync_status()."""
+        conn = self._conn()
+
+        def count(sql: str) -> int:
+            return conn.execute(sql).fetchone()[0]
+
+        have_text = count("SELECT COUNT(DISTINCT sak_nr) FROM kofa_decision_text")
+        sectioned = count(
+            "SELECT COUNT(DISTINCT sak_nr) FROM kofa_decision_text WHERE section IS NOT 'raw'"
+        )
+        status: dict[str, Any] = {
+            "cases": self.get_case_count(),
+            "enriched": count("SELECT COUNT(*) FROM kofa_cases WHERE innklaget IS NOT NULL"),
+            "pipeline": {
+                "have_pdf_url": count("SELECT COUNT(*) FROM kofa_cases WHERE pdf_url IS NOT NULL"),
+                "have_text": have_text,
+                "sectioned": sectioned,
+                "raw_only": have_text - sectioned,
+                "law_ref_cases": count("SELECT COUNT(DISTINCT sak_nr) FROM kofa_law_references"),
+                "case_ref_cases": count(
+                    "SELECT COUNT(DISTINCT from_sak_nr) FROM kofa_case_references"
+                ),
+                "eu_ref_cases": count("SELECT COUNT(DISTINCT sak_nr) FROM kofa_eu_references"),
+                "court_ref_cases": count(
+                    "SELECT COUNT(DISTINCT sak_nr) FROM kofa_court_references"
+                ),
+                "eu_case_law_count": count("SELECT COUNT(*) FROM kofa_eu_case_law"),
+                "embeddings": 0,
+                "total_paragraphs": count(
+                    "SELECT COUNT(*) FROM kofa_decision_text WHERE section IS NOT 'raw'"
+                ),
+            },
+        }
+        for row in self._rows("SELECT * FROM kofa_sync_meta"):
+            status[f"sync_{row['source']}"] = {
+                "synced_at": row.get("synced_at"),
+                "last_count": row.get("last_count"),
+                "cursor": row.get("cursor_value"),
+            }
+        return status
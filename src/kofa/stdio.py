@@ -0,0 +1,141 @@
+"""
+Asyncio stdio transport for KOFA MCP server.
+
+Reads newline-delimited JSON-RPC messages from stdin and writes responses
+to stdout as they complete. `tools/call` requests run concurrently in a
+bounded thread pool, as do batches (whose entries MCPServer fans out over
+its own worker pool); everything else (initialize, tools/list, ping, ...)
+is cheap and handled inline in arrival order, so the lifecycle handshake
+is never reordered and `notifications/cancelled` reaches the server while
+the request it cancels is still running.
+
+Usage:
+    from kofa.stdio import run_stdio
+    run_stdio(MCPServer(KofaService()), max_concurrency=8)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from kofa.server import REQUEST_CANCELLED, MCPServer, in_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("KOFA_MAX_CONCURRENCY", "8"))
+
+# Methods dispatched to the worker pool. JSON-RPC does not require responses
+# in request order, so these may complete out of order.
+CONCURRENT_METHODS = frozenset({"tools/call"})
+
+
+def _is_cancelled(response: Any) -> bool:
+    return isinstance(response, dict) and response.get("error", {}).get("code") == REQUEST_CANCELLED
+
+
+def _parse_error(e: Exception) -> dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": None,
+        "error": {"code": -32700, "message": f"Parse error: {e}"},
+    }
+
+
+class StdioTransport:
+    """Concurrent newline-delimited JSON-RPC loop over stdin/stdout."""
+
+    def __init__(
+        self,
+        server: MCPServer,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        stdin=None,
+        stdout=None,
+    ):
+        self.server = server
+        self.max_concurrency = max(1, max_concurrency)
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="kofa-stdio"
+        )
+        self._pending: set[asyncio.Task] = set()
+        # One client per stdio connection
+        self.session_id = uuid.uuid4().hex
+
+    def write(self, message: dict[str, Any] | list[dict[str, Any]]) -> None:
+        """Write one JSON-RPC message. Only called from the event loop thread."""
+        self.stdout.write(json.dumps(message) + "\n")
+        self.stdout.flush()
+
+    def _handle(self, request: Any) -> Any:
+        with in_session(self.session_id):
+            return self.server.handle_request(request)
+
+    async def _dispatch(self, request: Any) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(self._executor, self._handle, request)
+        except Exception as e:
+            logger.exception(f"Unhandled error in stdio dispatch: {e}")
+            request_id = request.get("id") if isinstance(request, dict) else None
+            response = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": -32603, "message": str(e)},
+            }
+        # A cancelled request gets no response: the client has given up on it
+        if response and not _is_cancelled(response):
+            self.write(response)
+
+    def _handle_line(self, line: str) -> None:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.write(_parse_error(e))
+            return
+
+        if isinstance(request, dict) and request.get("method") not in CONCURRENT_METHODS:
+            response = self._handle(request)
+            # Notifications (no id) get no response, as in batches
+            if "id" in request:
+                self.write(response)
+            return
+
+        task = asyncio.create_task(self._dispatch(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def run(self) -> None:
+        """Serve until stdin is closed, then drain in-flight requests."""
+        loop = asyncio.get_running_loop()
+        # Server-initiated notifications (job progress) are written from the loop thread
+        unsubscribe = self.server.notifications.subscribe(
+            lambda message: loop.call_soon_threadsafe(self.write, message), self.session_id
+        )
+        try:
+            while True:
+                # Blocking readline runs on the default executor so the loop
+                # keeps writing responses while we wait for input.
+                line = await loop.run_in_executor(None, self.stdin.readline)
+                if not line:
+                    break
+                line = line.strip()
+                if line:
+                    self._handle_line(line)
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+        finally:
+            unsubscribe()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_stdio(server: MCPServer, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+    """Run the stdio transport until EOF."""
+    asyncio.run(StdioTransport(server, max_concurrency=max_concurrency).run())
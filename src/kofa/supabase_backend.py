@@ -6,16 +6,22 @@ Handles all database operations: upsert, search, sync from WP API and HTML scrap
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import re
 import signal
+import threading
 import time
+from collections.abc import Callable, Iterator
 from datetime import UTC, datetime
+from typing import Any
 
 import httpx
 from bs4 import BeautifulSoup
 
 from kofa._supabase_utils import _row, _rows, get_shared_client, with_retry
+from kofa.backend import LEADERBOARD_CAP, rollup_toc
 from kofa.scraper import CaseMetadata, KofaScraper
 
 logger = logging.getLogger(__name__)
@@ -30,6 +36,32 @@ def _request_shutdown(signum, frame):
     _shutdown_requested = True
 
 
+def _install_shutdown_handlers() -> tuple | None:
+    """
+    Install SIGINT/SIGTERM handlers for graceful stop.
+
+    Signal handlers can only be set from the main thread; when a sync runs
+    in a worker thread (MCP server, background job) this is a no-op.
+    Returns the previous handlers for _restore_shutdown_handlers().
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    previous = (signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM))
+    signal.signal(signal.SIGINT, _request_shutdown)
+    signal.signal(signal.SIGTERM, _request_shutdown)
+    return previous
+
+
+def _restore_shutdown_handlers(previous: tuple | None) -> None:
+    if previous is not None:
+        signal.signal(signal.SIGINT, previous[0])
+        signal.signal(signal.SIGTERM, previous[1])
+
+
+# Progress hook for sync_* methods: (stats dict so far, items done, total or None)
+ProgressCallback = Callable[[dict, int, int | None], None]
+
+
 def _log(msg: str):
     """Print with timestamp (for CLI sync scripts)."""
     ts = datetime.now().strftime("%H:%M:%S")
@@ -42,6 +74,9 @@ WP_API_BASE = "https://www.klagenemndssekretariatet.no/wp-json/wp/v2"
 # HTML tag stripping pattern
 HTML_TAG_RE = re.compile(r"<[^>]+>")
 
+# Columns identifying a statistics cube cell (one row per combination, migration 008)
+CUBE_KEY_COLUMNS = ("aar", "avgjoerelse", "sakstype", "regelverk", "konkurranseform")
+
 
 def _strip_html(text: str) -> str:
     """Strip HTML tags and decode entities."""
@@ -58,6 +93,34 @@ class KofaSupabaseBackend:
 
     def __init__(self):
         self.client = get_shared_client()
+        self._write_listeners: list[Callable[[str, str], None]] = []
+
+    def add_write_listener(self, listener: Callable[[str, str], None]) -> None:
+        """
+        Register `listener(kind, key)`, called after a write touches a row.
+
+        kind is "case" (kofa_cases/kofa_decision_text by sak_nr),
+        "eu_case_law" (by eu_case_id) or "forarbeide" (by doc_id).
+        Used by read caches for invalidation.
+        """
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, kind: str, key: str) -> None:
+        for listener in self._write_listeners:
+            try:
+                listener(kind, key)
+            except Exception as e:
+                logger.warning(f"Write listener failed for {kind} {key}: {e}")
+
+    def reconnect(self) -> None:
+        """
+        Replace the shared client with a new one.
+
+        HTTP connection pools must not be shared across fork(), so each
+        pre-forked worker calls this before serving.
+        """
+        get_shared_client.cache_clear()
+        self.client = get_shared_client()
 
     # =========================================================================
     # Read operations
@@ -69,6 +132,60 @@ class KofaSupabaseBackend:
         result = self.client.table("kofa_cases").select("*").eq("sak_nr", sak_nr).limit(1).execute()
         return _row(result.data)
 
+    @with_retry()
+    def get_cases(self, sak_nrs: list[str]) -> list[dict]:
+        """Cases with these sak_nrs, in one query (unknown ones are left out)."""
+        if not sak_nrs:
+            return []
+        result = self.client.table("kofa_cases").select("*").in_("sak_nr", sorted(set(sak_nrs)))
+        return _rows(result.execute().data)
+
+    def list_known_ids(self, space: str) -> set[str]:
+        """
+        All ids in an id space: "sak_nr" (kofa_cases) or "eu_case_id"
+        (judgments referenced from KOFA decisions or stored in full).
+        """
+        # (table, id column, unique key): the references repeat eu_case_id,
+        # so they are paged by their primary key
+        sources = {
+            "sak_nr": [("kofa_cases", "sak_nr", "sak_nr")],
+            "eu_case_id": [
+                ("kofa_eu_references", "eu_case_id", "id"),
+                ("kofa_eu_case_law", "eu_case_id", "eu_case_id"),
+            ],
+        }[space]
+        ids: set[str] = set()
+        for table, column, key in sources:
+            columns = [column] if key == column else [key, column]
+            ids.update(r[column] for r in self.scan_table(table, columns, key) if r.get(column))
+        return ids
+
+    def scan_table(
+        self, table: str, columns: list[str], key: str, page_size: int = 1000
+    ) -> Iterator[dict]:
+        """
+        Yield all rows of `table` in `key` order (`key` must be unique).
+
+        Reads with keyset pagination (key > last ORDER BY key), so every
+        page is an index range scan however deep into the table it is.
+        """
+        after = None
+        while True:
+            batch = self._scan_page(table, ", ".join(columns), key, after, page_size)
+            yield from batch
+            if len(batch) < page_size:
+                return
+            after = batch[-1][key]
+
+    @with_retry()
+    def _scan_page(
+        self, table: str, columns: str, key: str, after: Any, page_size: int
+    ) -> list[dict]:
+        query = self.client.table(table).select(columns)
+        if after is not None:
+            query = query.gt(key, after)
+        return _rows(query.order(key).limit(page_size).execute().data)
+
     @with_retry()
     def search(self, query: str, limit: int = 20) -> list[dict]:
         """Full-text search using search_kofa() RPC function."""
@@ -96,7 +213,8 @@ class KofaSupabaseBackend:
         if innklaget:
             query = query.ilike("innklaget", f"%{innklaget}%")
 
-        query = query.order("avsluttet", desc=True).limit(limit)
+        # Undated cases last, as in the SQLite backend and the replica
+        query = query.order("avsluttet", desc=True, nullsfirst=False).limit(limit)
         result = query.execute()
         return _rows(result.data)
 
@@ -113,6 +231,35 @@ class KofaSupabaseBackend:
         ).execute()
         return _rows(result.data)
 
+    @with_retry()
+    def get_statistics_cube(self) -> list[dict]:
+        """All rows of the precomputed statistics cube (see migration 008)."""
+        rows: list[dict] = []
+        page_size = 1000
+        offset = 0
+        while True:
+            query = self.client.table("kofa_statistics_cube").select(
+                ", ".join((*CUBE_KEY_COLUMNS, "count"))
+            )
+            # Offset pages are only stable under a total order: sort by the full cell key
+            for column in CUBE_KEY_COLUMNS:
+                query = query.order(column)
+            result = query.range(offset, offset + page_size - 1).execute()
+            batch = _rows(result.data)
+            rows.extend(batch)
+            if len(batch) < page_size:
+                return rows
+            offset += page_size
+
+    def refresh_statistics_cube(self) -> int | None:
+        """Rebuild the statistics cube from kofa_cases; returns the cell count."""
+        try:
+            result = self.client.rpc("kofa_refresh_statistics_cube", {}).execute()
+        except Exception as e:
+            logger.warning(f"Could not refresh statistics cube: {e}")
+            return None
+        return result.data if isinstance(result.data, int) else None
+
     @with_retry()
     def get_case_count(self) -> int:
         """Get total number of cases."""
@@ -134,19 +281,27 @@ class KofaSupabaseBackend:
         if not cases:
             return 0
         self.client.table("kofa_cases").upsert(cases, on_conflict="sak_nr").execute()
+        for case in cases:
+            self._notify_write("case", case["sak_nr"])
         return len(cases)
 
     @with_retry()
     def update_case_metadata(self, sak_nr: str, metadata: dict) -> bool:
         """Update a case with scraped HTML metadata."""
         result = self.client.table("kofa_cases").update(metadata).eq("sak_nr", sak_nr).execute()
+        self._notify_write("case", sak_nr)
         return bool(result.data)
 
     # =========================================================================
     # Sync: WordPress REST API
     # =========================================================================
 
-    def sync_from_wp_api(self, force: bool = False, verbose: bool = False) -> dict:
+    def sync_from_wp_api(
+        self,
+        force: bool = False,
+        verbose: bool = False,
+        progress: ProgressCallback | None = None,
+    ) -> dict:
         """
         Sync all cases from KOFA WordPress REST API.
 
@@ -156,6 +311,7 @@ class KofaSupabaseBackend:
         Args:
             force: Ignore cursor, re-fetch everything
             verbose: Print progress to stdout
+            progress: Called with (stats, pages done, total pages) after each page
 
         Returns:
             dict with sync stats
@@ -276,6 +432,8 @@ class KofaSupabaseBackend:
                 elapsed = time.time() - start_time
                 rate = stats["total"] / (elapsed / 60) if elapsed > 0 else 0
                 total_pages = int(resp.headers.get("X-WP-TotalPages", "1"))
+                if progress:
+                    progress(stats, page, total_pages)
                 log(
                     f"Page {page}/{total_pages} - {stats['upserted']} upserted ({rate:.0f} items/min)"
                 )
@@ -286,8 +444,9 @@ class KofaSupabaseBackend:
                 page += 1
                 time.sleep(0.5)
 
-        # Update sync cursor
+        # Update statistics cube, then the sync cursor (which bumps the data version)
         if stats["upserted"] > 0:
+            self.refresh_statistics_cube()
             now = datetime.now(UTC).isoformat()
             self._update_sync_cursor("wp_api", now, stats["upserted"])
 
@@ -312,6 +471,7 @@ class KofaSupabaseBackend:
         verbose: bool = False,
         force: bool = False,
         refresh_pending: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """
         Scrape HTML metadata for cases not yet scraped.
@@ -327,6 +487,7 @@ class KofaSupabaseBackend:
             max_errors: Stop after N consecutive errors (server might be down)
             force: Re-scrape all cases, even previously scraped ones
             verbose: Print detailed progress to stdout
+            progress: Called with (stats, items done, total) as items are processed
             refresh_pending: Re-scrape cases that were scraped but have no
                 decision yet (avgjoerelse IS NULL AND scraped_at IS NOT NULL)
 
@@ -337,10 +498,7 @@ class KofaSupabaseBackend:
         _shutdown_requested = False
 
         # Install signal handlers for graceful shutdown
-        prev_sigint = signal.getsignal(signal.SIGINT)
-        prev_sigterm = signal.getsignal(signal.SIGTERM)
-        signal.signal(signal.SIGINT, _request_shutdown)
-        signal.signal(signal.SIGTERM, _request_shutdown)
+        prev_handlers = _install_shutdown_handlers()
 
         stats = {
             "scraped": 0,
@@ -469,6 +627,8 @@ class KofaSupabaseBackend:
 
                     # --- Progress ---
                     processed = stats["scraped"] + stats["errors"] + stats["skipped"]
+                    if progress:
+                        progress(stats, processed, total)
                     if processed > 0 and processed % 25 == 0:
                         elapsed_min = (time.time() - start_time) / 60
                         rate = processed / elapsed_min if elapsed_min > 0 else 0
@@ -485,9 +645,7 @@ class KofaSupabaseBackend:
                         time.sleep(delay)
 
         finally:
-            # Restore original signal handlers
-            signal.signal(signal.SIGINT, prev_sigint)
-            signal.signal(signal.SIGTERM, prev_sigterm)
+            _restore_shutdown_handlers(prev_handlers)
 
         # Final summary
         elapsed = time.time() - start_time
@@ -504,8 +662,9 @@ class KofaSupabaseBackend:
         if remaining > 0:
             log(f"Remaining: {remaining} cases")
 
-        # Update sync cursor
+        # Update statistics cube, then the sync cursor (which bumps the data version)
         if stats["scraped"] > 0:
+            self.refresh_statistics_cube()
             self._update_sync_cursor(
                 "html_scrape",
                 datetime.now(UTC).isoformat(),
@@ -552,6 +711,7 @@ class KofaSupabaseBackend:
         max_errors: int = 20,
         verbose: bool = False,
         force: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """
         Download PDFs and extract structured decision text.
@@ -565,6 +725,7 @@ class KofaSupabaseBackend:
             delay: Seconds between downloads (be polite)
             max_errors: Stop after N consecutive errors
             verbose: Print detailed progress to stdout
+            progress: Called with (stats, items done, total) as items are processed
             force: Re-extract all PDFs, even previously extracted ones
 
         Returns:
@@ -575,10 +736,8 @@ class KofaSupabaseBackend:
         global _shutdown_requested
         _shutdown_requested = False
 
-        prev_sigint = signal.getsignal(signal.SIGINT)
-        prev_sigterm = signal.getsignal(signal.SIGTERM)
-        signal.signal(signal.SIGINT, _request_shutdown)
-        signal.signal(signal.SIGTERM, _request_shutdown)
+        # Install signal handlers for graceful shutdown
+        prev_handlers = _install_shutdown_handlers()
 
         stats = {
             "extracted": 0,
@@ -705,6 +864,8 @@ class KofaSupabaseBackend:
 
                 # Progress
                 processed = stats["extracted"] + stats["errors"] + stats["skipped"]
+                if progress:
+                    progress(stats, processed, total)
                 if processed > 0 and processed % 25 == 0:
                     elapsed_min = (time.time() - start_time) / 60
                     rate = processed / elapsed_min if elapsed_min > 0 else 0
@@ -721,8 +882,7 @@ class KofaSupabaseBackend:
                     time.sleep(delay)
 
         finally:
-            signal.signal(signal.SIGINT, prev_sigint)
-            signal.signal(signal.SIGTERM, prev_sigterm)
+            _restore_shutdown_handlers(prev_handlers)
 
         # Final summary
         elapsed = time.time() - start_time
@@ -782,6 +942,7 @@ class KofaSupabaseBackend:
         # Batch insert (PostgREST handles up to ~1000 rows)
         if rows:
             self.client.table("kofa_decision_text").insert(rows).execute()
+        self._notify_write("case", decision.sak_nr)
 
     def _mark_pdf_extracted(self, sak_nr: str) -> None:
         """Mark a case as having had its PDF extracted."""
@@ -790,6 +951,7 @@ class KofaSupabaseBackend:
                 "pdf_extracted_at": datetime.now(UTC).isoformat(),
             }
         ).eq("sak_nr", sak_nr).execute()
+        self._notify_write("case", sak_nr)
 
     # =========================================================================
     # Sync metadata (cursors)
@@ -812,6 +974,24 @@ class KofaSupabaseBackend:
             logger.warning(f"Could not read sync cursor for {source}: {e}")
         return None
 
+    @with_retry()
+    def get_data_version(self) -> str:
+        """
+        Fingerprint of all sync cursors.
+
+        Every sync stage (and the embedding scripts) bumps its row in
+        kofa_sync_meta after writing data, so this changes whenever the
+        served data may have changed.
+        """
+        result = (
+            self.client.table("kofa_sync_meta")
+            .select("source, cursor_value, last_count, synced_at")
+            .order("source")
+            .execute()
+        )
+        payload = json.dumps(_rows(result.data), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
     def _update_sync_cursor(self, source: str, cursor: str, count: int) -> None:
         """Update sync cursor for a source."""
         try:
@@ -836,6 +1016,7 @@ class KofaSupabaseBackend:
         limit: int | None = None,
         verbose: bool = False,
         force: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """
         Extract law and case references from decision text.
@@ -847,6 +1028,7 @@ class KofaSupabaseBackend:
         Args:
             limit: Max number of cases to process (None = all pending)
             verbose: Print progress to stdout
+            progress: Called with (stats, items done, total) as items are processed
             force: Re-extract references for all cases
 
         Returns:
@@ -857,10 +1039,8 @@ class KofaSupabaseBackend:
         global _shutdown_requested
         _shutdown_requested = False
 
-        prev_sigint = signal.getsignal(signal.SIGINT)
-        prev_sigterm = signal.getsignal(signal.SIGTERM)
-        signal.signal(signal.SIGINT, _request_shutdown)
-        signal.signal(signal.SIGTERM, _request_shutdown)
+        # Install signal handlers for graceful shutdown
+        prev_handlers = _install_shutdown_handlers()
 
         stats = {
             "cases_processed": 0,
@@ -998,6 +1178,8 @@ class KofaSupabaseBackend:
 
                 # Progress
                 processed = stats["cases_processed"] + stats["errors"]
+                if progress:
+                    progress(stats, processed, total)
                 if processed > 0 and processed % 50 == 0:
                     elapsed_min = (time.time() - start_time) / 60
                     rate = processed / elapsed_min if elapsed_min > 0 else 0
@@ -1009,8 +1191,7 @@ class KofaSupabaseBackend:
                     )
 
         finally:
-            signal.signal(signal.SIGINT, prev_sigint)
-            signal.signal(signal.SIGTERM, prev_sigterm)
+            _restore_shutdown_handlers(prev_handlers)
 
         elapsed = time.time() - start_time
         status_label = (
@@ -1025,6 +1206,7 @@ class KofaSupabaseBackend:
         )
 
         if stats["cases_processed"] > 0:
+            self.refresh_citation_leaderboards()
             self._update_sync_cursor(
                 "references",
                 datetime.now(UTC).isoformat(),
@@ -1122,6 +1304,22 @@ class KofaSupabaseBackend:
         result = query.execute()
         return _rows(result.data)
 
+    @with_retry()
+    def get_paragraphs(self, keys: list[tuple[str, int]]) -> list[dict]:
+        """Paragraphs with exactly these (sak_nr, paragraph_number) keys, in one query."""
+        if not keys:
+            return []
+        result = (
+            self.client.table("kofa_decision_text")
+            .select("sak_nr, paragraph_number, section, text")
+            .in_("sak_nr", sorted({sak_nr for sak_nr, _ in keys}))
+            .in_("paragraph_number", sorted({number for _, number in keys}))
+            .execute()
+        )
+        # The two IN filters select the cross product: keep the requested pairs
+        wanted = set(keys)
+        return [r for r in _rows(result.data) if (r["sak_nr"], r["paragraph_number"]) in wanted]
+
     @staticmethod
     def _deduplicate_law_refs(refs: list[dict]) -> list[dict]:
         """Deduplicate law references per paragraph (one row per law+section+paragraph)."""
@@ -1381,6 +1579,37 @@ class KofaSupabaseBackend:
         ).execute()
         return _rows(result.data)
 
+    @with_retry()
+    def get_citation_leaderboards(self) -> list[dict]:
+        """All rows of the precomputed citation leaderboards (see migration 009)."""
+        rows: list[dict] = []
+        page_size = 1000
+        offset = 0
+        while True:
+            result = (
+                self.client.table("kofa_citation_leaderboard")
+                .select("kind, scope, rank, target, cited_count, name, avgjoerelse, saken_gjelder")
+                .order("kind")
+                .order("scope")
+                .order("rank")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            batch = _rows(result.data)
+            rows.extend(batch)
+            if len(batch) < page_size:
+                return rows
+            offset += page_size
+
+    def refresh_citation_leaderboards(self, cap: int = LEADERBOARD_CAP) -> int | None:
+        """Rebuild the citation leaderboards from the reference tables; returns the row count."""
+        try:
+            result = self.client.rpc("kofa_refresh_citation_leaderboards", {"p_cap": cap}).execute()
+        except Exception as e:
+            logger.warning(f"Could not refresh citation leaderboards: {e}")
+            return None
+        return result.data if isinstance(result.data, int) else None
+
     # =========================================================================
     # Sync: EU case law (EUR-Lex)
     # =========================================================================
@@ -1392,18 +1621,22 @@ class KofaSupabaseBackend:
         max_errors: int = 20,
         verbose: bool = False,
         force: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """
         Fetch EU Court judgment text from EUR-Lex for cases referenced in KOFA.
 
         Finds EU case IDs in kofa_eu_references that are missing from
-        kofa_eu_case_law, then fetches full text from EUR-Lex HTML.
+        kofa_eu_case_law, then fetches full text from EUR-Lex HTML. Each
+        judgment is stored with its section index; stored judgments that
+        lack one are indexed first.
 
         Args:
             limit: Max number of judgments to fetch (None = all missing)
             delay: Seconds between requests (EUR-Lex robots.txt: 10s)
             max_errors: Stop after N consecutive errors
             verbose: Print progress to stdout
+            progress: Called with (stats, items done, total) as items are processed
             force: Re-fetch all, even previously fetched
 
         Returns:
@@ -1414,15 +1647,14 @@ class KofaSupabaseBackend:
         global _shutdown_requested
         _shutdown_requested = False
 
-        prev_sigint = signal.getsignal(signal.SIGINT)
-        prev_sigterm = signal.getsignal(signal.SIGTERM)
-        signal.signal(signal.SIGINT, _request_shutdown)
-        signal.signal(signal.SIGTERM, _request_shutdown)
+        # Install signal handlers for graceful shutdown
+        prev_handlers = _install_shutdown_handlers()
 
         stats = {
             "fetched": 0,
             "errors": 0,
             "skipped": 0,
+            "indexed": 0,
             "stopped_reason": None,
         }
         start_time = time.time()
@@ -1430,6 +1662,14 @@ class KofaSupabaseBackend:
         log = _log if verbose else lambda msg: logger.info(msg)
 
         try:
+            # Index judgments stored before section_index existed
+            try:
+                stats["indexed"] = self.index_eu_case_law()
+            except Exception as e:
+                logger.warning(f"Could not index EU judgment sections: {e}")
+            if stats["indexed"]:
+                log(f"Indexed sections of {stats['indexed']} stored EU judgments")
+
             # Find EU case IDs referenced in KOFA decisions
             missing = self._find_missing_eu_case_law(force)
 
@@ -1474,6 +1714,8 @@ class KofaSupabaseBackend:
 
                 # Progress
                 processed = stats["fetched"] + stats["errors"] + stats["skipped"]
+                if progress:
+                    progress(stats, processed, total)
                 if processed > 0 and processed % 10 == 0:
                     elapsed_min = (time.time() - start_time) / 60
                     rate = processed / elapsed_min if elapsed_min > 0 else 0
@@ -1490,8 +1732,7 @@ class KofaSupabaseBackend:
                     time.sleep(delay)
 
         finally:
-            signal.signal(signal.SIGINT, prev_sigint)
-            signal.signal(signal.SIGTERM, prev_sigterm)
+            _restore_shutdown_handlers(prev_handlers)
 
         # Final summary
         elapsed = time.time() - start_time
@@ -1567,7 +1808,9 @@ class KofaSupabaseBackend:
         return sorted(referenced - already_fetched)
 
     def _upsert_eu_case_law(self, judgment) -> None:
-        """Upsert a fetched EU judgment into kofa_eu_case_law."""
+        """Upsert a fetched EU judgment (with its section index) into kofa_eu_case_law."""
+        from kofa.eurlex_fetcher import judgment_section_index
+
         row = {
             "eu_case_id": judgment.eu_case_id,
             "celex": judgment.celex,
@@ -1578,8 +1821,37 @@ class KofaSupabaseBackend:
             "full_text": judgment.full_text,
             "source_url": judgment.source_url,
             "language": judgment.language,
+            "section_index": judgment_section_index(judgment.full_text),
         }
         self.client.table("kofa_eu_case_law").upsert(row, on_conflict="eu_case_id").execute()
+        self._notify_write("eu_case_law", judgment.eu_case_id)
+
+    def index_eu_case_law(self) -> int:
+        """
+        Compute section_index for judgments stored without one (or with an
+        index from an older SECTION_INDEX_VERSION). Returns the number updated.
+        """
+        from kofa.eurlex_fetcher import SECTION_INDEX_VERSION, judgment_section_index
+
+        result = (
+            self.client.table("kofa_eu_case_law")
+            .select("eu_case_id")
+            .or_(f"section_index.is.null,section_index->>version.neq.{SECTION_INDEX_VERSION}")
+            .execute()
+        )
+        updated = 0
+        for row in _rows(result.data):
+            eu_case_id = row["eu_case_id"]
+            case_law = self.get_eu_case_law(eu_case_id)
+            if not case_law:
+                continue
+            index = judgment_section_index(case_law.get("full_text") or "")
+            self.client.table("kofa_eu_case_law").update({"section_index": index}).eq(
+                "eu_case_id", eu_case_id
+            ).execute()
+            self._notify_write("eu_case_law", eu_case_id)
+            updated += 1
+        return updated
 
     @with_retry()
     def get_eu_case_law(self, eu_case_id: str) -> dict | None:
@@ -1593,6 +1865,33 @@ class KofaSupabaseBackend:
         )
         return _row(result.data)
 
+    @with_retry()
+    def get_eu_case_law_meta(self, eu_case_id: str) -> dict | None:
+        """Get an EU judgment's metadata and section_index, without full_text."""
+        result = (
+            self.client.table("kofa_eu_case_law")
+            .select(
+                "eu_case_id, celex, case_name, judgment_date, subject, description, "
+                "source_url, language, section_index"
+            )
+            .eq("eu_case_id", eu_case_id)
+            .limit(1)
+            .execute()
+        )
+        return _row(result.data)
+
+    @with_retry()
+    def get_eu_case_law_slice(self, eu_case_id: str, start: int, length: int) -> str | None:
+        """Get full_text[start:start + length] of an EU judgment via RPC."""
+        result = self.client.rpc(
+            "kofa_eu_case_law_slice",
+            {"p_eu_case_id": eu_case_id, "p_start": start, "p_length": length},
+        ).execute()
+        data = result.data
+        if isinstance(data, list):
+            data = data[0] if data else None
+        return data if isinstance(data, str) else None
+
     # =========================================================================
     # Query: EU case references
     # =========================================================================
@@ -1692,9 +1991,56 @@ class KofaSupabaseBackend:
         result = query.execute()
         return _rows(result.data)
 
+    @with_retry()
+    def get_forarbeider_section_rows(self, keys: list[tuple[str, str]]) -> list[dict]:
+        """Sections with exactly these (doc_id, section_number) keys, in one query."""
+        if not keys:
+            return []
+        result = (
+            self.client.table("kofa_forarbeider_sections")
+            .select("doc_id, section_number, title, text")
+            .in_("doc_id", sorted({doc_id for doc_id, _ in keys}))
+            .in_("section_number", sorted({number for _, number in keys}))
+            .execute()
+        )
+        # The two IN filters select the cross product: keep the requested pairs
+        wanted = set(keys)
+        return [r for r in _rows(result.data) if (r["doc_id"], r["section_number"]) in wanted]
+
+    @with_retry()
+    def get_forarbeider_toc(self, doc_id: str) -> list[dict]:
+        """
+        Table of contents of a forarbeider document, rolled up to level 1.
+
+        Reads only the TOC columns (no section text). Returns one dict per
+        level-1 section in document order: section_number, title,
+        char_count (including its subsections) and subsection_count.
+        Sections before the first level-1 heading are not included.
+        """
+        rows: list[dict] = []
+        page_size = 1000
+        offset = 0
+        while True:
+            result = (
+                self.client.table("kofa_forarbeider_sections")
+                .select("section_number, title, level, char_count")
+                .eq("doc_id", doc_id)
+                .order("sort_order")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            batch = _rows(result.data)
+            rows.extend(batch)
+            if len(batch) < page_size:
+                break
+            offset += page_size
+
+        return rollup_toc(rows)
+
     def upsert_forarbeider(self, doc_data: dict) -> None:
         """Upsert a forarbeider document metadata."""
         self.client.table("kofa_forarbeider").upsert(doc_data, on_conflict="doc_id").execute()
+        self._notify_write("forarbeide", doc_data["doc_id"])
 
     def upsert_forarbeider_sections(self, doc_id: str, sections: list[dict]) -> int:
         """Replace all sections for a forarbeider document."""
@@ -1708,6 +2054,7 @@ class KofaSupabaseBackend:
             self.client.table("kofa_forarbeider_sections").insert(batch).execute()
             inserted += len(batch)
 
+        self._notify_write("forarbeide", doc_id)
         return inserted
 
     @with_retry()
@@ -1730,6 +2077,7 @@ class KofaSupabaseBackend:
         pdf_dir: str,
         force: bool = False,
         verbose: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """
         Import forarbeider PDFs from a directory into the database.
@@ -1749,8 +2097,11 @@ class KofaSupabaseBackend:
         pdf_path = Path(pdf_dir)
 
         extractor = ForarbeiderExtractor()
+        filenames = sorted(FORARBEIDER_REGISTRY.keys())
 
-        for filename in sorted(FORARBEIDER_REGISTRY.keys()):
+        for done, filename in enumerate(filenames):
+            if progress:
+                progress(stats, done, len(filenames))
             filepath = pdf_path / filename
             if not filepath.exists():
                 log(f"Ikke funnet: {filename}")
@@ -1816,12 +2167,20 @@ class KofaSupabaseBackend:
             f"{stats['sections']} seksjoner, {stats['errors']} feil"
         )
 
+        if stats["documents"] > 0:
+            self._update_sync_cursor(
+                "forarbeider",
+                datetime.now(UTC).isoformat(),
+                stats["documents"],
+            )
+
         return stats
 
     def sync_forarbeider_references(
         self,
         force: bool = False,
         verbose: bool = False,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """Extract law and EU references from forarbeider section text."""
         from kofa.reference_extractor import ReferenceExtractor
@@ -1842,7 +2201,9 @@ class KofaSupabaseBackend:
 
         extractor = ReferenceExtractor()
 
-        for doc in docs:
+        for done, doc in enumerate(docs):
+            if progress:
+                progress(stats, done, len(docs))
             doc_id = doc["doc_id"]
             try:
                 # Check if already extracted (skip if refs exist and not force)
@@ -1948,6 +2309,13 @@ class KofaSupabaseBackend:
                 logger.error(f"Feil ved referanseekstraksjon for {doc_id}: {e}")
                 stats["errors"] += 1
 
+        if stats["documents"] > 0:
+            self._update_sync_cursor(
+                "forarbeider_references",
+                datetime.now(UTC).isoformat(),
+                stats["documents"],
+            )
+
         return stats
 
     @with_retry()
@@ -0,0 +1,594 @@
+"""
+Memory-mapped embedding matrices for local semantic search.
+
+`kofa vectors export` copies the embeddings of decision text paragraphs
+and forarbeider sections out of Supabase into flat row-major matrix files,
+each with a side index of the row's identity (id, sak_nr, paragraph_number,
+section / id, doc_id, section_number). With KOFA_LOCAL_VECTORS=true, the
+vector search engines rank against these matrices with NumPy instead of
+calling the hybrid search RPCs.
+
+The matrix is opened with np.memmap, so all worker processes on a host
+read the same pages from the OS page cache rather than holding a copy
+each. A search scans it in blocks of rows: every block is widened to
+float32 and multiplied with the query vector (one BLAS matrix-vector
+product), and the block's best rows are merged into a running top-k.
+
+The export also builds an IVF index (the ivfflat scheme of pgvector):
+spherical k-means centroids over a sample of the rows, with the matrix
+stored grouped by nearest centroid, so every inverted list is one
+contiguous range of rows. A search with `nprobe` lists scores the query
+against the centroids and scans only the `nprobe` closest lists;
+nprobe=0 scans everything (exact). `kofa vectors bench` reports
+recall@k against exact search and the latency for a range of nprobe.
+
+Storage types: int8 (default; symmetric per-row scale kept in the side
+index), float16 or float32. int8 is the smallest file and also the fastest
+to scan, since NumPy's float16 -> float32 conversion costs more than the
+product itself; float32 skips the conversion at four times the size.
+
+Files in KOFA_VECTOR_DIR, per corpus:
+
+    decisions.json                   manifest (dtype, dim, count, data files)
+    decisions-<stamp>.vectors        count x dim matrix, grouped by list
+    decisions-<stamp>.index.npy      side index (NumPy structured array)
+    decisions-<stamp>.ivf.npz        centroids and list offsets
+
+An export writes new data files and then replaces the manifest, so a
+running server switches over at its next search; the previous files are
+unlinked but stay readable through existing mappings until then.
+
+NumPy is imported lazily (pip install kofa[local]).
+"""
+
+from __future__ import annotations
+
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOCAL_VECTORS = os.getenv("KOFA_LOCAL_VECTORS", "false").lower() == "true"
+VECTOR_DIR = os.getenv(
+    "KOFA_VECTOR_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "kofa", "vectors"),
+)
+VECTOR_DTYPE = os.getenv("KOFA_VECTOR_DTYPE", "int8")
+
+# Rows per matrix-vector product; bounds the float32 scratch block (~12 MB at 1536-d)
+BLOCK_ROWS = int(os.getenv("KOFA_VECTOR_BLOCK_ROWS", "2048"))
+
+# Inverted lists built at export; 0 = round(sqrt(rows)), negative = no IVF index
+VECTOR_LISTS = int(os.getenv("KOFA_VECTOR_LISTS", "0"))
+# k-means training: sample rows per list, and iterations
+_TRAIN_PER_LIST = 64
+_TRAIN_ITERATIONS = 10
+
+VECTOR_FORMAT = 1
+DTYPES = ("int8", "float16", "float32")
+
+# Source table and side index columns per corpus. Kinds: "int", "str"
+# (fixed-width UTF-8) and "label" (code into a vocabulary in the manifest).
+CORPORA: dict[str, tuple[str, list[tuple[str, str]]]] = {
+    "decisions": (
+        "kofa_decision_text",
+        [("id", "int"), ("sak_nr", "str"), ("paragraph_number", "int"), ("section", "label")],
+    ),
+    "forarbeider": (
+        "kofa_forarbeider_sections",
+        [("id", "int"), ("doc_id", "label"), ("section_number", "str")],
+    ),
+}
+
+
+class VectorIndexError(Exception):
+    """An exported vector index is missing or unreadable."""
+
+
+def manifest_path(corpus: str, directory: str = VECTOR_DIR) -> str:
+    return os.path.join(directory, f"{corpus}.json")
+
+
+def _parse_vector(value: Any) -> list[float]:
+    """pgvector column as returned by PostgREST ("[0.1,...]") or as a list."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _quantize(batch: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Matrix rows in the stored dtype, plus per-row scales for int8."""
+    import numpy as np
+
+    if dtype != "int8":
+        return batch.astype(dtype), None
+    scale = np.abs(batch).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    return np.rint(batch / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+def _side_index(fields: list[tuple[str, str]], side: dict[str, list], scales: list) -> tuple:
+    """Structured side index array and label vocabularies from collected columns."""
+    import numpy as np
+
+    columns: list[tuple[str, Any]] = []
+    values: dict[str, Any] = {}
+    labels: dict[str, list[str | None]] = {}
+    for name, kind in fields:
+        if kind == "int":
+            columns.append((name, "<i8"))
+            values[name] = [v if v is not None else -1 for v in side[name]]
+        elif kind == "str":
+            encoded = [(v or "").encode() for v in side[name]]
+            columns.append((name, f"S{max(map(len, encoded), default=1) or 1}"))
+            values[name] = encoded
+        else:
+            vocab: dict[str | None, int] = {None: 0}
+            values[name] = [vocab.setdefault(v, len(vocab)) for v in side[name]]
+            columns.append((name, "<u2"))
+            labels[name] = list(vocab)
+    if scales:
+        columns.append(("scale", "<f4"))
+        values["scale"] = np.concatenate(scales)
+
+    count = len(side[fields[0][0]])
+    index = np.empty(count, dtype=columns)
+    for name, _ in columns:
+        index[name] = values[name]
+    return index, labels
+
+
+def _decode(matrix: np.ndarray, scale: np.ndarray | None, rows: Any) -> np.ndarray:
+    """Rows of a stored matrix as float32 (int8 rows multiplied by their scale)."""
+    import numpy as np
+
+    block = matrix[rows].astype(np.float32, copy=False)
+    return block * scale[rows][:, None] if scale is not None else block
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each row, in blocks of BLOCK_ROWS."""
+    import numpy as np
+
+    return np.concatenate(
+        [
+            np.argmax(vectors[start : start + BLOCK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), BLOCK_ROWS)
+        ]
+    )
+
+
+def _kmeans(sample: np.ndarray, nlist: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means: unit-length centroids maximizing cosine similarity."""
+    import numpy as np
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(_TRAIN_ITERATIONS):
+        assign = _nearest(sample, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        centroids[filled] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts)
+        # Empty lists restart from a random sample row
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def _build_ivf(
+    matrix: np.ndarray, scale: np.ndarray | None, nlist: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Train `nlist` centroids on a sample and assign every row to its nearest.
+
+    Returns (row permutation grouping rows by list, list offsets into the
+    permuted rows (nlist + 1), centroids).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    count = len(matrix)
+    sample_rows = np.sort(rng.choice(count, min(count, nlist * _TRAIN_PER_LIST), replace=False))
+    centroids = _kmeans(_decode(matrix, scale, sample_rows), nlist, rng)
+    assign = np.concatenate(
+        [
+            _nearest(_decode(matrix, scale, slice(start, start + BLOCK_ROWS)), centroids)
+            for start in range(0, count, BLOCK_ROWS)
+        ]
+    )
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist))))
+    return np.argsort(assign, kind="stable"), offsets, centroids
+
+
+def export_vectors(
+    corpus: str = "decisions",
+    directory: str = VECTOR_DIR,
+    dtype: str = VECTOR_DTYPE,
+    backend: Any = None,
+    page_size: int = 200,
+    lists: int = VECTOR_LISTS,
+) -> dict:
+    """
+    Export the embeddings of `corpus` to a memory-mapped matrix in `directory`.
+
+    Reads from `backend` (default: Supabase) with scan_table(); rows without
+    an embedding are skipped. Vectors are re-normalized to unit length.
+    With `lists` >= 0 an IVF index is built (0 picks sqrt(rows) lists).
+    Returns the manifest.
+    """
+    import numpy as np
+
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported vector dtype {dtype!r} (expected one of {DTYPES})")
+    table, fields = CORPORA[corpus]
+    if backend is None:
+        from kofa.supabase_backend import KofaSupabaseBackend
+
+        backend = KofaSupabaseBackend()
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+    vectors_file = f"{corpus}-{stamp}.vectors"
+    index_file = f"{corpus}-{stamp}.index.npy"
+    ivf_file = f"{corpus}-{stamp}.ivf.npz"
+    vectors_path = os.path.join(directory, vectors_file)
+    index_path = os.path.join(directory, index_file)
+    ivf_path = os.path.join(directory, ivf_file)
+    temporary = [vectors_path + ".flat", vectors_path + ".tmp", index_path + ".tmp"]
+
+    side: dict[str, list] = {name: [] for name, _ in fields}
+    scales: list[np.ndarray] = []
+    dim = 0
+    started = time.monotonic()
+    rows = backend.scan_table(table, [name for name, _ in fields] + ["embedding"], "id", page_size)
+    try:
+        with open(vectors_path + ".flat", "wb") as out:
+            while batch := list(itertools.islice(rows, page_size)):
+                batch = [row for row in batch if row.get("embedding") is not None]
+                if not batch:
+                    continue
+                matrix = np.array([_parse_vector(row["embedding"]) for row in batch], np.float32)
+                if dim and matrix.shape[1] != dim:
+                    raise VectorIndexError(f"{table}: mixed dimensions {dim} and {matrix.shape[1]}")
+                dim = matrix.shape[1]
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix /= np.where(norms > 0, norms, 1.0)
+                stored, scale = _quantize(matrix, dtype)
+                stored.tofile(out)
+                if scale is not None:
+                    scales.append(scale)
+                for name, _ in fields:
+                    side[name].extend(row.get(name) for row in batch)
+
+        if not dim:
+            raise VectorIndexError(f"{table}: no embeddings to export")
+        index, labels = _side_index(fields, side, scales)
+        nlist = min(lists or round(len(index) ** 0.5), len(index)) if lists >= 0 else 0
+        if nlist > 1:
+            flat = np.memmap(vectors_path + ".flat", dtype=dtype, mode="r", shape=(len(index), dim))
+            scale = index["scale"] if "scale" in index.dtype.names else None
+            order, offsets, centroids = _build_ivf(flat, scale, nlist)
+            with open(vectors_path + ".tmp", "wb") as out:
+                for start in range(0, len(order), BLOCK_ROWS):
+                    flat[order[start : start + BLOCK_ROWS]].tofile(out)
+            del flat
+            index = index[order]
+            np.savez(ivf_path, centroids=centroids.astype(np.float32), offsets=offsets)
+        else:
+            nlist = 0
+            os.replace(vectors_path + ".flat", vectors_path + ".tmp")
+        with open(index_path + ".tmp", "wb") as f:
+            np.save(f, index)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(index_path + ".tmp", index_path)
+    finally:
+        for leftover in temporary:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    try:
+        data_version = backend.get_data_version()
+    except Exception as e:
+        logger.warning(f"Could not read data version for vector manifest: {e}")
+        data_version = None
+    manifest = {
+        "format": VECTOR_FORMAT,
+        "corpus": corpus,
+        "table": table,
+        "dtype": dtype,
+        "dim": dim,
+        "count": len(index),
+        "labels": labels,
+        "vectors": vectors_file,
+        "index": index_file,
+        "ivf": ivf_file if nlist else None,
+        "lists": nlist,
+        "data_version": data_version,
+        "created_at": datetime.now(UTC).isoformat(),
+    }
+    path = manifest_path(corpus, directory)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+    keep = {vectors_file, index_file, ivf_file}
+    for stale in glob.glob(os.path.join(glob.escape(directory), f"{corpus}-*")):
+        if os.path.basename(stale) not in keep:
+            os.remove(stale)
+
+    logger.info(
+        f"Exported {len(index):,} {corpus} vectors ({dtype}, {dim}-d, {nlist} lists) "
+        f"in {time.monotonic() - started:.1f} s"
+    )
+    manifest["bytes"] = sum(
+        os.path.getsize(p) for p in (vectors_path, index_path, ivf_path) if os.path.exists(p)
+    )
+    return manifest
+
+
+class _Mapping:
+    """One exported index generation: manifest, mapped matrix and side index."""
+
+    def __init__(self, directory: str, manifest: dict):
+        import numpy as np
+
+        if manifest.get("format") != VECTOR_FORMAT:
+            raise VectorIndexError(f"Unsupported vector index format {manifest.get('format')}")
+        self.manifest = manifest
+        self.count = manifest["count"]
+        self.dim = manifest["dim"]
+        vectors_path = os.path.join(directory, manifest["vectors"])
+        self.matrix = np.memmap(
+            vectors_path, dtype=manifest["dtype"], mode="r", shape=(self.count, self.dim)
+        )
+        self.side = np.load(os.path.join(directory, manifest["index"]), mmap_mode="r")
+        self.scale = self.side["scale"] if "scale" in self.side.dtype.names else None
+        self.labels: dict[str, list[str | None]] = manifest.get("labels", {})
+        self._kinds = {name: self.side.dtype[name].kind for name in self.side.dtype.names}
+        self._subsets: dict[tuple[str, str], np.ndarray] = {}
+        self.bytes = os.path.getsize(vectors_path)
+        self.centroids: np.ndarray | None = None
+        self.offsets: np.ndarray | None = None
+        if manifest.get("ivf"):
+            with np.load(os.path.join(directory, manifest["ivf"])) as ivf:
+                self.centroids = ivf["centroids"]
+                self.offsets = ivf["offsets"]
+
+    def probe(self, query: np.ndarray, nprobe: int) -> list[tuple[int, int]] | None:
+        """
+        Row ranges of the `nprobe` lists closest to `query`, in file order;
+        None (scan everything) without an IVF index or when nprobe covers it.
+        """
+        import numpy as np
+
+        if self.centroids is None or self.offsets is None or not 0 < nprobe < len(self.centroids):
+            return None
+        lists = np.sort(np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe])
+        return [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in lists]
+
+    def rows_where(self, column: str, value: str) -> np.ndarray:
+        """Row numbers whose `column` equals `value` (cached per value)."""
+        import numpy as np
+
+        key = (column, value)
+        rows = self._subsets.get(key)
+        if rows is None:
+            if column in self.labels:
+                vocab = self.labels[column]
+                code = vocab.index(value) if value in vocab else -1
+                rows = np.flatnonzero(self.side[column] == code)
+            else:
+                rows = np.flatnonzero(self.side[column] == value.encode())
+            self._subsets[key] = rows
+        return rows
+
+    def row(self, i: int) -> dict:
+        record = self.side[i]
+        out: dict[str, Any] = {}
+        for name, kind in self._kinds.items():
+            if name == "scale":
+                continue
+            value = record[name]
+            if name in self.labels:
+                out[name] = self.labels[name][int(value)]
+            elif kind == "S":
+                out[name] = bytes(value).decode()
+            else:
+                out[name] = int(value)
+        return out
+
+
+class VectorIndex:
+    """
+    Top-k cosine search over an exported, memory-mapped embedding matrix,
+    exact or through its IVF lists.
+
+    The manifest is re-checked on each search, so a new export is picked up
+    without a restart.
+    """
+
+    def __init__(self, corpus: str = "decisions", directory: str = VECTOR_DIR):
+        self.corpus = corpus
+        self.directory = directory
+        self.path = manifest_path(corpus, directory)
+        self._lock = threading.Lock()
+        self._file_id: tuple[int, int] | None = None
+        self._mapping: _Mapping | None = None
+        self._current()
+
+    def _current(self) -> _Mapping:
+        """Mapping of the current export, reopened when the manifest was replaced."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError as e:
+            raise VectorIndexError(
+                f"No exported vectors at {self.path} (run: kofa vectors export)"
+            ) from e
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or self._mapping is None:
+            with self._lock:
+                if file_id != self._file_id or self._mapping is None:
+                    with open(self.path) as f:
+                        self._mapping = _Mapping(self.directory, json.load(f))
+                    self._file_id = file_id
+                    logger.info(
+                        f"Mapped {self._mapping.count:,} {self.corpus} vectors from {self.path}"
+                    )
+        return self._mapping
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 10,
+        filters: dict[str, str | None] | None = None,
+        nprobe: int = 0,
+    ) -> list[tuple[dict, float]]:
+        """
+        The `k` rows most similar to the unit-normalized `query`, best first,
+        as (side index row, cosine similarity). `filters` restricts rows by
+        equality on side index columns; None values are ignored. `nprobe`
+        > 0 scans only that many IVF lists (approximate); 0 is exact.
+        """
+        mapping = self._current()
+        return [
+            (mapping.row(row), score)
+            for row, score in self._search(mapping, query, k, filters, nprobe)[0]
+        ]
+
+    def _search(
+        self,
+        mapping: _Mapping,
+        query: Sequence[float],
+        k: int,
+        filters: dict[str, str | None] | None,
+        nprobe: int,
+    ) -> tuple[list[tuple[int, float]], int]:
+        """Top-k as (row number, similarity), and the number of rows scored."""
+        import numpy as np
+
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (mapping.dim,):
+            raise ValueError(f"Query has {q.size} dimensions, index has {mapping.dim}")
+
+        subset = None
+        for column, value in (filters or {}).items():
+            if value is not None:
+                rows = mapping.rows_where(column, value)
+                subset = rows if subset is None else np.intersect1d(subset, rows)
+        ranges = mapping.probe(q, nprobe) or [(0, mapping.count)]
+        if subset is not None:
+            # A filter smaller than the probed lists is scanned exactly
+            if len(subset) > sum(stop - start for start, stop in ranges):
+                probed = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+                subset = np.intersect1d(subset, probed, assume_unique=True)
+            chunks: list[Any] = [
+                subset[i : i + BLOCK_ROWS] for i in range(0, len(subset), BLOCK_ROWS)
+            ]
+        else:
+            chunks = [
+                slice(i, min(i + BLOCK_ROWS, stop))
+                for start, stop in ranges
+                for i in range(start, stop, BLOCK_ROWS)
+            ]
+        if k <= 0 or not chunks:
+            return [], 0
+
+        best_rows: list[np.ndarray] = []
+        best_scores: list[np.ndarray] = []
+        scanned = 0
+        for chunk in chunks:
+            if isinstance(chunk, slice):
+                rows = np.arange(chunk.start, chunk.stop)
+            else:
+                rows = chunk
+            block = mapping.matrix[chunk]
+            scanned += len(rows)
+            scores = block.astype(np.float32, copy=False) @ q
+            if mapping.scale is not None:
+                scores *= mapping.scale[rows]
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                rows, scores = rows[top], scores[top]
+            best_rows.append(rows)
+            best_scores.append(scores)
+
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(int(rows[i]), float(scores[i])) for i in order], scanned
+
+    def stats(self) -> dict:
+        mapping = self._current()
+        return {
+            "count": mapping.count,
+            "dim": mapping.dim,
+            "dtype": mapping.manifest["dtype"],
+            "lists": mapping.manifest.get("lists", 0),
+            "bytes": mapping.bytes,
+            "data_version": mapping.manifest.get("data_version"),
+            "created_at": mapping.manifest.get("created_at"),
+        }
+
+
+def benchmark(
+    index: VectorIndex, probes: Sequence[int], queries: int = 100, k: int = 10
+) -> list[dict]:
+    """
+    Recall@k and latency of IVF search against exact search (nprobe=0).
+
+    Queries are corpus vectors sampled at random; each query's own row is
+    left out of both result lists. Returns one dict per nprobe with recall,
+    p50/p95 latency in ms and the mean fraction of rows scanned.
+    """
+    import numpy as np
+
+    mapping = index._current()
+    rng = np.random.default_rng(0)
+    sample = rng.choice(mapping.count, min(queries, mapping.count), replace=False)
+    vectors = _decode(mapping.matrix, mapping.scale, np.sort(sample))
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def run(nprobe: int) -> tuple[list[list[int]], list[float], list[int]]:
+        found, times, scanned = [], [], []
+        for row, q in zip(np.sort(sample), vectors, strict=True):
+            started = time.perf_counter()
+            hits, n = index._search(mapping, q, k + 1, None, nprobe)
+            times.append(time.perf_counter() - started)
+            found.append([r for r, _ in hits if r != row][:k])
+            scanned.append(n)
+        return found, times, scanned
+
+    exact, _, _ = run(0)
+    report = []
+    for nprobe in [0, *probes]:
+        found, times, scanned = run(nprobe)
+        recall = [len(set(a) & set(b)) / len(b) for a, b in zip(found, exact, strict=True) if b]
+        report.append(
+            {
+                "nprobe": nprobe,
+                "recall": float(np.mean(recall)) if recall else 1.0,
+                "p50_ms": float(np.percentile(times, 50)) * 1e3,
+                "p95_ms": float(np.percentile(times, 95)) * 1e3,
+                "scanned": float(np.mean(scanned)) / mapping.count,
+            }
+        )
+    return report
+
+
+def open_index(corpus: str, directory: str = VECTOR_DIR) -> VectorIndex | None:
+    """Open the exported index for `corpus`, or None if missing or unreadable."""
+    try:
+        return VectorIndex(corpus, directory)
+    except (VectorIndexError, ImportError, OSError, ValueError, KeyError) as e:
+        logger.warning(f"Local {corpus} vectors unavailable, using the database: {e}")
+        return None
@@ -8,10 +8,20 @@ for best results on both natural language and legal terminology.
 import logging
 import math
 import os
+import threading
+from array import array
 from dataclasses import dataclass
-from functools import lru_cache
-
-from kofa._supabase_utils import _rows, get_shared_client, with_retry
+from typing import Any
+
+from kofa._supabase_utils import (
+    _rows,
+    check_budget,
+    get_shared_client,
+    mark_degraded,
+    remaining_time,
+    with_retry,
+)
+from kofa.cache import MISSING, LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,47 +30,60 @@ EMBEDDING_DIM = 1536
 DEFAULT_FTS_WEIGHT = 0.3  # Lower than lovdata (0.5) — short paragraphs have noisy FTS rank
 TASK_TYPE_QUERY = "RETRIEVAL_QUERY"
 
+# Query embeddings kept in memory (~6 KB each as float32)
+EMBED_CACHE_SIZE = int(os.getenv("KOFA_EMBED_CACHE_SIZE", "2000"))
 
-@dataclass
-class KofaSearchResult:
-    """Result from hybrid vector search on KOFA decision text."""
 
-    sak_nr: str
-    paragraph_number: int
-    section: str
-    text: str
-    similarity: float
-    fts_rank: float
-    combined_score: float
-    innklaget: str | None
-    sakstype: str | None
-    avgjoerelse: str | None
-    avsluttet: str | None
+def _embed_config(types):
+    """EmbedContentConfig for a query, with the HTTP timeout capped to the call's deadline."""
+    http_options = None
+    remaining = remaining_time()
+    if remaining is not None:
+        http_options = types.HttpOptions(timeout=max(1, int(remaining * 1000)))
+    return types.EmbedContentConfig(
+        task_type=TASK_TYPE_QUERY,
+        output_dimensionality=EMBEDDING_DIM,
+        http_options=http_options,
+    )
 
 
-class KofaVectorSearch:
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: case-folded, whitespace collapsed."""
+    return " ".join(query.split()).casefold()
+
+
+class QueryEmbedder:
     """
-    Hybrid vector search for KOFA decision text.
+    Gemini query embeddings with a bounded in-memory cache.
 
-    Combines semantic vector search with PostgreSQL FTS for
-    best results on both natural language and legal terminology.
+    One instance is shared by the decision-text and forarbeider searches
+    (same model, dimensionality and task type), so a repeated query skips
+    the embedding API regardless of corpus. Vectors are unit-normalized and
+    stored as float32 arrays. Behind the in-memory cache sits the on-disk
+    EmbeddingStore shared by all processes on the host (if enabled).
     """
 
-    def __init__(self):
-        self.supabase = get_shared_client()
+    def __init__(self, cache_size: int = EMBED_CACHE_SIZE, store: Any = MISSING):
+        self.cache = LRUCache(maxsize=cache_size)
+        if store is MISSING:
+            from kofa._embedding_store import open_store
+
+            store = open_store()
+        self.store = store
         self._genai_client = None
+        self._client_lock = threading.Lock()
 
     def _get_genai_client(self):
         """Get or create Gemini API client lazily."""
-        if self._genai_client is not None:
-            return self._genai_client
-
-        from google import genai
-
-        api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY must be set for vector search")
-        self._genai_client = genai.Client(api_key=api_key)
+        if self._genai_client is None:
+            with self._client_lock:
+                if self._genai_client is None:
+                    from google import genai
+
+                    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+                    if not api_key:
+                        raise ValueError("GEMINI_API_KEY must be set for vector search")
+                    self._genai_client = genai.Client(api_key=api_key)
         return self._genai_client
 
     @staticmethod
@@ -69,23 +92,80 @@ class KofaVectorSearch:
         norm = math.sqrt(sum(x * x for x in embedding))
         return [x / norm for x in embedding] if norm > 0 else embedding
 
-    @lru_cache(maxsize=1000)
-    def _generate_query_embedding(self, query: str) -> tuple[float, ...]:
-        """Generate embedding for search query with caching."""
+    def embed(self, query: str) -> list[float]:
+        """Unit-normalized query embedding, from cache when possible."""
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached.tolist()
+
+        store_key = (EMBEDDING_MODEL, EMBEDDING_DIM, TASK_TYPE_QUERY, key)
+        if self.store is not None:
+            stored = self.store.get(*store_key)
+            if stored is not None:
+                vector = array("f", stored)
+                self.cache.set(key, vector)
+                return vector.tolist()
+
         from google.genai import types
 
         client = self._get_genai_client()
         result = client.models.embed_content(
             model=EMBEDDING_MODEL,
             contents=query,
-            config=types.EmbedContentConfig(
-                task_type=TASK_TYPE_QUERY,
-                output_dimensionality=EMBEDDING_DIM,
-            ),
+            config=_embed_config(types),
         )
         embedding = result.embeddings[0]  # type: ignore[index]
         normalized = self._normalize(list(embedding.values))  # type: ignore[arg-type]
-        return tuple(normalized)
+        vector = array("f", normalized)
+        self.cache.set(key, vector)
+        if self.store is not None:
+            self.store.put(*store_key, normalized)
+        return vector.tolist()
+
+
+@dataclass
+class KofaSearchResult:
+    """Result from hybrid vector search on KOFA decision text."""
+
+    sak_nr: str
+    paragraph_number: int
+    section: str
+    text: str
+    similarity: float
+    fts_rank: float
+    combined_score: float
+    innklaget: str | None
+    sakstype: str | None
+    avgjoerelse: str | None
+    avsluttet: str | None
+
+
+class KofaVectorSearch:
+    """
+    Hybrid vector search for KOFA decision text.
+
+    Combines semantic vector search with PostgreSQL FTS for
+    best results on both natural language and legal terminology.
+
+    With a local `index` (kofa.vector_index.VectorIndex) paragraphs are
+    ranked against the exported embedding matrix instead, by vector
+    similarity alone; `ivfflat_probes` then sets the number of IVF lists
+    scanned. Text and case fields of the hits are read through `backend`
+    (and its caches), as is full-text search.
+    """
+
+    def __init__(
+        self, embedder: QueryEmbedder | None = None, index: Any = None, backend: Any = None
+    ):
+        self.index = index
+        self.backend = backend
+        self.supabase = get_shared_client() if index is None else None
+        self.embedder = embedder or QueryEmbedder()
+
+    def _generate_query_embedding(self, query: str) -> tuple[float, ...]:
+        """Generate embedding for search query (cached by the embedder)."""
+        return tuple(self.embedder.embed(query))
 
     @with_retry()
     def search(
@@ -104,9 +184,17 @@ class KofaVectorSearch:
         try:
             query_embedding = list(self._generate_query_embedding(query))
         except Exception as e:
+            # No FTS fallback for a call that has been cancelled or timed out
+            check_budget()
+            if self.index is not None:
+                raise
             logger.error(f"Embedding API error, falling back to FTS: {e}")
+            mark_degraded()
             return self._fallback_fts_search(query, limit, section)
 
+        if self.index is not None:
+            return self._search_local(query_embedding, limit, section, ivfflat_probes)
+
         result = self.supabase.rpc(
             "search_kofa_decision_hybrid",
             {
@@ -139,23 +227,62 @@ class KofaVectorSearch:
             for row in _rows(result.data)
         ]
 
+    def _search_local(
+        self, query_embedding: list[float], limit: int, section: str | None, nprobe: int
+    ) -> list[KofaSearchResult]:
+        """Top paragraphs from the local index; hits no longer in the backend are dropped."""
+        results = []
+        hits = self.index.search(query_embedding, limit, {"section": section}, nprobe)
+        keys = [(row["sak_nr"], row["paragraph_number"]) for row, _ in hits]
+        paragraphs = {
+            (p["sak_nr"], p["paragraph_number"]): p for p in self.backend.get_paragraphs(keys)
+        }
+        cases = {
+            c["sak_nr"]: c
+            for c in self.backend.get_cases(list(dict.fromkeys(s for s, _ in paragraphs)))
+        }
+        for (row, similarity), key in zip(hits, keys, strict=True):
+            paragraph = paragraphs.get(key)
+            if paragraph is None or paragraph.get("section") != row["section"]:
+                continue
+            sak_nr = row["sak_nr"]
+            case = cases.get(sak_nr, {})
+            results.append(
+                KofaSearchResult(
+                    sak_nr=sak_nr,
+                    paragraph_number=row["paragraph_number"],
+                    section=row["section"],
+                    text=paragraph.get("text", ""),
+                    similarity=similarity,
+                    fts_rank=0.0,
+                    combined_score=similarity,
+                    innklaget=case.get("innklaget"),
+                    sakstype=case.get("sakstype"),
+                    avgjoerelse=case.get("avgjoerelse"),
+                    avsluttet=case.get("avsluttet"),
+                )
+            )
+        return results
+
     def _fallback_fts_search(
         self, query: str, limit: int, section: str | None = None
     ) -> list[KofaSearchResult]:
         """Fallback to pure FTS when embedding API fails."""
         logger.warning(f"Fallback to FTS for query: {query[:50]}...")
 
-        result = self.supabase.rpc(
-            "search_kofa_decision_text",
-            {
-                "search_query": query,
-                "section_filter": section,
-                "max_results": limit,
-            },
-        ).execute()
-
-        if not result.data:
-            return []
+        if self.supabase is None:
+            # Local index: the backend's full-text search (same rows as the RPC)
+            rows = self.backend.search_decision_text(query, section, limit)
+        else:
+            result = self.supabase.rpc(
+                "search_kofa_decision_text",
+                {
+                    "search_query": query,
+                    "section_filter": section,
+                    "max_results": limit,
+                },
+            ).execute()
+            rows = _rows(result.data)
 
         return [
             KofaSearchResult(
@@ -171,7 +298,7 @@ class KofaVectorSearch:
                 avgjoerelse=row.get("avgjoerelse"),
                 avsluttet=row.get("avsluttet"),
             )
-            for row in _rows(result.data)
+            for row in rows
         ]
 
     def search_fts(
@@ -199,45 +326,20 @@ class ForarbeiderVectorSearch:
     """
     Hybrid vector search for forarbeider sections.
 
-    Combines semantic vector search with PostgreSQL FTS.
+    Combines semantic vector search with PostgreSQL FTS, or ranks against
+    a local `index` as KofaVectorSearch does.
     """
 
-    def __init__(self):
-        self.supabase = get_shared_client()
-        self._genai_client = None
-
-    def _get_genai_client(self):
-        if self._genai_client is not None:
-            return self._genai_client
-        from google import genai
-
-        api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY must be set for vector search")
-        self._genai_client = genai.Client(api_key=api_key)
-        return self._genai_client
-
-    @staticmethod
-    def _normalize(embedding: list[float]) -> list[float]:
-        norm = math.sqrt(sum(x * x for x in embedding))
-        return [x / norm for x in embedding] if norm > 0 else embedding
+    def __init__(
+        self, embedder: QueryEmbedder | None = None, index: Any = None, backend: Any = None
+    ):
+        self.index = index
+        self.backend = backend
+        self.supabase = get_shared_client() if index is None else None
+        self.embedder = embedder or QueryEmbedder()
 
-    @lru_cache(maxsize=1000)
     def _generate_query_embedding(self, query: str) -> tuple[float, ...]:
-        from google.genai import types
-
-        client = self._get_genai_client()
-        result = client.models.embed_content(
-            model=EMBEDDING_MODEL,
-            contents=query,
-            config=types.EmbedContentConfig(
-                task_type=TASK_TYPE_QUERY,
-                output_dimensionality=EMBEDDING_DIM,
-            ),
-        )
-        embedding = result.embeddings[0]  # type: ignore[index]
-        normalized = self._normalize(list(embedding.values))  # type: ignore[arg-type]
-        return tuple(normalized)
+        return tuple(self.embedder.embed(query))
 
     @with_retry()
     def search(
@@ -252,9 +354,17 @@ class ForarbeiderVectorSearch:
         try:
             query_embedding = list(self._generate_query_embedding(query))
         except Exception as e:
+            # No FTS fallback for a call that has been cancelled or timed out
+            check_budget()
+            if self.index is not None:
+                raise
             logger.error(f"Embedding API error, falling back to FTS: {e}")
+            mark_degraded()
             return self._fallback_fts_search(query, limit, doc_id)
 
+        if self.index is not None:
+            return self._search_local(query_embedding, limit, doc_id, ivfflat_probes)
+
         result = self.supabase.rpc(
             "search_kofa_forarbeider_hybrid",
             {
@@ -284,23 +394,58 @@ class ForarbeiderVectorSearch:
             for row in _rows(result.data)
         ]
 
+    def _search_local(
+        self, query_embedding: list[float], limit: int, doc_id: str | None, nprobe: int
+    ) -> list[ForarbeiderSearchResult]:
+        """Top sections from the local index; empty or removed sections are dropped."""
+        results = []
+        hits = self.index.search(query_embedding, limit, {"doc_id": doc_id}, nprobe)
+        keys = [(row["doc_id"], row["section_number"]) for row, _ in hits]
+        sections = {
+            (s["doc_id"], s["section_number"]): s
+            for s in self.backend.get_forarbeider_section_rows(keys)
+        }
+        doc_titles = {
+            d: (self.backend.get_forarbeide(d) or {}).get("title", "")
+            for d in dict.fromkeys(d for d, _ in sections)
+        }
+        for (row, similarity), key in zip(hits, keys, strict=True):
+            section = sections.get(key)
+            if not section or not section.get("text"):
+                continue
+            results.append(
+                ForarbeiderSearchResult(
+                    doc_id=row["doc_id"],
+                    doc_title=doc_titles[row["doc_id"]],
+                    section_number=row["section_number"],
+                    title=section.get("title", ""),
+                    text=section["text"],
+                    similarity=similarity,
+                    fts_rank=0.0,
+                    combined_score=similarity,
+                )
+            )
+        return results
+
     def _fallback_fts_search(
         self, query: str, limit: int, doc_id: str | None = None
     ) -> list[ForarbeiderSearchResult]:
         """Fallback to pure FTS when embedding API fails."""
         logger.warning(f"Fallback to FTS for query: {query[:50]}...")
 
-        result = self.supabase.rpc(
-            "search_kofa_forarbeider",
-            {
-                "search_query": query,
-                "doc_filter": doc_id,
-                "max_results": limit,
-            },
-        ).execute()
-
-        if not result.data:
-            return []
+        if self.supabase is None:
+            # Local index: the backend's full-text search (same rows as the RPC)
+            rows = self.backend.search_forarbeider(query, doc_id, limit)
+        else:
+            result = self.supabase.rpc(
+                "search_kofa_forarbeider",
+                {
+                    "search_query": query,
+                    "doc_filter": doc_id,
+                    "max_results": limit,
+                },
+            ).execute()
+            rows = _rows(result.data)
 
         return [
             ForarbeiderSearchResult(
@@ -313,5 +458,5 @@ class ForarbeiderVectorSearch:
                 fts_rank=row.get("rank", 0.0),
                 combined_score=row.get("rank", 0.0),
             )
-            for row in _rows(result.data)
+            for row in rows
         ]
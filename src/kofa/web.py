@@ -4,18 +4,30 @@ Flask blueprint factory for KOFA MCP server.
 Usage:
     from kofa.web import create_mcp_blueprint
     app.register_blueprint(create_mcp_blueprint(), url_prefix="/mcp")
+
+Pass a pre-built (and warmed) MCPServer to share it with the caller, e.g.
+in the pre-fork server (`kofa.prefork`). /health then reports 503 until
+the server has warmed up.
 """
 
 
-def create_mcp_blueprint():
+def create_mcp_blueprint(server=None):
     """Create and return Flask MCP blueprint."""
     from flask import Blueprint, Response, jsonify, request
 
     from kofa import KofaService, MCPServer
+    from kofa._http import (
+        SESSION_HEADER,
+        SSE_CONTENT_TYPE,
+        SSE_HEADERS,
+        handle_mcp_post,
+        sse_stream,
+        wants_sse,
+    )
 
     mcp_bp = Blueprint("kofa_mcp", __name__)
 
-    _mcp_server = None
+    _mcp_server = server
 
     def get_mcp_server():
         nonlocal _mcp_server
@@ -30,19 +42,28 @@ def create_mcp_blueprint():
             headers={"MCP-Protocol-Version": "2025-06-18", "Content-Type": "application/json"},
         )
 
+    @mcp_bp.route("/", methods=["GET"])
+    def mcp_events():
+        # Streamable HTTP: GET opens an SSE stream for server notifications
+        if not wants_sse(request.headers.get("Accept")):
+            return Response(status=405, headers={"Allow": "HEAD, POST"})
+        return Response(
+            sse_stream(get_mcp_server(), request.headers.get(SESSION_HEADER)),
+            mimetype=SSE_CONTENT_TYPE,
+            headers=SSE_HEADERS,
+        )
+
     @mcp_bp.route("/", methods=["POST"])
     def mcp_post():
-        body = request.get_json()
-        if not body:
-            return jsonify(
-                {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Empty body"}}
-            ), 400
-        server = get_mcp_server()
-        response = server.handle_request(body)
-        return jsonify(response)
+        result = handle_mcp_post(get_mcp_server(), request.get_data(), request.headers)
+        return Response(result.body, status=result.status, headers=result.headers)
 
     @mcp_bp.route("/health", methods=["GET"])
     def mcp_health():
+        # A provided server is only healthy once warmed; it retries in the background
+        if server is not None and not server.ready:
+            server.warm_up_in_background()
+            return jsonify({"status": "starting", "server": "kofa", "version": "0.1.0"}), 503
         return jsonify({"status": "ok", "server": "kofa", "version": "0.1.0"})
 
     return mcp_bp
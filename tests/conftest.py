@@ -0,0 +1,136 @@
+import json
+import sqlite3
+
+import pytest
+from helpers import FakeClient, FakeService
+
+from kofa.server import MCPServer
+from kofa.sqlite_backend import init_schema, rebuild_fts
+from kofa.supabase_backend import KofaSupabaseBackend
+
+SECTIONS = ("bakgrunn", "vurdering", "konklusjon")
+
+
+@pytest.fixture
+def service():
+    return FakeService()
+
+
+@pytest.fixture
+def server(service):
+    return MCPServer(service)
+
+
+def build_corpus(path):
+    """
+    Small corpus in the KofaSqliteBackend schema: 30 cases 2023/1000-1029
+    with decision text and law, case and EU references, one EU judgment
+    and one forarbeider document.
+    """
+    conn = sqlite3.connect(path)
+    init_schema(conn)
+    for i in range(30):
+        sak_nr = f"2023/{1000 + i}"
+        conn.execute(
+            "INSERT INTO kofa_cases (sak_nr, innklaget, klager, saken_gjelder, summary, "
+            "avgjoerelse, sakstype, avsluttet, regelverk, konkurranseform) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                sak_nr,
+                f"Oslo kommune {i % 3}",
+                "Leverandør AS",
+                "Avvisning av tilbud" if i % 2 else "Tildelingskriterier",
+                f"Sammendrag av sak {sak_nr}",
+                "Brudd på regelverket" if i % 2 else "Ikke brudd på regelverket",
+                "Gebyrsak" if i % 5 == 0 else "Rådgivende sak",
+                # The last case has no closing date
+                f"{2020 + i % 4}-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i < 29 else None,
+                "FOA 2016",
+                "Åpen anbudskonkurranse",
+            ),
+        )
+        for n, section in enumerate(SECTIONS, start=1):
+            conn.execute(
+                "INSERT INTO kofa_decision_text (sak_nr, paragraph_number, section, text) "
+                "VALUES (?, ?, ?, ?)",
+                (sak_nr, n, section, f"Avsnitt {n} om forutberegnelighet i {section} {sak_nr}"),
+            )
+        for section, every in (("24-8 (1)", 2), ("8-3", 3)):
+            if i % every == 0:
+                conn.execute(
+                    "INSERT INTO kofa_law_references (sak_nr, reference_type, law_name, "
+                    "law_section) VALUES (?, 'lov', 'anskaffelsesforskriften', ?)",
+                    (sak_nr, section),
+                )
+        if i > 0:
+            conn.execute(
+                "INSERT INTO kofa_case_references (from_sak_nr, to_sak_nr) VALUES (?, ?)",
+                (sak_nr, "2023/1000"),
+            )
+        if i % 4 == 0:
+            conn.execute(
+                "INSERT INTO kofa_eu_references (sak_nr, eu_case_id, eu_case_name) "
+                "VALUES (?, 'C-19/00', 'SIAC')",
+                (sak_nr,),
+            )
+    conn.execute(
+        "INSERT INTO kofa_case_references (from_sak_nr, to_sak_nr) VALUES ('2023/1001', '2015/12')"
+    )
+    # A second mention in the same case counts once
+    conn.execute(
+        "INSERT INTO kofa_eu_references (sak_nr, eu_case_id, eu_case_name) "
+        "VALUES ('2023/1000', 'C-19/00', 'SIAC')"
+    )
+    conn.execute(
+        "INSERT INTO kofa_eu_references (sak_nr, eu_case_id, eu_case_name) "
+        "VALUES ('2023/1001', 'C-27/15', 'Pippo Pizzo')"
+    )
+    full_text = "Sammendrag. " + "Begrunnelse om likebehandling. " * 20 + "Domsslutning."
+    conn.execute(
+        "INSERT INTO kofa_eu_case_law (eu_case_id, case_name, full_text, section_index) "
+        "VALUES ('C-19/00', 'SIAC Construction', ?, ?)",
+        (full_text, json.dumps({"sammendrag": [0, 12]})),
+    )
+    # char_count is left NULL, as for documents synced before it was filled in
+    conn.execute(
+        "INSERT INTO kofa_forarbeider (doc_id, doc_type, title) "
+        "VALUES ('prop-51', 'prop', 'Prop. 51 L (2015-2016)')"
+    )
+    for order, (number, title, text) in enumerate(
+        [
+            ("1", "Innledning", "Proposisjonens hovedinnhold."),
+            ("1.1", "Bakgrunn", "Forholdsmessighet og likebehandling i anskaffelser."),
+            ("1.2", "Høring", ""),
+            ("2", "Avvisning", "Avvisning av tilbud etter forskriften."),
+        ]
+    ):
+        conn.execute(
+            "INSERT INTO kofa_forarbeider_sections (doc_id, section_number, title, level, "
+            "sort_order, text) VALUES ('prop-51', ?, ?, ?, ?, ?)",
+            (number, title, number.count(".") + 1, order, text),
+        )
+    conn.execute(
+        "INSERT INTO kofa_forarbeider_law_refs (doc_id, section_number, law_name, law_section) "
+        "VALUES ('prop-51', '2', 'anskaffelsesforskriften', '24-8')"
+    )
+    conn.execute(
+        "INSERT INTO kofa_sync_meta (source, cursor_value, last_count, synced_at) "
+        "VALUES ('wp_api', '2026-01-01', 30, '2026-01-01T00:00:00')"
+    )
+    rebuild_fts(conn)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope="session")
+def corpus_db(tmp_path_factory):
+    """Path of a read-only test corpus (see build_corpus), built once per session."""
+    return build_corpus(str(tmp_path_factory.mktemp("corpus") / "kofa.sqlite"))
+
+
+@pytest.fixture
+def supabase_backend(corpus_db, monkeypatch):
+    """KofaSupabaseBackend reading the test corpus through FakeClient."""
+    monkeypatch.setattr("kofa.supabase_backend.get_shared_client", lambda: FakeClient(corpus_db))
+    return KofaSupabaseBackend()
@@ -0,0 +1,143 @@
+"""Fakes and message builders shared by the tests."""
+
+import sqlite3
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+
+from kofa._supabase_utils import mark_degraded
+from kofa.jobs import JobManager
+
+
+class FakeService:
+    """
+    Stands in for KofaService. `sok` answers "treff for <query>"; a query
+    "vent:<gate>" blocks until another call with query "slipp:<gate>", and
+    "feil" raises and "reserve" answers as a degraded fallback. `sync` runs a short job reporting three progress events.
+    """
+
+    def __init__(self):
+        self.gates: dict[str, threading.Event] = defaultdict(threading.Event)
+        self.queries: list[str] = []
+        self.version: str | None = "v1"
+        self.jobs = JobManager(directory=None)
+        self.caches = {}
+        # A backend that can sync, so the sync tool starts a job
+        self.backend = SimpleNamespace(sync_from_wp_api=lambda **kwargs: None)
+
+    def data_version(self):
+        return self.version
+
+    def warm_up(self):
+        return self.version is not None
+
+    def search(self, query, limit=20):
+        self.queries.append(query)
+        if query == "feil":
+            raise RuntimeError("backend nede")
+        if query == "reserve":
+            mark_degraded()
+        if query.startswith("slipp:"):
+            self.gates[query[6:]].set()
+        if query.startswith("vent:") and not self.gates[query[5:]].wait(5):
+            return "gate timed out"
+        return f"treff for {query}"
+
+    def get_status(self, job_id=None):
+        return "status"
+
+    def start_sync_job(self, listener=None, progress_to=None, **kwargs):
+        return self.jobs.start(
+            "sync", self._sync, params=kwargs, listener=listener, progress_to=progress_to
+        )
+
+    def _sync(self, job):
+        job.report("wp_api", {"nye": 1}, 1, 2)
+        job.report("wp_api", {"nye": 2}, 2, 2)
+        job.report("pdf", {"hentet": 1}, 1, None)
+        return "ferdig"
+
+
+def tool_call(request_id, name, **arguments):
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
+
+
+def text(response):
+    return response["result"]["content"][0]["text"]
+
+
+class FakeQuery:
+    """The part of the PostgREST query builder used for paged and filtered reads."""
+
+    def __init__(self, conn, table):
+        self.conn, self.table = conn, table
+        self.columns, self.where, self.params = "*", [], []
+        self.order_by, self.limit_to, self.skip = [], -1, 0
+
+    def select(self, columns):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.where.append(f"{column} = ?")
+        self.params.append(value)
+        return self
+
+    def ilike(self, column, pattern):
+        # SQLite's LIKE ignores ASCII case, as ILIKE does
+        self.where.append(f"{column} LIKE ?")
+        self.params.append(pattern)
+        return self
+
+    def gt(self, column, value):
+        self.where.append(f"{column} > ?")
+        self.params.append(value)
+        return self
+
+    def in_(self, column, values):
+        self.where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        self.params.extend(values)
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        # Postgres sorts NULL above every value unless told otherwise
+        if nullsfirst is None:
+            nullsfirst = desc
+        nulls = "FIRST" if nullsfirst else "LAST"
+        self.order_by.append(f"{column} {'DESC' if desc else 'ASC'} NULLS {nulls}")
+        return self
+
+    def limit(self, count):
+        self.limit_to = count
+        return self
+
+    def range(self, start, end):
+        self.skip, self.limit_to = start, end - start + 1
+        return self
+
+    def execute(self):
+        sql = f"SELECT {self.columns} FROM {self.table}"
+        if self.where:
+            sql += " WHERE " + " AND ".join(self.where)
+        # Like Postgres, no particular order beyond the requested one
+        sql += f" ORDER BY {', '.join([*self.order_by, 'random()'])}"
+        rows = self.conn.execute(
+            f"{sql} LIMIT ? OFFSET ?", [*self.params, self.limit_to, self.skip]
+        )
+        return SimpleNamespace(data=[dict(row) for row in rows])
+
+
+class FakeClient:
+    """Supabase client stand-in answering table reads from a SQLite file."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def table(self, name):
+        return FakeQuery(self.conn, name)
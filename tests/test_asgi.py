@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from helpers import text, tool_call
+
+pytest.importorskip("starlette")
+httpx = pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+from kofa.asgi import create_asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def client(server):
+    with TestClient(create_asgi_app(server, max_workers=4)) as client:
+        yield client
+
+
+def test_tool_call(client):
+    response = client.post("/mcp/", json=tool_call(1, "sok", query="anbud"))
+    assert response.status_code == 200
+    assert text(response.json()) == "treff for anbud"
+
+
+def test_head_and_health(client):
+    assert client.head("/mcp/").headers["MCP-Protocol-Version"] == "2025-06-18"
+    assert client.get("/mcp/health").json()["status"] == "ok"
+
+
+def test_health_reports_starting_until_warm(monkeypatch, server, service):
+    monkeypatch.setattr("kofa.server.WARMUP_RETRY_BASE", 0.01)
+    service.version = None
+    with TestClient(create_asgi_app(server)) as client:
+        response = client.get("/mcp/health")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+        service.version = "v1"
+        # The background warm-up retries until the backend answers
+        for _ in range(200):
+            if client.get("/mcp/health").status_code == 200:
+                break
+            time.sleep(0.01)
+        assert server.ready
+
+
+def test_health_does_not_wait_for_warm_up(monkeypatch, server, service):
+    release = threading.Event()
+    calls = []
+
+    def warm_up():
+        calls.append(1)
+        return release.wait(5)
+
+    monkeypatch.setattr(service, "warm_up", warm_up)
+    server.ready = False
+    client = TestClient(create_asgi_app(server))
+    try:
+        for _ in range(3):
+            start = time.monotonic()
+            assert client.get("/mcp/health").status_code == 503
+            assert time.monotonic() - start < 1
+        # One warm-up thread, however many probes arrive
+        for _ in range(100):
+            if calls:
+                break
+            time.sleep(0.01)
+        assert len(calls) == 1
+    finally:
+        release.set()
+    for _ in range(200):
+        if server.ready:
+            break
+        time.sleep(0.01)
+    assert client.get("/mcp/health").status_code == 200
+
+
+@pytest.mark.parametrize("body", [b"{oops", b""])
+def test_unreadable_body(client, body):
+    response = client.post("/mcp/", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == -32700
+
+
+def test_batch_of_notifications_is_accepted(client):
+    response = client.post(
+        "/mcp/", json=[{"jsonrpc": "2.0", "method": "notifications/initialized"}]
+    )
+    assert response.status_code == 202
+    assert response.content == b""
+
+
+def test_requests_are_served_concurrently(server):
+    app = create_asgi_app(server, max_workers=2)
+
+    async def exchange():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kofa") as client:
+            return await asyncio.gather(
+                client.post("/mcp/", json=tool_call(1, "sok", query="vent:a")),
+                client.post("/mcp/", json=tool_call(2, "sok", query="slipp:a")),
+            )
+
+    first, second = asyncio.run(exchange())
+    assert text(first.json()) == "treff for vent:a"
+    assert text(second.json()) == "treff for slipp:a"
@@ -0,0 +1,201 @@
+import pytest
+
+from kofa import cache as cache_module
+from kofa.cache import MISSING, BloomFilter, CachedBackend, LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now the most recent
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_caches_none_and_counts_hits():
+    cache = LRUCache(maxsize=4)
+    cache.set("none", None)
+    assert cache.get("none") is None
+    assert cache.get("other") is MISSING
+    assert cache.get("other", "default") == "default"
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1, "maxsize": 4}
+
+
+def test_lru_ttl_per_entry_overrides_default():
+    cache = LRUCache(maxsize=4, ttl=0)
+    cache.set("expired", 1)
+    cache.set("kept", 2, ttl=60)
+    assert cache.get("expired") is MISSING
+    assert cache.get("kept") == 2
+    assert len(cache) == 1
+
+
+def test_lru_delete_where():
+    cache = LRUCache(maxsize=8)
+    for i in range(6):
+        cache.set(("case", i), i)
+    assert cache.delete_where(lambda key: key[1] % 2 == 0) == 3
+    assert [cache.get(("case", i)) is MISSING for i in range(6)] == [True, False] * 3
+
+
+class FakeBackend:
+    """Counts reads; reports writes to the registered listeners."""
+
+    def __init__(self):
+        self.reads = 0
+        self.listeners = []
+        self.cases = {"2023/1", "2023/2"}
+        # Ids the Bloom filters are built from; "2020/1" was deleted since
+        self.known = {"sak_nr": self.cases | {"2020/1"}, "eu_case_id": {"C-19/00"}}
+
+    def add_write_listener(self, listener):
+        self.listeners.append(listener)
+
+    def write(self, kind, ident):
+        if kind == "case":
+            self.cases.add(ident)
+        for listener in self.listeners:
+            listener(kind, ident)
+
+    def list_known_ids(self, space):
+        return self.known[space]
+
+    def get_case(self, sak_nr):
+        self.reads += 1
+        return {"sak_nr": sak_nr, "version": self.reads} if sak_nr in self.cases else None
+
+    def get_decision_text(self, sak_nr, section=None):
+        self.reads += 1
+        return [{"paragraph_number": 1, "section": section, "text": str(self.reads)}]
+
+    def get_eu_case_law(self, eu_case_id):
+        self.reads += 1
+        return None
+
+    get_eu_case_law_meta = get_forarbeide = get_eu_case_law
+
+    def get_eu_case_law_slice(self, eu_case_id, section, start, end):
+        self.reads += 1
+        return None
+
+    def get_forarbeider_sections(self, doc_id):
+        self.reads += 1
+        return []
+
+    get_forarbeider_toc = get_forarbeider_sections
+
+    def find_by_eu_case(self, eu_case_id, limit=20):
+        self.reads += 1
+        return []
+
+    def search(self, query, limit=20):
+        self.reads += 1
+        return []
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def cached(backend):
+    return CachedBackend(backend)
+
+
+def test_cached_backend_serves_repeat_reads(backend, cached):
+    assert cached.get_case("2023/1") == {"sak_nr": "2023/1", "version": 1}
+    assert cached.get_case("2023/1")["version"] == 1
+    cached.get_decision_text("2023/1", "vurdering")
+    cached.get_decision_text("2023/1", "vurdering")
+    assert backend.reads == 2
+    # Only point lookups are cached
+    cached.search("anbud")
+    cached.search("anbud")
+    assert backend.reads == 4
+
+
+def test_cached_backend_invalidates_on_write(backend, cached):
+    cached.get_case("2023/1")
+    cached.get_case("2023/2")
+    cached.get_decision_text("2023/1")
+    backend.write("case", "2023/1")
+    assert cached.get_case("2023/1")["version"] == 4
+    assert cached.get_case("2023/2")["version"] == 2
+    cached.get_decision_text("2023/1")
+    assert backend.reads == 5
+    # Other kinds leave cases alone
+    backend.write("forarbeide", "2023/2")
+    assert cached.get_case("2023/2")["version"] == 2
+
+
+def test_cached_backend_shares_keys_across_call_styles(backend, cached):
+    cached.get_decision_text("2023/1")
+    cached.get_decision_text(sak_nr="2023/1")
+    cached.get_decision_text("2023/1", section=None)
+    assert backend.reads == 1
+    cached.get_decision_text("2023/1", "vurdering")
+    cached.get_decision_text(sak_nr="2023/1", section="vurdering")
+    assert backend.reads == 2
+
+
+def test_cached_backend_invalidates_keyword_reads(backend, cached):
+    assert cached.get_case(sak_nr="2023/1")["version"] == 1
+    backend.write("case", "2023/1")
+    assert cached.get_case(sak_nr="2023/1")["version"] == 2
+    assert cached.get_case("2023/1")["version"] == 2
+
+
+def test_cached_backend_caches_not_found_briefly(monkeypatch, backend, cached):
+    assert cached.get_case("2020/1") is None
+    assert cached.get_case("2020/1") is None
+    assert backend.reads == 1
+
+    monkeypatch.setattr(cache_module, "NEGATIVE_TTL", 0)
+    cached.cache.clear()
+    cached.get_case("2020/1")
+    cached.get_case("2020/1")
+    assert backend.reads == 3
+
+
+def test_bloom_has_no_false_negatives():
+    items = [f"2023/{i}" for i in range(5000)]
+    bloom = BloomFilter.of(items)
+    assert all(item in bloom for item in items)
+    bloom.add("2099/1")
+    assert "2099/1" in bloom
+
+
+def test_bloom_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=10_000, fp_rate=0.01)
+    for i in range(10_000):
+        bloom.add(f"known-{i}")
+    false_positives = sum(f"unknown-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def test_unknown_ids_are_answered_without_a_read(backend, cached):
+    assert cached.get_case("1999/9") is None
+    assert cached.get_decision_text("1999/9") == []
+    assert cached.find_by_eu_case("C-99/99") == []
+    assert backend.reads == 0
+    assert cached.bloom_rejections == 3
+    assert cached.find_by_eu_case("C-19/00") == []
+    assert backend.reads == 1
+
+
+def test_written_ids_join_the_filter(backend, cached):
+    assert cached.get_case("2024/5") is None
+    backend.write("case", "2024/5")
+    assert cached.get_case("2024/5")["sak_nr"] == "2024/5"
+
+
+def test_unguarded_when_ids_cannot_be_listed(backend, cached):
+    backend.known = {}
+    assert cached.get_case("1999/9") is None
+    assert backend.reads == 1
+    assert cached.bloom_rejections == 0
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from helpers import text, tool_call
+
+from kofa import server as server_module
+from kofa._supabase_utils import (
+    CallBudget,
+    DeadlineExceeded,
+    RequestCancelled,
+    TransientError,
+    call_budget,
+    with_retry,
+)
+from kofa.server import REQUEST_CANCELLED, MCPServer, in_session
+
+
+@pytest.fixture
+def release(service):
+    yield service.gates["aldri"]
+    # Let handlers abandoned by a test finish
+    service.gates["aldri"].set()
+
+
+def in_thread(fn, *args):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn(*args)))
+    thread.start()
+    return thread, result
+
+
+def test_tool_call_times_out(monkeypatch, service, release):
+    monkeypatch.setitem(server_module.TOOL_TIMEOUTS, "sok", 0.2)
+    server = MCPServer(service)
+    start = time.monotonic()
+    result = server.handle_request(tool_call(1, "sok", query="vent:aldri"))["result"]
+    assert time.monotonic() - start < 2
+    assert result["isError"] is True
+    assert result["content"][0]["text"].startswith("Tidsavbrudd: sok brukte mer enn 0.2 sekunder")
+
+
+def test_cancel_returns_at_once(server, service, release):
+    thread, result = in_thread(server.handle_request, tool_call(7, "sok", query="vent:aldri"))
+    deadline = time.monotonic() + 2
+    while not server.cancel_request(7, "bruker avbrøt"):
+        assert time.monotonic() < deadline, "call never became in flight"
+        time.sleep(0.01)
+    thread.join(2)
+    assert result["value"] == {
+        "jsonrpc": "2.0",
+        "id": 7,
+        "error": {"code": REQUEST_CANCELLED, "message": "Request cancelled"},
+    }
+
+
+def in_session_thread(server, session, request):
+    def handle():
+        with in_session(session):
+            return server.handle_request(request)
+
+    return in_thread(handle)
+
+
+def test_cancel_only_reaches_its_own_session(server, service, release):
+    calls = {
+        session: in_session_thread(server, session, tool_call(7, "sok", query=f"vent:{session}"))
+        for session in ("a", "b")
+    }
+    deadline = time.monotonic() + 2
+    while len(server._inflight) < 2:
+        assert time.monotonic() < deadline, "calls never became in flight"
+        time.sleep(0.01)
+    with in_session("b"):
+        server.handle_request(
+            {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 7}}
+        )
+    thread, result = calls["b"]
+    thread.join(2)
+    assert result["value"]["error"]["code"] == REQUEST_CANCELLED
+
+    service.gates["a"].set()
+    thread, result = calls["a"]
+    thread.join(2)
+    assert text(result["value"]) == "treff for vent:a"
+
+
+def test_cancel_of_finished_request_is_ignored(server):
+    assert text(server.handle_request(tool_call(1, "sok", query="x"))) == "treff for x"
+    response = server.handle_request(
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}}
+    )
+    assert "error" not in response
+    assert server.cancel_request(1) is False
+
+
+def flaky(failures):
+    calls = []
+
+    @with_retry(max_attempts=3, backoff_base=0.05)
+    def call():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise TransientError("503")
+        return "ok"
+
+    return call, calls
+
+
+def test_retry_stops_at_deadline():
+    call, calls = flaky(failures=5)
+    with call_budget(CallBudget(deadline=time.monotonic() + 0.01)):
+        with pytest.raises(DeadlineExceeded):
+            call()
+    # The backoff would have slept past the deadline, so no second attempt
+    assert len(calls) == 1
+
+
+def test_no_attempt_after_cancel():
+    call, calls = flaky(failures=0)
+    budget = CallBudget()
+    budget.cancelled.set()
+    with call_budget(budget), pytest.raises(RequestCancelled):
+        call()
+    assert calls == []
+
+
+def test_retry_without_budget():
+    call, calls = flaky(failures=2)
+    assert call() == "ok"
+    assert len(calls) == 3
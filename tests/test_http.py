@@ -0,0 +1,161 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from helpers import tool_call
+
+flask = pytest.importorskip("flask")
+
+import kofa  # noqa: E402
+from kofa._http import SSE_PING, etag_matches, sse_stream  # noqa: E402
+from kofa.server import dumps  # noqa: E402
+from kofa.web import create_mcp_blueprint  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch, service):
+    monkeypatch.setattr(kofa, "KofaService", lambda: service)
+    app = flask.Flask(__name__)
+    app.register_blueprint(create_mcp_blueprint(), url_prefix="/mcp")
+    return app.test_client()
+
+
+def post(client, body, **headers):
+    return client.post("/mcp/", data=json.dumps(body), headers=headers)
+
+
+@pytest.mark.parametrize("method", ["initialize", "tools/list"])
+def test_static_responses_are_preserialized(client, server, method):
+    request = {"jsonrpc": "2.0", "id": "x-1", "method": method, "params": {}}
+    response = post(client, request)
+    assert response.status_code == 200
+    assert response.json == server.handle_request(request)
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    repeat = post(client, {**request, "id": 2}, **{"If-None-Match": response.headers["ETag"]})
+    assert repeat.status_code == 304
+    assert repeat.data == b""
+    assert repeat.headers["ETag"] == response.headers["ETag"]
+
+
+def test_initialize_assigns_a_session(client):
+    request = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}
+    first = post(client, request).headers["Mcp-Session-Id"]
+    assert first != post(client, request).headers["Mcp-Session-Id"]
+    # A client that already has a session keeps it
+    assert "Mcp-Session-Id" not in post(client, request, **{"Mcp-Session-Id": first}).headers
+
+
+def test_static_etags_differ_per_method(client):
+    etags = {
+        post(client, {"jsonrpc": "2.0", "id": 1, "method": m}).headers["ETag"]
+        for m in ("initialize", "tools/list")
+    }
+    assert len(etags) == 2
+
+
+def test_tool_results_are_versioned_by_data_version(client, service):
+    response = post(client, tool_call(1, "sok", query="anbud"))
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Same call, same data: answered without running the tool
+    repeat = post(client, tool_call(2, "sok", query="anbud", limit=20), **{"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert service.queries == ["anbud"]
+
+    service.version = "v2"
+    changed = post(client, tool_call(3, "sok", query="anbud"), **{"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        tool_call(1, "status"),  # not a function of the data version
+        tool_call(1, "sok", query="feil"),  # tool error
+        tool_call(1, "sok", query="reserve"),  # degraded fallback
+        tool_call(1, "sok"),  # invalid arguments
+        [tool_call(1, "sok", query="anbud")],  # batch
+    ],
+)
+def test_no_tool_etag(client, body):
+    response = post(client, body)
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_no_tool_etag_without_data_version(client, service):
+    service.version = None
+    assert "ETag" not in post(client, tool_call(1, "sok", query="anbud")).headers
+
+
+@pytest.mark.parametrize(
+    "accept, coding, decompress",
+    [
+        ("gzip, deflate", "gzip", gzip.decompress),
+        ("gzip;q=0.5, deflate", "deflate", zlib.decompress),
+        ("*", "gzip", gzip.decompress),
+    ],
+)
+def test_large_responses_are_compressed(client, server, accept, coding, decompress):
+    request = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+    response = post(client, request, **{"Accept-Encoding": accept})
+    assert response.headers["Content-Encoding"] == coding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"].startswith('W/"')
+    assert json.loads(decompress(response.data)) == server.handle_request(request)
+
+    # A weak ETag still validates the uncompressed representation
+    etag = response.headers["ETag"]
+    assert post(client, request, **{"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("accept", [None, "identity", "gzip;q=0, deflate;q=0", "br"])
+def test_uncompressed_unless_accepted(client, accept):
+    headers = {"Accept-Encoding": accept} if accept else {}
+    response = post(client, {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}, **headers)
+    assert "Content-Encoding" not in response.headers
+    assert response.json["result"]["tools"]
+
+
+def test_small_responses_are_not_compressed(client):
+    response = post(client, tool_call(1, "sok", query="anbud"), **{"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"old", "abc"', True),
+        ("*", True),
+        ('"old"', False),
+        (None, False),
+    ],
+)
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_sse_stream_relays_notifications(server):
+    stream = sse_stream(server)
+    assert next(stream) == SSE_PING
+    message = {"jsonrpc": "2.0", "method": "notifications/progress", "params": {"progress": 1}}
+    server.notifications.publish(message)
+    assert next(stream) == b"event: message\ndata: " + dumps(message) + b"\n\n"
+    stream.close()
+    assert server.notifications._subscribers == []
+
+
+def test_get_opens_event_stream(client):
+    assert client.get("/mcp/").status_code == 405
+    response = client.get("/mcp/", headers={"Accept": "text/event-stream"}, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert next(response.response) == SSE_PING
+    response.close()
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+
+import pytest
+
+from kofa import jobs as jobs_module
+from kofa.jobs import DONE, FAILED, RUNNING, JobManager
+
+
+@pytest.fixture(autouse=True)
+def every_progress_event(monkeypatch):
+    monkeypatch.setattr(jobs_module, "PROGRESS_INTERVAL", 0)
+
+
+@pytest.fixture
+def jobs_dir(tmp_path):
+    return str(tmp_path / "jobs")
+
+
+def wait(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.finished_at is None:
+        assert time.monotonic() < deadline, f"job {job.id} still running"
+        time.sleep(0.005)
+    return job
+
+
+def test_job_result_and_failure(jobs_dir):
+    manager = JobManager(directory=jobs_dir)
+    done = wait(manager.start("sync", lambda job: "ferdig"))
+    assert (done.status, done.result, done.error) == (DONE, "ferdig", None)
+
+    def boom(job):
+        raise RuntimeError("nettverksfeil")
+
+    failed = wait(manager.start("sync", boom))
+    assert (failed.status, failed.error) == (FAILED, "nettverksfeil")
+    assert manager.get(done.id) is done
+    assert manager.get("finnes-ikke") is None
+
+
+def test_one_running_job_per_kind(jobs_dir):
+    manager = JobManager(directory=jobs_dir)
+    release = threading.Event()
+    first = manager.start("sync", lambda job: release.wait(5) and "ferdig")
+    try:
+        assert manager.start("sync", lambda job: "annen") is first
+        assert manager.running("sync") is first
+        assert manager.start("eksport", lambda job: "ferdig") is not first
+    finally:
+        release.set()
+    wait(first)
+    assert manager.running("sync") is None
+
+
+def test_progress_events(jobs_dir):
+    events = []
+    release = threading.Event()
+
+    def sync(job):
+        job.report("wp_api", {"nye": 1}, 1, 4)
+        job.report("wp_api", {"nye": 2}, 2, 4)
+        job.report("pdf", {"hentet": 0}, 0, None)
+        release.wait(5)
+        return "ferdig"
+
+    job = JobManager(directory=jobs_dir).start(
+        "sync", sync, listener=lambda j: events.append((j.status, j.stage, j.stages_done, j.done))
+    )
+    release.set()
+    wait(job)
+    assert events[:3] == [
+        (RUNNING, "wp_api", 0, 1),
+        (RUNNING, "wp_api", 0, 2),
+        (RUNNING, "pdf", 1, 0),
+    ]
+    assert job.stats == {"hentet": 0}
+
+
+def test_progress_events_are_throttled(monkeypatch, jobs_dir):
+    monkeypatch.setattr(jobs_module, "PROGRESS_INTERVAL", 60)
+    events = []
+
+    def sync(job):
+        for done in range(10):
+            job.report("wp_api", {}, done, 10)
+        job.report("pdf", {}, 0, 5)
+        return "ferdig"
+
+    wait(
+        JobManager(directory=jobs_dir).start(
+            "sync", sync, listener=lambda j: events.append(j.stage)
+        )
+    )
+    # First event of each stage, then only the final one
+    assert events[:2] == ["wp_api", "pdf"]
+
+
+def test_finished_jobs_are_pruned(jobs_dir):
+    manager = JobManager(max_finished=2, directory=jobs_dir)
+    ids = [wait(manager.start("sync", lambda job: "ferdig")).id for _ in range(4)]
+    assert [job.id for job in manager.list()][-2:] == ids[-2:]
+    assert len(manager.list()) <= 3
+
+
+def test_jobs_are_shared_between_processes(jobs_dir):
+    # Two managers on one directory stand in for two worker processes
+    first, second = JobManager(directory=jobs_dir), JobManager(directory=jobs_dir)
+    release = threading.Event()
+
+    def sync(job):
+        job.report("wp_api", {"nye": 3}, 3, 10)
+        release.wait(5)
+        return "ferdig"
+
+    job = first.start("sync", sync)
+    try:
+        deadline = time.monotonic() + 5
+        while (seen := second.get(job.id)) is None or seen.stage != "wp_api":
+            assert time.monotonic() < deadline, "progress never reached the other process"
+            time.sleep(0.005)
+        assert (seen.status, seen.done, seen.stats) == (RUNNING, 3, {"nye": 3})
+        assert second.running("sync").id == job.id
+        assert second.running().id == job.id
+        # The other process does not start a second sync
+        assert second.start("sync", lambda job: "annen").id == job.id
+    finally:
+        release.set()
+    wait(job)
+    assert (second.get(job.id).status, second.get(job.id).result) == (DONE, "ferdig")
+    assert second.running("sync") is None
+
+
+def test_running_job_of_a_dead_process_is_failed(jobs_dir):
+    manager = JobManager(directory=jobs_dir)
+    with open(f"{jobs_dir}/abc123.json", "w") as f:
+        json.dump({"id": "abc123", "kind": "sync", "params": {}, "status": RUNNING}, f)
+    job = manager.get("abc123")
+    assert job.status == FAILED
+    assert "serverprosessen stoppet" in job.error
+    assert manager.running("sync") is None
+
+
+def test_jobs_without_directory_stay_in_process():
+    manager = JobManager(directory=None)
+    job = wait(manager.start("sync", lambda job: "ferdig"))
+    assert manager.get(job.id) is job
+    assert JobManager(directory=None).get(job.id) is None
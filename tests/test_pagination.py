@@ -0,0 +1,70 @@
+import pytest
+
+from kofa._pagination import MIN_PAGE_CHARS, CursorError, PageCursor, take_page
+
+
+def test_cursor_round_trip():
+    cursor = PageCursor("hent_eu_dom", "C-19/00", "begrunnelse", 3, 120, 2000)
+    assert PageCursor.decode(cursor.encode(), "hent_eu_dom", "C-19/00") == cursor
+
+
+@pytest.mark.parametrize(
+    "tool, ident, message",
+    [
+        ("hent_forarbeide", None, "tilhører hent_eu_dom"),
+        ("hent_eu_dom", "C-20/00", "tilhører C-19/00"),
+    ],
+)
+def test_cursor_is_bound_to_tool_and_document(tool, ident, message):
+    token = PageCursor("hent_eu_dom", "C-19/00", "", 0, 0, 2000).encode()
+    with pytest.raises(CursorError, match=message):
+        PageCursor.decode(token, tool, ident)
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not a cursor",
+        PageCursor("hent_eu_dom", "C-19/00", "", -1, 0, 2000).encode(),
+        PageCursor("hent_eu_dom", "C-19/00", "", 0, 0, MIN_PAGE_CHARS - 1).encode(),
+    ],
+)
+def test_rejects_malformed_cursors(token):
+    with pytest.raises(CursorError):
+        PageCursor.decode(token, "hent_eu_dom")
+
+
+def _pages(blocks, max_chars):
+    block, offset = 0, 0
+    while block < len(blocks):
+        start = (block, offset)
+        page, block, offset = take_page(blocks, block, offset, max_chars)
+        assert (block, offset) != start, "no progress"
+        yield page, offset
+
+
+@pytest.mark.parametrize("max_chars", [40, 64, 500])
+def test_pages_reassemble_the_document(max_chars):
+    words = "Klagenemnda finner at innklagede har brutt regelverket ved avvisningen".split()
+    blocks = [" ".join(words[: 1 + i % len(words)]) * (1 + i % 3) for i in range(25)]
+    blocks.append("x" * 150)  # no whitespace: cut hard
+    text = ""
+    ended_mid_block = False
+    for page, offset in _pages(blocks, max_chars):
+        assert 0 < len(page) <= max_chars
+        # A page ending on a block boundary dropped the newline between blocks
+        text += page if ended_mid_block or not text else "\n" + page
+        ended_mid_block = offset > 0
+    assert text == "\n".join(blocks)
+
+
+def test_page_starts_on_block_boundary_when_next_block_fits():
+    blocks = ["a" * 30, "b" * 30]
+    assert take_page(blocks, 0, 0, 40) == ("a" * 30, 1, 0)
+    assert take_page(blocks, 0, 0, 61) == ("a" * 30 + "\n" + "b" * 30, 2, 0)
+
+
+def test_long_block_is_cut_at_whitespace():
+    page, block, offset = take_page(["ord " * 20], 0, 0, 30)
+    assert page == "ord " * 7
+    assert (block, offset) == (0, 28)
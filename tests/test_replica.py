@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from kofa.replica import CASE_COLUMNS, CorpusReplica, ReplicaBackend
+from kofa.service import KofaService
+from kofa.sqlite_backend import KofaSqliteBackend
+
+LAW = "anskaffelsesforskriften"
+
+# (method, args, kwargs) answered from the replica, compared with the backend
+CALLS = [
+    ("get_decision_text", ("2023/1003",), {}),
+    ("get_decision_text", ("2023/1003",), {"section": "vurdering"}),
+    ("get_decision_text", ("1999/1",), {}),
+    ("find_by_law_reference", (LAW,), {"limit": 50}),
+    ("find_by_law_reference", (LAW, "24-8"), {"limit": 5}),
+    ("find_by_law_reference", (LAW, "24-8 (1)"), {}),
+    ("find_by_law_reference", (LAW, "24"), {}),
+    ("find_by_law_reference", ("ukjent lov",), {}),
+    ("find_cases_by_sections", (LAW, ["24-8", "8-3"]), {}),
+    ("find_cases_by_sections", (LAW, ["24-8", "8-3"]), {"limit": 2}),
+    ("find_cases_by_sections", (LAW, []), {}),
+    ("count_cases_by_section", (LAW, "8-3"), {}),
+    ("find_related_cases", ("2023/1000",), {}),
+    ("find_related_cases", ("2023/1001",), {}),
+    ("find_by_eu_case", ("C-27/15",), {}),
+    ("find_by_eu_case", ("C-19/00",), {"limit": 3}),
+]
+
+
+@pytest.fixture
+def sqlite_backend(corpus_db):
+    return KofaSqliteBackend(corpus_db)
+
+
+@pytest.fixture
+def replica(sqlite_backend):
+    return CorpusReplica.load(sqlite_backend)
+
+
+def _case(row):
+    return {k: row[k] for k in CASE_COLUMNS} if row is not None else None
+
+
+@pytest.mark.parametrize(("method", "args", "kwargs"), CALLS)
+def test_replica_matches_backend(replica, sqlite_backend, method, args, kwargs):
+    expected = getattr(sqlite_backend, method)(*args, **kwargs)
+    result = getattr(replica, method)(*args, **kwargs)
+    if isinstance(expected, list):
+        # References of the same case come in no particular order
+        assert [r.get("sak_nr") for r in result] == [r.get("sak_nr") for r in expected]
+        assert sorted(map(repr, result)) == sorted(map(repr, expected))
+    else:
+        assert result == expected
+
+
+def test_cases_match_backend(replica, sqlite_backend):
+    assert replica.get_case("2023/1007") == _case(sqlite_backend.get_case("2023/1007"))
+    assert replica.get_case("1999/1") is None
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"limit": 30},
+        {"limit": 5},
+        {"sakstype": "Gebyrsak"},
+        {"avgjoerelse": "Brudd på regelverket", "innklaget": "KOMMUNE 2"},
+    ],
+)
+@pytest.mark.parametrize("backend", ["sqlite_backend", "supabase_backend"])
+def test_recent_cases_match_backend(request, replica, backend, kwargs):
+    # 2023/1029 has no avsluttet: every backend lists it last
+    expected = [_case(row) for row in request.getfixturevalue(backend).recent_cases(**kwargs)]
+    assert replica.recent_cases(**kwargs) == expected
+
+
+def test_load_through_keyset_pages(supabase_backend, replica):
+    paged = CorpusReplica.load(supabase_backend)
+    stats = paged.stats()
+    assert stats["cases"] == 30
+    assert stats["paragraphs"] == 90
+    assert paged.find_related_cases("2023/1000") == replica.find_related_cases("2023/1000")
+
+
+def test_stats(replica, sqlite_backend):
+    stats = replica.stats()
+    assert (stats["cases"], stats["paragraphs"]) == (30, 90)
+    assert stats["data_version"] == sqlite_backend.get_data_version()
+    assert stats["text_bytes"] < stats["bytes"]
+
+
+def _wait_loaded(backend):
+    deadline = time.monotonic() + 5
+    while backend.replica is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_backend_reads_through_until_loaded(sqlite_backend):
+    backend = ReplicaBackend(sqlite_backend)
+    assert backend.get_case("2023/1007") == sqlite_backend.get_case("2023/1007")
+    # The first read started a background load
+    _wait_loaded(backend)
+    assert backend.get_case("2023/1007") == _case(sqlite_backend.get_case("2023/1007"))
+    # Methods the replica does not hold go to the backend
+    assert backend.most_cited_cases(limit=1)[0]["sak_nr"] == "2023/1000"
+    assert backend.list_known_ids("sak_nr") == sqlite_backend.list_known_ids("sak_nr")
+    assert backend.list_known_ids("eu_case_id") == {"C-19/00", "C-27/15"}
+
+
+def test_clear_reloads(sqlite_backend):
+    backend = ReplicaBackend(sqlite_backend)
+    first = backend.load()
+    backend.clear()
+    _wait_loaded(backend)
+    assert backend.replica is not first
+
+
+def test_service_warm_up_loads_replica(sqlite_backend, monkeypatch):
+    monkeypatch.setattr("kofa.service.REPLICA_ENABLED", True)
+    service = KofaService(sqlite_backend)
+    assert service.warm_up()
+    assert service._replica.stats()["cases"] == 30
+    assert "Lokal replika" in service.get_status()
+    assert "2023/1003" in service.get_case("2023/1003")
@@ -0,0 +1,67 @@
+import pytest
+
+from kofa._schema import ArgumentError, compile_validator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string", "minLength": 1},
+        "limit": {"type": "integer", "default": 20, "minimum": 1, "maximum": 100},
+        "weight": {"type": "number"},
+        "scrape": {"type": "boolean", "default": False},
+        "gruppering": {"type": "string", "enum": ["avgjoerelse", "sakstype"]},
+        "paragrafer": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["query"],
+}
+
+
+@pytest.fixture
+def validate():
+    return compile_validator(SCHEMA)
+
+
+def test_applies_defaults_and_drops_unknown(validate):
+    assert validate({"query": "anbud", "extra": 1}) == {
+        "query": "anbud",
+        "limit": 20,
+        "scrape": False,
+    }
+
+
+def test_integral_float_becomes_int(validate):
+    result = validate({"query": "x", "limit": 20.0})
+    assert result["limit"] == 20
+    assert isinstance(result["limit"], int)
+
+
+@pytest.mark.parametrize(
+    "arguments, message",
+    [
+        ({}, "'query' er påkrevd"),
+        ({"query": "   "}, "'query' er påkrevd"),
+        ({"query": "x", "limit": True}, "'limit' må være et heltall"),
+        ({"query": "x", "limit": 2.5}, "'limit' må være et heltall"),
+        ({"query": "x", "limit": 0}, "'limit' må være minst 1"),
+        ({"query": "x", "limit": 101}, "'limit' kan ikke være større enn 100"),
+        ({"query": "x", "weight": "0.3"}, "'weight' må være et tall"),
+        ({"query": "x", "scrape": "true"}, "'scrape' må være true eller false"),
+        ({"query": "x", "gruppering": "aar"}, "'gruppering' må være en av"),
+        ({"query": "x", "paragrafer": "24-8"}, "'paragrafer' må være en liste"),
+        ({"query": "x", "paragrafer": ["24-8", 5]}, r"'paragrafer\[\]' må være en tekst"),
+    ],
+)
+def test_rejects_invalid_arguments(validate, arguments, message):
+    with pytest.raises(ArgumentError, match=message):
+        validate(arguments)
+
+
+def test_arguments_must_be_an_object(validate):
+    with pytest.raises(ArgumentError, match="'arguments' må være et objekt"):
+        validate(["query"])
+
+
+def test_missing_arguments_mean_empty_object():
+    assert compile_validator({"properties": {"limit": {"type": "integer", "default": 5}}})(
+        None
+    ) == {"limit": 5}
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from helpers import FakeService, text, tool_call
+
+from kofa import jobs as jobs_module
+from kofa.jobs import JobManager
+from kofa.server import MCPServer, in_session
+
+
+def notification(method):
+    return {"jsonrpc": "2.0", "method": method}
+
+
+def test_batch_answers_in_request_order_without_notifications(server):
+    responses = server.handle_request(
+        [
+            tool_call(1, "sok", query="vent:a"),
+            notification("notifications/initialized"),
+            {"jsonrpc": "2.0", "id": "b", "method": "ping"},
+            tool_call(3, "sok", query="slipp:a"),
+        ]
+    )
+    assert [r["id"] for r in responses] == [1, "b", 3]
+    # Entries run concurrently: entry 1 waited for a gate entry 3 opened
+    assert text(responses[0]) == "treff for vent:a"
+
+
+def test_batch_of_notifications_has_no_response(server):
+    assert server.handle_request([notification("notifications/initialized")]) == []
+
+
+def test_invalid_batches(server):
+    assert server.handle_request([])["error"]["code"] == -32600
+    responses = server.handle_request([1, {"jsonrpc": "2.0", "id": 2, "method": "ping"}])
+    assert responses[0] == {
+        "jsonrpc": "2.0",
+        "id": None,
+        "error": {"code": -32600, "message": "Invalid Request"},
+    }
+    assert responses[1]["result"] == {}
+
+
+def test_invalid_arguments_are_a_tool_error(server, service):
+    result = server.handle_request(tool_call(1, "sok", query="anbud", limit="mange"))["result"]
+    assert result["isError"] is True
+    assert result["content"][0]["text"] == "Ugyldige argumenter for sok: 'limit' må være et heltall"
+    assert service.queries == []
+
+
+def test_unknown_tool(server):
+    assert text(server.handle_request(tool_call(1, "finnes_ikke"))) == "Ukjent verktøy: finnes_ikke"
+
+
+def test_responses_are_memoized_per_data_version(server, service):
+    first = server.handle_request(tool_call(1, "sok", query="anbud"))
+    assert (
+        server.handle_request(tool_call(2, "sok", query="anbud", limit=20))["result"]
+        == (first["result"])
+    )
+    assert service.queries == ["anbud"]
+
+    service.version = "v2"
+    server.handle_request(tool_call(3, "sok", query="anbud"))
+    assert service.queries == ["anbud", "anbud"]
+
+
+def test_errors_and_uncacheable_tools_are_not_memoized(server, service):
+    for request_id in (1, 2):
+        assert server.handle_request(tool_call(request_id, "sok", query="feil"))["result"][
+            "isError"
+        ]
+    assert service.queries == ["feil", "feil"]
+    assert len(server._response_memo) == 0
+    server.handle_request(tool_call(3, "status"))
+    assert len(server._response_memo) == 0
+
+
+def test_degraded_results_are_not_memoized(server, service):
+    for request_id in (1, 2):
+        response, cacheable = server.handle_cacheable_request(
+            tool_call(request_id, "sok", query="reserve")
+        )
+        assert text(response) == "treff for reserve"
+        assert not cacheable
+    assert service.queries == ["reserve", "reserve"]
+
+    assert server.handle_cacheable_request(tool_call(3, "sok", query="anbud"))[1]
+
+
+def test_no_memo_without_data_version(server, service):
+    service.version = None
+    server.handle_request(tool_call(1, "sok", query="anbud"))
+    server.handle_request(tool_call(2, "sok", query="anbud"))
+    assert service.queries == ["anbud", "anbud"]
+
+
+def test_progress_goes_to_the_session_that_started_the_sync(monkeypatch, server, service):
+    monkeypatch.setattr(jobs_module, "PROGRESS_INTERVAL", 0)
+    received = {"a": [], "b": []}
+    for session, messages in received.items():
+        server.notifications.subscribe(messages.append, session)
+
+    request = tool_call(1, "sync")
+    request["params"]["_meta"] = {"progressToken": "p-1"}
+    with in_session("a"):
+        server.handle_request(request)
+    deadline = time.monotonic() + 2
+    while not received["a"] or received["a"][-1]["params"]["message"] != "Ferdig":
+        assert time.monotonic() < deadline, "sync never reported it was done"
+        time.sleep(0.01)
+    assert len(received["a"]) == 4
+    assert received["b"] == []
+
+
+def test_progress_is_relayed_by_the_worker_holding_the_stream(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs_module, "PROGRESS_INTERVAL", 0)
+    monkeypatch.setattr("kofa.server.PROGRESS_RELAY_INTERVAL", 0.01)
+    # Two workers sharing the jobs directory: the POST lands on one, the SSE GET on the other
+    posting, streaming = FakeService(), FakeService()
+    for service in (posting, streaming):
+        service.jobs = JobManager(directory=str(tmp_path))
+    release = threading.Event()
+
+    def sync(job):
+        job.report("wp_api", {"nye": 1}, 1, 2)
+        release.wait(5)
+        return "ferdig"
+
+    posting._sync = sync
+    received, elsewhere = [], []
+    notifications = MCPServer(streaming).notifications
+    unsubscribe = [
+        notifications.subscribe(received.append, "a"),
+        notifications.subscribe(elsewhere.append, "b"),
+    ]
+
+    request = tool_call(1, "sync")
+    request["params"]["_meta"] = {"progressToken": "p-1"}
+    with in_session("a"):
+        MCPServer(posting).handle_request(request)
+    deadline = time.monotonic() + 2
+    while not received:
+        assert time.monotonic() < deadline, "progress was never relayed"
+        time.sleep(0.01)
+    release.set()
+    while received[-1]["params"]["message"] != "Ferdig":
+        assert time.monotonic() < deadline, "the end of the sync was never relayed"
+        time.sleep(0.01)
+    assert [m["params"]["progressToken"] for m in received] == ["p-1", "p-1"]
+    assert received[0]["params"]["message"] == "wp_api: 1/2"
+    assert elsewhere == []
+    for stop in unsubscribe:
+        stop()
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+
+from kofa import service as service_module
+from kofa._supabase_utils import remaining_time
+from kofa.cache import CACHED_METHODS, GUARDED_METHODS
+from kofa.service import LEADERBOARD_SCOPE_CONFLICT, KofaService
+from kofa.sqlite_backend import KofaSqliteBackend
+
+
+class VersionBackend:
+    def __init__(self):
+        self.version = "v1"
+        self.reads = 0
+        self.case_reads = 0
+        self.release = None  # threading.Event that version reads wait for
+        self.budgets = []
+
+    def __getattr__(self, name):
+        # Cached reads these tests do not make (CachedBackend wraps them all)
+        if name not in CACHED_METHODS.keys() | GUARDED_METHODS.keys():
+            raise AttributeError(name)
+
+        def read(*args, **kwargs):
+            raise NotImplementedError(name)
+
+        return read
+
+    def add_write_listener(self, listener):
+        pass
+
+    def get_case(self, sak_nr):
+        self.case_reads += 1
+        return {"sak_nr": sak_nr}
+
+    def get_data_version(self):
+        self.reads += 1
+        self.budgets.append(remaining_time())
+        if self.release is not None:
+            self.release.wait(5)
+        if self.version is None:
+            raise ConnectionError("supabase nede")
+        return self.version
+
+
+@pytest.fixture
+def backend():
+    return VersionBackend()
+
+
+def refreshed(service):
+    """Wait for a background data version refresh to finish."""
+    for _ in range(500):
+        if not service._data_version_refreshing:
+            return
+        time.sleep(0.002)
+    raise AssertionError("data version refresh did not finish")
+
+
+def test_data_version_is_cached_for_ttl(monkeypatch, backend):
+    service = KofaService(backend)
+    assert service.data_version() == "v1"
+    backend.version = "v2"
+    assert service.data_version() == "v1"
+    assert backend.reads == 1
+
+    # An expired version is served once more while it is re-read
+    monkeypatch.setattr(service_module, "DATA_VERSION_TTL", 0)
+    assert service.data_version() == "v1"
+    refreshed(service)
+    assert service.data_version() == "v2"
+
+
+def test_data_version_survives_backend_errors(monkeypatch, backend):
+    monkeypatch.setattr(service_module, "DATA_VERSION_TTL", 0)
+    service = KofaService(backend)
+    assert service.data_version() == "v1"
+    backend.version = None
+    assert service.data_version() == "v1"
+    refreshed(service)
+    assert service.data_version() == "v1"
+
+
+def test_slow_refresh_serves_the_stale_version(monkeypatch, backend):
+    service = KofaService(backend)
+    assert service.data_version() == "v1"
+    monkeypatch.setattr(service_module, "DATA_VERSION_TTL", 0)
+    backend.version = "v2"
+    backend.release = threading.Event()
+    try:
+        start = time.monotonic()
+        assert [service.data_version() for _ in range(5)] == ["v1"] * 5
+        assert time.monotonic() - start < 1
+    finally:
+        backend.release.set()
+    refreshed(service)
+    # One refresh at a time, however many callers found the version stale
+    assert backend.reads == 2
+    assert service.data_version() == "v2"
+
+
+def test_data_version_is_read_under_a_short_budget(monkeypatch, backend):
+    monkeypatch.setattr(service_module, "DATA_VERSION_TIMEOUT", 2)
+    KofaService(backend).data_version()
+    assert 0 < backend.budgets[0] <= 2
+
+
+def test_unreadable_data_version_is_none(backend):
+    backend.version = None
+    assert KofaService(backend).data_version() is None
+
+
+def test_warm_up_needs_the_backend(backend):
+    backend.version = None
+    service = KofaService(backend)
+    assert service.warm_up() is False
+    backend.version = "v1"
+    assert service.warm_up() is True
+    assert backend.reads == 2
+
+
+def test_job_status(backend):
+    service = KofaService(backend)
+    assert service.get_status(job_id="abc").startswith("Fant ikke jobb: abc.")
+    job = service.jobs.start("sync", lambda job: "Synkronisert 3 saker")
+    while job.finished_at is None:
+        time.sleep(0.005)
+    status = service.get_status(job_id=job.id)
+    assert f"## Jobb {job.id} (sync)" in status
+    assert "- **Status:** Ferdig" in status
+    assert status.endswith("Synkronisert 3 saker")
+
+
+def test_data_version_change_clears_backend_cache(monkeypatch, backend):
+    monkeypatch.setattr(service_module, "DATA_VERSION_TTL", 0)
+    service = KofaService(backend)
+    service.data_version()
+    service.backend.get_case("2023/1")
+    service.backend.get_case("2023/1")
+    assert backend.case_reads == 1
+
+    backend.version = "v2"
+    service.data_version()
+    refreshed(service)
+    service.backend.get_case("2023/1")
+    assert backend.case_reads == 2
+
+
+@pytest.fixture
+def corpus_service(corpus_db):
+    return KofaService(KofaSqliteBackend(corpus_db))
+
+
+def test_scoped_leaderboards_stop_at_the_cap(corpus_service, monkeypatch):
+    monkeypatch.setattr(service_module, "LEADERBOARD_CAP", 1)
+    scoped = corpus_service.most_cited(limit=5, avgjoerelse="Brudd på regelverket")
+    assert "2023/1000" in scoped
+    assert "2015/12" not in scoped
+    assert "Viser de 1 første" in scoped
+    assert "migrasjon 009" not in scoped
+
+    # The overall list is computed on demand above the cap
+    overall = corpus_service.most_cited(limit=5)
+    assert "2015/12" in overall
+    assert "Viser de" not in overall
+
+
+def test_leaderboard_scope_is_year_or_outcome(corpus_service):
+    assert corpus_service.most_cited(aar=2021, avgjoerelse="Brudd") == LEADERBOARD_SCOPE_CONFLICT
+    assert (
+        corpus_service.mest_siterte_eu(aar=2021, avgjoerelse="Brudd") == LEADERBOARD_SCOPE_CONFLICT
+    )
+
+
+def test_forarbeide_toc_without_counts(corpus_service):
+    # prop-51 has not had its char_count filled in by a sync
+    toc = corpus_service.hent_forarbeide("prop-51")
+    assert toc.startswith("## Prop. 51 L (2015-2016) — Innholdsfortegnelse")
+    assert "0 tegn (~0 tokens)" in toc
+    assert "| 1 | Innledning |" in toc
+    assert "0 tegn (~0 tokens)" in corpus_service.hent_forarbeide()
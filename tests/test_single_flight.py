@@ -0,0 +1,56 @@
+import threading
+import time
+
+from helpers import text, tool_call
+
+from kofa.server import REQUEST_CANCELLED
+
+
+def call_in_thread(server, request):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(server.handle_request(request)))
+    thread.start()
+    return thread, result
+
+
+def until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition never became true"
+        time.sleep(0.005)
+
+
+def test_identical_calls_share_one_run(server, service):
+    calls = [call_in_thread(server, tool_call(i, "sok", query="vent:a")) for i in (1, 2)]
+    until(lambda: len(server._inflight) == 2)
+    server.handle_request(tool_call(3, "sok", query="slipp:a"))
+    for thread, _ in calls:
+        thread.join(2)
+    assert [text(result) for _, result in calls] == ["treff for vent:a"] * 2
+    assert service.queries.count("vent:a") == 1
+    assert server._flights == {}
+
+
+def test_different_arguments_run_separately(server, service):
+    calls = [
+        call_in_thread(server, tool_call(1, "sok", query="vent:a")),
+        call_in_thread(server, tool_call(2, "sok", query="vent:a", limit=5)),
+    ]
+    until(lambda: service.queries.count("vent:a") == 2)
+    service.gates["a"].set()
+    for thread, _ in calls:
+        thread.join(2)
+
+
+def test_cancelling_one_caller_leaves_the_run(server, service):
+    first = call_in_thread(server, tool_call(1, "sok", query="vent:a"))
+    second = call_in_thread(server, tool_call(2, "sok", query="vent:a"))
+    until(lambda: len(server._inflight) == 2)
+    assert server.cancel_request(1)
+    first[0].join(2)
+    assert first[1]["error"]["code"] == REQUEST_CANCELLED
+
+    service.gates["a"].set()
+    second[0].join(2)
+    assert text(second[1]) == "treff for vent:a"
+    assert service.queries.count("vent:a") == 1
@@ -0,0 +1,93 @@
+import gzip
+import sqlite3
+
+import pytest
+
+from kofa.snapshot import (
+    MANIFEST_TABLE,
+    SNAPSHOT_TABLES,
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+)
+from kofa.sqlite_backend import KofaSqliteBackend
+
+
+def _counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table, _key, _page in SNAPSHOT_TABLES
+        }
+    finally:
+        conn.close()
+
+
+def test_round_trip(corpus_db, supabase_backend, tmp_path):
+    source = KofaSqliteBackend(corpus_db)
+    snapshot = str(tmp_path / "out" / "kofa.sqlite.gz")
+    manifest = export_snapshot(snapshot, supabase_backend)
+
+    assert manifest["tables"] == _counts(corpus_db)
+    assert manifest["data_version"] == source.get_data_version()
+    assert list((tmp_path / "out").iterdir()) == [tmp_path / "out" / "kofa.sqlite.gz"]
+
+    target = str(tmp_path / "live.sqlite")
+    assert import_snapshot(snapshot, target)["tables"] == manifest["tables"]
+    copy = KofaSqliteBackend(target)
+    assert copy.get_data_version() == source.get_data_version()
+    assert copy.get_case("2023/1007") == source.get_case("2023/1007")
+    assert copy.get_decision_text("2023/1007") == source.get_decision_text("2023/1007")
+    # FTS indexes are rebuilt in the snapshot
+    assert [r["sak_nr"] for r in copy.search_decision_text("forutberegnelighet", limit=50)]
+
+
+def test_export_reads_tables_in_pages(corpus_db, supabase_backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "kofa.snapshot.SNAPSHOT_TABLES",
+        [(table, key, 7) for table, key, _page in SNAPSHOT_TABLES],
+    )
+    manifest = export_snapshot(str(tmp_path / "kofa.sqlite.gz"), supabase_backend)
+    assert manifest["tables"] == _counts(corpus_db)
+
+
+def test_import_accepts_uncompressed_snapshot(corpus_db, tmp_path):
+    snapshot = tmp_path / "kofa.sqlite.gz"
+    export_snapshot(str(snapshot), KofaSqliteBackend(corpus_db))
+    plain = tmp_path / "kofa.sqlite"
+    plain.write_bytes(gzip.decompress(snapshot.read_bytes()))
+    manifest = import_snapshot(str(plain), str(tmp_path / "live.sqlite"))
+    assert manifest["tables"]["kofa_cases"] == 30
+
+
+def test_import_rejects_corrupt_file_and_keeps_target(tmp_path):
+    bad = tmp_path / "bad.gz"
+    bad.write_bytes(b"not a snapshot")
+    target = tmp_path / "live.sqlite"
+    target.write_bytes(b"existing")
+    with pytest.raises(SnapshotError):
+        import_snapshot(str(bad), str(target))
+    assert target.read_bytes() == b"existing"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.gz", "live.sqlite"]
+
+
+def test_import_rejects_count_mismatch(corpus_db, tmp_path):
+    snapshot = tmp_path / "kofa.sqlite.gz"
+    export_snapshot(str(snapshot), KofaSqliteBackend(corpus_db))
+    db = tmp_path / "tampered.sqlite"
+    db.write_bytes(gzip.decompress(snapshot.read_bytes()))
+    conn = sqlite3.connect(db)
+    conn.execute(
+        f"UPDATE {MANIFEST_TABLE} SET value = ? WHERE key = 'tables'",
+        ('{"kofa_cases": 31}',),
+    )
+    conn.commit()
+    conn.close()
+    with pytest.raises(SnapshotError, match="kofa_cases: 30 rows"):
+        import_snapshot(str(db), str(tmp_path / "live.sqlite"))
+
+
+def test_missing_snapshot():
+    with pytest.raises(SnapshotError, match="not found"):
+        import_snapshot("/nonexistent/kofa.sqlite.gz", "/nonexistent/live.sqlite")
@@ -0,0 +1,150 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from kofa.service import KofaService
+from kofa.sqlite_backend import KofaSqliteBackend, fts_query
+
+
+@pytest.fixture
+def backend(corpus_db):
+    return KofaSqliteBackend(corpus_db)
+
+
+def test_missing_database_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        KofaSqliteBackend(str(tmp_path / "mangler.sqlite"))
+
+
+def test_connection_is_read_only(backend):
+    with pytest.raises(sqlite3.OperationalError):
+        backend._conn().execute("DELETE FROM kofa_cases")
+
+
+def test_fts_query():
+    assert fts_query("Avvisning av tilbud") == '"avvisning"* AND "av"* AND "tilbud"*'
+    assert fts_query("avvisning a tilbud", "OR") == '"avvisning"* OR "tilbud"*'
+    assert fts_query(" -- ") is None
+
+
+def test_get_case(backend):
+    assert backend.get_case("2023/1005")["innklaget"] == "Oslo kommune 2"
+    assert backend.get_case("1999/1") is None
+
+
+def test_search_matches_prefixes(backend):
+    results = backend.search("avvis")
+    assert len(results) == 15
+    assert all(r["saken_gjelder"] == "Avvisning av tilbud" for r in results)
+
+
+def test_search_falls_back_to_or(backend):
+    assert backend.search("avvisning xyzzy", limit=5)
+    assert backend.search("xyzzy") == []
+
+
+def test_recent_cases_newest_first_with_filters(backend):
+    dates = [c["avsluttet"] for c in backend.recent_cases(limit=30) if c["avsluttet"]]
+    assert dates == sorted(dates, reverse=True)
+
+    gebyr = backend.recent_cases(sakstype="Gebyrsak", innklaget="kommune 1")
+    assert [c["sak_nr"] for c in gebyr] == ["2023/1010", "2023/1025"]
+
+
+def test_statistics(backend):
+    by_year = backend.statistics(aar=2021)
+    assert sum(row["count"] for row in by_year) == 7
+    with pytest.raises(ValueError):
+        backend.statistics(gruppering="innklaget")
+
+
+def test_decision_text(backend):
+    assert [p["section"] for p in backend.get_decision_text("2023/1003")] == [
+        "bakgrunn",
+        "vurdering",
+        "konklusjon",
+    ]
+    assert len(backend.get_decision_text("2023/1003", section="vurdering")) == 1
+
+    hits = backend.search_decision_text("forutberegnelighet", section="konklusjon", limit=50)
+    assert len(hits) == 30
+    assert {h["section"] for h in hits} == {"konklusjon"}
+
+
+def test_law_reference_matches_section_prefix(backend):
+    refs = backend.find_by_law_reference("anskaffelsesforskriften", "24-8", limit=50)
+    assert len(refs) == 15
+    assert refs[0]["sak_nr"] == "2023/1028"
+    assert refs[0]["kofa_cases"]["innklaget"] == "Oslo kommune 1"
+    assert backend.find_by_law_reference("anskaffelsesforskriften", "24") == []
+    assert backend.count_cases_by_section("anskaffelsesforskriften", "8-3") == 10
+
+
+def test_cases_by_sections_require_all(backend):
+    refs = backend.find_cases_by_sections("anskaffelsesforskriften", ["24-8", "8-3"])
+    assert {r["sak_nr"] for r in refs} == {f"2023/{1000 + i}" for i in range(0, 30, 6)}
+
+
+def test_related_cases(backend):
+    related = backend.find_related_cases("2023/1001")
+    assert [c["sak_nr"] for c in related["cites"]] == ["2023/1000", "2015/12"]
+    assert related["cites"][1] == {"sak_nr": "2015/12"}
+    cited_by = backend.find_related_cases("2023/1000")["cited_by"]
+    assert len(cited_by) == 29
+    assert cited_by[0]["sak_nr"] == "2023/1029"
+
+
+def test_most_cited(backend):
+    top = backend.most_cited_cases(limit=1)
+    assert top[0]["sak_nr"] == "2023/1000"
+    assert top[0]["cited_count"] == 29
+
+    eu = backend.most_cited_eu_cases()
+    assert [(e["eu_case_id"], e["cited_count"]) for e in eu] == [("C-19/00", 8), ("C-27/15", 1)]
+
+
+def test_eu_case_law(backend):
+    meta = backend.get_eu_case_law_meta("C-19/00")
+    assert "full_text" not in meta
+    assert meta["section_index"] == {"sammendrag": [0, 12]}
+    assert backend.get_eu_case_law_slice("C-19/00", 0, 12) == "Sammendrag. "
+    assert backend.get_eu_case_law_slice("C-1/99", 0, 12) is None
+    assert len(backend.find_by_eu_case("C-19/00", limit=50)) == 9
+
+
+def test_list_known_ids(backend):
+    assert len(backend.list_known_ids("sak_nr")) == 30
+    assert backend.list_known_ids("eu_case_id") == {"C-19/00", "C-27/15"}
+
+
+def test_forarbeider(backend):
+    sections = backend.get_forarbeider_sections("prop-51", "1")
+    assert [s["section_number"] for s in sections] == ["1", "1.1", "1.2"]
+
+    toc = backend.get_forarbeider_toc("prop-51")
+    assert [(s["section_number"], s["subsection_count"]) for s in toc] == [("1", 2), ("2", 0)]
+
+    hits = backend.search_forarbeider("likebehandling")
+    assert [(h["section_number"], h["doc_title"]) for h in hits] == [
+        ("1.1", "Prop. 51 L (2015-2016)")
+    ]
+    refs = backend.find_forarbeider_by_law_reference("anskaffelsesforskriften", "24-8")
+    assert refs[0]["kofa_forarbeider"] == {"title": "Prop. 51 L (2015-2016)"}
+
+
+def test_data_version_follows_sync_meta(corpus_db, tmp_path):
+    path = str(tmp_path / "kopi.sqlite")
+    shutil.copy(corpus_db, path)
+    before = KofaSqliteBackend(path).get_data_version()
+    assert KofaSqliteBackend(path).get_data_version() == before
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE kofa_sync_meta SET last_count = 31")
+    assert KofaSqliteBackend(path).get_data_version() != before
+
+
+def test_service_formats_sqlite_results(backend):
+    service = KofaService(backend)
+    assert "2023/1005" in service.get_case("2023/1005")
+    assert "2023/10" in service.search("avvisning")
@@ -0,0 +1,130 @@
+import asyncio
+import io
+import json
+import time
+
+from helpers import text, tool_call
+
+from kofa import jobs as jobs_module
+from kofa.stdio import StdioTransport
+
+
+class ScriptedStdin:
+    """stdin over `lines` (messages or raw strings); a callable is run (waited on) in between."""
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+
+    def readline(self):
+        for line in self.lines:
+            if callable(line):
+                line()
+                continue
+            return (line if isinstance(line, str) else json.dumps(line)) + "\n"
+        return ""
+
+
+def run_stdio(server, *lines, max_concurrency=4):
+    """Feed `lines` to a stdio transport until EOF; return the messages it wrote."""
+    stdout = io.StringIO()
+    transport = StdioTransport(
+        server, max_concurrency=max_concurrency, stdin=ScriptedStdin(lines), stdout=stdout
+    )
+    asyncio.run(transport.run())
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_tool_calls_run_concurrently(server):
+    # Sequentially the first call would wait for a gate only the second one opens
+    out = run_stdio(
+        server, tool_call(1, "sok", query="vent:a"), tool_call(2, "sok", query="slipp:a")
+    )
+    by_id = {r["id"]: text(r) for r in out}
+    assert by_id == {1: "treff for vent:a", 2: "treff for slipp:a"}
+
+
+def test_inline_methods_are_not_held_up_by_calls(server):
+    out = run_stdio(
+        server,
+        tool_call(1, "sok", query="vent:a"),
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+        tool_call(3, "sok", query="slipp:a"),
+    )
+    assert out[0] == {"jsonrpc": "2.0", "id": 2, "result": {}}
+    assert sorted(r["id"] for r in out) == [1, 2, 3]
+
+
+def test_parse_error_is_answered_and_loop_continues(server):
+    out = run_stdio(server, "{not json", {"jsonrpc": "2.0", "id": 7, "method": "ping"})
+    assert out[0]["id"] is None
+    assert out[0]["error"]["code"] == -32700
+    assert out[1]["id"] == 7
+
+
+def test_batch_is_answered_as_one_line(server):
+    out = run_stdio(
+        server,
+        [tool_call(1, "sok", query="x"), {"jsonrpc": "2.0", "id": 2, "method": "ping"}],
+        [{"jsonrpc": "2.0", "method": "notifications/initialized"}],
+    )
+    assert len(out) == 1
+    assert [r["id"] for r in out[0]] == [1, 2]
+
+
+def test_notifications_get_no_response(server):
+    out = run_stdio(
+        server,
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 1, "method": "ping"},
+    )
+    assert out == [{"jsonrpc": "2.0", "id": 1, "result": {}}]
+
+
+def test_cancelled_call_gets_no_response(server, service):
+    def until_in_flight():
+        deadline = time.monotonic() + 2
+        while not server._inflight and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    try:
+        out = run_stdio(
+            server,
+            tool_call(1, "sok", query="vent:aldri"),
+            until_in_flight,
+            {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+            tool_call(2, "sok", query="x"),
+        )
+    finally:
+        service.gates["aldri"].set()
+    assert [r["id"] for r in out] == [2]
+
+
+def test_sync_progress_is_written_as_notifications(monkeypatch, server, service):
+    monkeypatch.setattr(jobs_module, "PROGRESS_INTERVAL", 0)
+
+    def until_job_done():
+        deadline = time.monotonic() + 2
+        while not (service.jobs.list() and service.jobs.list()[0].finished_at):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    request = tool_call(1, "sync")
+    request["params"]["_meta"] = {"progressToken": "p-1"}
+    out = run_stdio(server, request, until_job_done)
+
+    response = next(m for m in out if m.get("id") == 1)
+    assert "Synkronisering kjører som jobb" in text(response)
+    progress = [m["params"] for m in out if m.get("method") == "notifications/progress"]
+    assert {p["progressToken"] for p in progress} == {"p-1"}
+    assert [p["message"] for p in progress] == ["wp_api: 1/2", "wp_api: 2/2", "pdf: 1", "Ferdig"]
+    assert [p["progress"] for p in progress] == [0.5, 0.99, 1.0, 2]
+    assert progress[-1]["total"] == 2
+
+
+def test_sync_without_progress_token_sends_no_notifications(server, service):
+    def until_job_done():
+        while not (service.jobs.list() and service.jobs.list()[0].finished_at):
+            time.sleep(0.01)
+
+    out = run_stdio(server, tool_call(1, "sync"), until_job_done)
+    assert [m["id"] for m in out] == [1]
@@ -0,0 +1,72 @@
+import itertools
+import sqlite3
+
+import pytest
+from helpers import FakeClient
+
+from kofa.supabase_backend import CUBE_KEY_COLUMNS, KofaSupabaseBackend
+
+
+@pytest.fixture
+def cube_backend(tmp_path, monkeypatch):
+    """KofaSupabaseBackend over a statistics cube of 2,100 cells (three pages)."""
+    path = str(tmp_path / "cube.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE kofa_statistics_cube ({', '.join(CUBE_KEY_COLUMNS)}, count)")
+    cells = itertools.product(
+        range(2000, 2021), ("Brudd", "Ikke brudd", "Avvist", "Ukjent"), "ABCDE", "FGHIJ", ["Åpen"]
+    )
+    conn.executemany("INSERT INTO kofa_statistics_cube VALUES (?, ?, ?, ?, ?, 1)", list(cells))
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr("kofa.supabase_backend.get_shared_client", lambda: FakeClient(path))
+    return KofaSupabaseBackend()
+
+
+def test_statistics_cube_pages_cover_every_cell(cube_backend):
+    rows = cube_backend.get_statistics_cube()
+    assert len(rows) == 2100
+    assert len({tuple(row[c] for c in CUBE_KEY_COLUMNS) for row in rows}) == 2100
+
+
+class SyncingClient(FakeClient):
+    """Drops repeated references after the first page read, as a concurrent sync may."""
+
+    def table(self, name):
+        query = super().table(name)
+        execute = query.execute
+
+        def execute_then_sync():
+            result = execute()
+            if name == "kofa_eu_references":
+                self.conn.execute(
+                    "DELETE FROM kofa_eu_references WHERE eu_case_id = 'C-0/15' AND id > 1"
+                )
+            return result
+
+        query.execute = execute_then_sync
+        return query
+
+
+@pytest.fixture
+def reference_backend(tmp_path, monkeypatch):
+    """KofaSupabaseBackend over 2,500 EU references (three pages), 500 of them repeats."""
+    path = str(tmp_path / "references.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE kofa_eu_references (id INTEGER PRIMARY KEY, eu_case_id)")
+    conn.execute("CREATE TABLE kofa_eu_case_law (eu_case_id PRIMARY KEY)")
+    references = [f"C-{i}/15" for i in range(2000)] + ["C-0/15"] * 500
+    conn.executemany(
+        "INSERT INTO kofa_eu_references (eu_case_id) VALUES (?)", [(r,) for r in references]
+    )
+    conn.execute("INSERT INTO kofa_eu_case_law VALUES ('C-19/00')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr("kofa.supabase_backend.get_shared_client", lambda: SyncingClient(path))
+    return KofaSupabaseBackend()
+
+
+def test_known_ids_survive_references_removed_mid_scan(reference_backend):
+    # Offset paging by eu_case_id would skip 500 ids once the repeats are gone
+    ids = reference_backend.list_known_ids("eu_case_id")
+    assert ids == {f"C-{i}/15" for i in range(2000)} | {"C-19/00"}
@@ -0,0 +1,142 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from kofa.vector_index import (  # noqa: E402
+    VectorIndex,
+    VectorIndexError,
+    benchmark,
+    export_vectors,
+    open_index,
+)
+
+DIM = 32
+SECTIONS = ("bakgrunn", "vurdering", "konklusjon")
+
+
+class EmbeddingBackend:
+    """scan_table() over clustered random paragraph embeddings."""
+
+    def __init__(self, rows=3000, clusters=40, seed=1):
+        rng = np.random.default_rng(seed)
+        centres = rng.normal(size=(clusters, DIM))
+        labels = rng.integers(clusters, size=rows)
+        vectors = centres[labels] + 0.35 * rng.normal(size=(rows, DIM))
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.rows = [
+            {
+                "id": i + 1,
+                "sak_nr": f"2023/{i // 4}",
+                "paragraph_number": i % 4 + 1,
+                "section": SECTIONS[i % 3],
+                "embedding": self.vectors[i].tolist(),
+            }
+            for i in range(rows)
+        ]
+
+    def scan_table(self, table, columns, key, page_size=1000):
+        assert table == "kofa_decision_text"
+        for row in sorted(self.rows, key=lambda r: r[key]):
+            yield {c: row[c] for c in columns}
+
+
+@pytest.fixture(scope="module", params=["int8", "float16", "float32"])
+def index(request, tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp(f"vectors-{request.param}"))
+    backend = EmbeddingBackend()
+    manifest = export_vectors("decisions", directory, request.param, backend)
+    assert manifest["count"] == len(backend.rows)
+    return VectorIndex("decisions", directory), backend
+
+
+def test_exact_search_finds_the_row_itself(index):
+    vectors, backend = index
+    for i in (0, 17, 2999):
+        (row, similarity), *_ = vectors.search(backend.vectors[i], k=5)
+        assert row["id"] == i + 1
+        assert row["sak_nr"] == backend.rows[i]["sak_nr"]
+        assert row["section"] == backend.rows[i]["section"]
+        assert similarity == pytest.approx(1.0, abs=0.02)
+
+
+def test_results_are_ranked_and_filtered(index):
+    vectors, backend = index
+    hits = vectors.search(backend.vectors[5], k=10, filters={"section": "vurdering"})
+    assert len(hits) == 10
+    assert all(row["section"] == "vurdering" for row, _ in hits)
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+    hits = vectors.search(backend.vectors[5], k=10, filters={"sak_nr": "2023/1", "section": None})
+    assert sorted(row["id"] for row, _ in hits) == [5, 6, 7, 8]
+    assert vectors.search(backend.vectors[5], filters={"section": "ukjent"}) == []
+
+
+def test_small_blocks_give_the_same_top_k(index, monkeypatch):
+    vectors, backend = index
+    expected = vectors.search(backend.vectors[42], k=20)
+    # Blocks smaller than k exercise the running top-k merge
+    monkeypatch.setattr("kofa.vector_index.BLOCK_ROWS", 7)
+    hits = vectors.search(backend.vectors[42], k=20)
+    assert [row for row, _ in hits] == [row for row, _ in expected]
+    assert [score for _, score in hits] == pytest.approx([score for _, score in expected])
+
+
+def test_ivf_recall(index):
+    vectors, _ = index
+    lists = vectors.stats()["lists"]
+    report = {r["nprobe"]: r for r in benchmark(vectors, [8, lists], queries=50, k=10)}
+    assert report[0]["recall"] == 1.0
+    assert report[lists]["recall"] == 1.0
+    assert report[8]["recall"] >= 0.9
+    assert report[8]["scanned"] < 0.5
+
+
+def test_ivf_search_applies_filters(index):
+    vectors, backend = index
+    hits = vectors.search(backend.vectors[5], k=10, filters={"section": "vurdering"}, nprobe=4)
+    assert hits
+    assert all(row["section"] == "vurdering" for row, _ in hits)
+    # A filter narrower than the probed lists is searched exactly
+    hits = vectors.search(backend.vectors[5], k=10, filters={"sak_nr": "2023/1"}, nprobe=1)
+    assert sorted(row["id"] for row, _ in hits) == [5, 6, 7, 8]
+
+
+def test_query_dimension_is_checked(index):
+    vectors, _ = index
+    with pytest.raises(ValueError):
+        vectors.search([1.0] * (DIM + 1))
+
+
+def test_rows_without_embedding_are_skipped(tmp_path):
+    backend = EmbeddingBackend(rows=40)
+    backend.rows[3]["embedding"] = None
+    assert export_vectors("decisions", str(tmp_path), "int8", backend)["count"] == 39
+
+
+def test_new_export_is_picked_up(tmp_path, monkeypatch):
+    monkeypatch.setattr("kofa.vector_index.datetime", _Clock())
+    vectors = None
+    for rows in (40, 80):
+        export_vectors("decisions", str(tmp_path), "int8", EmbeddingBackend(rows=rows))
+        vectors = vectors or VectorIndex("decisions", str(tmp_path))
+        assert vectors.stats()["count"] == rows
+
+
+class _Clock:
+    """datetime stand-in giving every export its own file stamp."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def now(self, tz):
+        from datetime import datetime
+
+        self.calls += 1
+        return datetime(2026, 1, 1, 0, 0, self.calls, tzinfo=tz)
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(VectorIndexError):
+        VectorIndex("decisions", str(tmp_path))
+    assert open_index("decisions", str(tmp_path)) is None
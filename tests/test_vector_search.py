@@ -0,0 +1,124 @@
+import pytest
+
+from kofa.replica import CorpusReplica
+from kofa.sqlite_backend import KofaSqliteBackend
+from kofa.vector_search import ForarbeiderVectorSearch, KofaVectorSearch
+
+
+class FixedEmbedder:
+    def embed(self, query):
+        return [1.0, 0.0]
+
+
+class FixedIndex:
+    """Local vector index stand-in returning preset hits (best first)."""
+
+    def __init__(self, *rows):
+        self.rows = rows
+        self.searches = []
+
+    def search(self, query, k=10, filters=None, nprobe=0):
+        self.searches.append((k, filters, nprobe))
+        return [(row, 0.9 - i / 10) for i, row in enumerate(self.rows[:k])]
+
+
+class CountingBackend:
+    """Records which backend methods are called, and how often."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture
+def backend(corpus_db):
+    return CountingBackend(KofaSqliteBackend(corpus_db))
+
+
+def test_decision_hits_are_read_in_one_query(backend):
+    index = FixedIndex(
+        {"sak_nr": "2023/1004", "paragraph_number": 2, "section": "vurdering"},
+        {"sak_nr": "2023/1004", "paragraph_number": 3, "section": "vurdering"},  # moved
+        {"sak_nr": "1999/1", "paragraph_number": 1, "section": "vurdering"},  # removed
+        {"sak_nr": "2023/1009", "paragraph_number": 2, "section": "vurdering"},
+    )
+    search = KofaVectorSearch(FixedEmbedder(), index=index, backend=backend)
+    results = search.search("forutberegnelighet", limit=4, section="vurdering")
+
+    assert [(r.sak_nr, r.paragraph_number) for r in results] == [("2023/1004", 2), ("2023/1009", 2)]
+    assert results[0].text == "Avsnitt 2 om forutberegnelighet i vurdering 2023/1004"
+    assert (results[0].innklaget, results[1].innklaget) == ("Oslo kommune 1", "Oslo kommune 0")
+    assert backend.calls == ["get_paragraphs", "get_cases"]
+
+
+def test_forarbeider_hits_are_read_in_one_query(backend):
+    index = FixedIndex(
+        {"doc_id": "prop-51", "section_number": "1.1"},
+        {"doc_id": "prop-51", "section_number": "1.2"},  # no text
+        {"doc_id": "prop-51", "section_number": "9"},  # removed since the export
+        {"doc_id": "prop-51", "section_number": "2"},
+    )
+    search = ForarbeiderVectorSearch(FixedEmbedder(), index=index, backend=backend)
+    results = search.search("likebehandling", limit=4, doc_id="prop-51", ivfflat_probes=3)
+
+    assert [(r.section_number, r.title) for r in results] == [
+        ("1.1", "Bakgrunn"),
+        ("2", "Avvisning"),
+    ]
+    assert {r.doc_title for r in results} == {"Prop. 51 L (2015-2016)"}
+    assert results[0].similarity == results[0].combined_score == pytest.approx(0.9)
+    assert index.searches == [(4, {"doc_id": "prop-51"}, 3)]
+    assert backend.calls == ["get_forarbeider_section_rows", "get_forarbeide"]
+
+
+def test_local_full_text_search_goes_through_the_backend(backend):
+    decisions = KofaVectorSearch(FixedEmbedder(), index=FixedIndex(), backend=backend)
+    results = decisions.search_fts("forutberegnelighet", limit=3, section="konklusjon")
+    assert len(results) == 3
+    assert {r.section for r in results} == {"konklusjon"}
+    assert all(r.fts_rank == r.combined_score > 0 for r in results)
+
+    forarbeider = ForarbeiderVectorSearch(FixedEmbedder(), index=FixedIndex(), backend=backend)
+    results = forarbeider._fallback_fts_search("likebehandling", 5, "prop-51")
+    assert [(r.section_number, r.doc_title) for r in results] == [("1.1", "Prop. 51 L (2015-2016)")]
+    assert backend.calls == ["search_decision_text", "search_forarbeider"]
+
+
+def test_section_rows_match_between_backends(corpus_db, supabase_backend):
+    keys = [("prop-51", "1.1"), ("prop-51", "2"), ("prop-51", "9"), ("annen", "1")]
+    expected = KofaSqliteBackend(corpus_db).get_forarbeider_section_rows(keys)
+    assert sorted(r["section_number"] for r in expected) == ["1.1", "2"]
+    rows = supabase_backend.get_forarbeider_section_rows(keys)
+    assert sorted(rows, key=lambda r: r["section_number"]) == sorted(
+        expected, key=lambda r: r["section_number"]
+    )
+    assert supabase_backend.get_forarbeider_section_rows([]) == []
+
+
+@pytest.mark.parametrize("source", ["supabase", "replica"])
+def test_batch_reads_match_sqlite(corpus_db, supabase_backend, source):
+    sqlite = KofaSqliteBackend(corpus_db)
+    other = supabase_backend if source == "supabase" else CorpusReplica.load(sqlite)
+    keys = [("2023/1004", 2), ("2023/1004", 9), ("2023/1009", 1), ("1999/1", 1)]
+
+    def by_key(rows):
+        return sorted(rows, key=lambda r: (r["sak_nr"], r["paragraph_number"]))
+
+    assert by_key(other.get_paragraphs(keys)) == by_key(sqlite.get_paragraphs(keys))
+    assert len(sqlite.get_paragraphs(keys)) == 2
+
+    sak_nrs = ["2023/1009", "1999/1", "2023/1004", "2023/1009"]
+    cases = {c["sak_nr"]: c for c in other.get_cases(sak_nrs)}
+    expected = {c["sak_nr"]: c for c in sqlite.get_cases(sak_nrs)}
+    assert sorted(cases) == sorted(expected) == ["2023/1004", "2023/1009"]
+    for sak_nr, case in cases.items():
+        assert case.items() <= expected[sak_nr].items()